@@ -1,6 +1,7 @@
 import re
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import pytz
@@ -34,6 +35,10 @@ class BrushTask(object):
     _torrents_cache = []
     _qb_client = "qbittorrent"
     _tr_client = "transmission"
+    # 并发解析种子详情页的线程数
+    _probe_threads = 4
+    # 等待站点流控放行的最长时间（秒）
+    _probe_wait_timeout = 60
 
     def __init__(self):
         self.init_config()
@@ -201,13 +206,17 @@ class BrushTask(object):
                                            dlcount=rss_rule.get("dlcount")):
             return
 
-        rss_result = self.rsshelper.parse_rssxml(url=rss_url, proxy=site_proxy)
+        # 选种规则未变化时，只处理RSS中新出现的种子
+        feed_context = StringUtils.md5_hash(f"{taskid}-{rss_rule}")
+        rss_result = self.rsshelper.parse_rssxml(url=rss_url,
+                                                 proxy=site_proxy,
+                                                 context=feed_context)
         if rss_result is None:
             # RSS链接过期
             log.error(f"【Brush】{task_name} RSS链接已过期，请重新获取！")
             return
         if len(rss_result) == 0:
-            log.warn("【Brush】%s RSS未下载到数据" % site_name)
+            log.info("【Brush】%s RSS没有新数据" % site_name)
             return
         else:
             log.info("【Brush】%s RSS获取数据：%s" % (site_name, len(rss_result)))
@@ -220,18 +229,18 @@ class BrushTask(object):
             downloading_count = self.__get_downloading_count(downloader_id) or 0
             new_torrent_count = int(max_dlcount) - int(downloading_count)
 
+        # 批量查询已在刷流任务中的种子
+        handled_enclosures = self.dbhelper.get_brushtask_torrent_enclosures(
+            [res.get('enclosure') for res in rss_result])
+
+        # 先按不需要访问站点的条件过滤
+        candidates = []
         for res in rss_result:
             try:
                 # 种子名
                 torrent_name = res.get('title')
                 # 种子链接
                 enclosure = res.get('enclosure')
-                # 种子页面
-                page_url = res.get('link')
-                # 种子大小
-                size = res.get('size')
-                # 发布时间
-                pubdate = res.get('pubdate')
 
                 if enclosure not in self._torrents_cache:
                     self._torrents_cache.append(enclosure)
@@ -242,44 +251,94 @@ class BrushTask(object):
                 # 检查种子是否符合选种规则
                 if not self.__check_rss_rule(rss_rule=rss_rule,
                                              title=torrent_name,
-                                             torrent_url=page_url,
-                                             torrent_size=size,
-                                             pubdate=pubdate,
-                                             siteid=site_id,
-                                             cookie=cookie,
-                                             ua=ua,
-                                             proxy=site_proxy):
-                    continue
-                # 检查能否添加当前种子，判断是否超过保种体积大小
-                if not self.__is_allow_new_torrent(taskinfo=taskinfo,
-                                                   dlcount=max_dlcount,
-                                                   torrent_size=size):
+                                             torrent_size=res.get('size'),
+                                             pubdate=res.get('pubdate')):
                     continue
                 # 检查是否已处理过
-                if self.is_torrent_handled(enclosure=enclosure):
+                if enclosure in handled_enclosures:
                     log.info("【Brush】%s 已在刷流任务中" % torrent_name)
                     continue
-                # 开始下载
-                log.debug("【Brush】%s 符合条件，开始下载..." % torrent_name)
-                if self.__download_torrent(taskinfo=taskinfo,
-                                           rss_rule=rss_rule,
-                                           site_info=site_info,
-                                           title=torrent_name,
-                                           enclosure=enclosure,
-                                           size=size):
-                    # 计数
-                    success_count += 1
-                    # 添加种子后不能超过最大下载数量
-                    if max_dlcount and success_count >= new_torrent_count:
-                        break
-
-                    # 再判断一次
-                    if not self.__is_allow_new_torrent(taskinfo=taskinfo,
-                                                       dlcount=max_dlcount):
-                        break
+                candidates.append(res)
             except Exception as err:
                 ExceptionUtils.exception_traceback(err)
                 continue
+        # 最新发布、体积大的种子优先
+        candidates.sort(key=lambda x: (x.get('pubdate').timestamp() if x.get('pubdate') else 0,
+                                       float(x.get('size') or 0)),
+                        reverse=True)
+
+        # 并发解析种子详情，按优先级顺序处理结果
+        executor = ThreadPoolExecutor(max_workers=self._probe_threads)
+        probe_tasks = [(res, executor.submit(self.__probe_torrent_attr,
+                                             rss_rule=rss_rule,
+                                             torrent_url=res.get('link'),
+                                             siteid=site_id,
+                                             cookie=cookie,
+                                             ua=ua,
+                                             proxy=site_proxy)) for res in candidates]
+        processed_count = 0
+        # 是否有种子因临时原因未处理，需要下次重新处理
+        reprocess_flag = False
+        try:
+            for res, future in probe_tasks:
+                processed_count += 1
+                try:
+                    # 种子名
+                    torrent_name = res.get('title')
+                    # 种子链接
+                    enclosure = res.get('enclosure')
+                    # 种子大小
+                    size = res.get('size')
+
+                    torrent_attr = future.result()
+                    if torrent_attr is None:
+                        # 触发站点流控，下次重新处理
+                        self._torrents_cache.remove(enclosure)
+                        reprocess_flag = True
+                        continue
+                    log.debug("【Brush】%s 解析详情, %s" % (torrent_name, torrent_attr))
+                    if not self.__check_torrent_attr(rss_rule=rss_rule,
+                                                     title=torrent_name,
+                                                     torrent_attr=torrent_attr):
+                        continue
+                    # 检查能否添加当前种子，判断是否超过保种体积大小
+                    if not self.__is_allow_new_torrent(taskinfo=taskinfo,
+                                                       dlcount=max_dlcount,
+                                                       torrent_size=size):
+                        continue
+                    # 开始下载
+                    log.debug("【Brush】%s 符合条件，开始下载..." % torrent_name)
+                    if self.__download_torrent(taskinfo=taskinfo,
+                                               rss_rule=rss_rule,
+                                               site_info=site_info,
+                                               title=torrent_name,
+                                               enclosure=enclosure,
+                                               size=size):
+                        # 计数
+                        success_count += 1
+                        # 添加种子后不能超过最大下载数量
+                        if max_dlcount and success_count >= new_torrent_count:
+                            # 剩余的种子下次重新处理
+                            reprocess_flag = True
+                            break
+
+                        # 再判断一次
+                        if not self.__is_allow_new_torrent(taskinfo=taskinfo,
+                                                           dlcount=max_dlcount):
+                            reprocess_flag = True
+                            break
+                except Exception as err:
+                    ExceptionUtils.exception_traceback(err)
+                    continue
+        finally:
+            # 未处理的种子不再访问站点，下次重新处理
+            for res, future in probe_tasks[processed_count:]:
+                future.cancel()
+                self._torrents_cache.remove(res.get('enclosure'))
+                reprocess_flag = True
+            executor.shutdown(wait=False)
+            if reprocess_flag:
+                self.rsshelper.reset_feed_state(rss_url, feed_context)
         log.info("【Brush】任务 %s 本次添加了 %s 个下载" % (task_name, success_count))
 
     def remove_tasks_torrents(self):
@@ -489,8 +548,9 @@ class BrushTask(object):
                 if remove_torrent_ids:
                     log.info("【Brush】任务 %s 的这些下载任务在下载器中不存在，将删除任务记录：%s" % (
                         task_name, remove_torrent_ids))
-                    for remove_torrent_id in remove_torrent_ids:
-                        self.dbhelper.delete_brushtask_torrent(taskid, remove_torrent_id)
+                    with self.dbhelper.unit_of_work():
+                        for remove_torrent_id in remove_torrent_ids:
+                            self.dbhelper.delete_brushtask_torrent(taskid, remove_torrent_id)
                 # 删除下载器种子
                 if delete_ids:
                     self.downloader.delete_torrents(downloader_id=downloader_id,
@@ -654,26 +714,17 @@ class BrushTask(object):
 
         return True
 
-    def __check_rss_rule(self,
-                         rss_rule,
+    @staticmethod
+    def __check_rss_rule(rss_rule,
                          title,
-                         torrent_url,
                          torrent_size,
-                         pubdate,
-                         siteid,
-                         cookie,
-                         ua,
-                         proxy):
+                         pubdate):
         """
-        检查种子是否符合刷流过滤条件
+        检查种子是否符合刷流过滤条件中不需要访问站点的部分
         :param rss_rule: 过滤条件字典
         :param title: 种子名称
-        :param torrent_url: 种子页面地址
         :param torrent_size: 种子大小
         :param pubdate: 发布时间
-        :param siteid: 站点ID
-        :param cookie: Cookie
-        :param ua: User-Agent
         :return: 是否命中
         """
         if not rss_rule:
@@ -708,17 +759,68 @@ class BrushTask(object):
                 if re.search(r"%s" % rss_rule.get("exclude"), title):
                     return False
 
-            # 站点流控
-            if self.sites.check_ratelimit(siteid):
-                return False
+            # 检查发布时间
+            if rss_rule.get("pubdate") and pubdate:
+                rule_pubdates = rss_rule.get("pubdate").split("#")
+                if len(rule_pubdates) >= 2 and rule_pubdates[1]:
+                    min_max_pubdates = rule_pubdates[1].split(',')
+                    min_pubdate = min_max_pubdates[0]
+                    max_pubdate = min_max_pubdates[1] if len(min_max_pubdates) > 1 else None
+                    localtz = pytz.timezone(Config().get_timezone())
+                    localnowtime = datetime.now().astimezone(localtz)
+                    localpubdate = pubdate.astimezone(localtz)
+                    pudate_hour = int(localnowtime.timestamp() - localpubdate.timestamp()) / 3600
+                    log.debug('【Brush】发布时间：%s，当前时间：%s，时间间隔：%f hour' % (
+                        localpubdate.isoformat(), localnowtime.isoformat(), pudate_hour))
+                    if rule_pubdates[0] == "lt" and pudate_hour >= float(min_pubdate):
+                        log.debug("【Brush】%s `判断发布时间, 判断条件: pubdate: %s %d" % (
+                            title, rule_pubdates[0], float(min_pubdate)))
+                        return False
+                    if rule_pubdates[0] == "gt" and pudate_hour <= float(min_pubdate):
+                        log.debug("【Brush】%s `判断发布时间, 判断条件: pubdate: %s %d" % (
+                            title, rule_pubdates[0], float(min_pubdate)))
+                        return False
+                    if rule_pubdates[0] == "bw" and (
+                            not max_pubdate or not (
+                            float(min_pubdate) <= pudate_hour <= float(max_pubdate))):
+                        log.debug("【Brush】%s `判断发布时间, 判断条件: pubdate: %s %d %d" % (
+                            title, rule_pubdates[0], float(min_pubdate), float(max_pubdate or 0)))
+                        return False
 
-            torrent_attr = self.siteconf.check_torrent_attr(torrent_url=torrent_url,
-                                                            cookie=cookie,
-                                                            ua=ua,
-                                                            proxy=proxy)
-            torrent_peer_count = torrent_attr.get("peer_count")
-            log.debug("【Brush】%s 解析详情, %s" % (title, torrent_attr))
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+
+        return True
+
+    def __probe_torrent_attr(self, rss_rule, torrent_url, siteid, cookie, ua, proxy):
+        """
+        解析种子详情页的促销、HR、做种人数属性，过滤条件不需要时不访问站点
+        :return: 种子属性，触发站点流控时返回None
+        """
+        if not rss_rule \
+                or not (rss_rule.get("free") or rss_rule.get("hr") or rss_rule.get("peercount")):
+            return {}
+        # 站点流控
+        if self.sites.wait_ratelimit(siteid, timeout=self._probe_wait_timeout):
+            return None
+        return self.siteconf.check_torrent_attr(torrent_url=torrent_url,
+                                                cookie=cookie,
+                                                ua=ua,
+                                                proxy=proxy)
 
+    @staticmethod
+    def __check_torrent_attr(rss_rule, title, torrent_attr):
+        """
+        检查种子详情属性是否符合刷流过滤条件
+        :param rss_rule: 过滤条件字典
+        :param title: 种子名称
+        :param torrent_attr: 种子详情属性
+        :return: 是否命中
+        """
+        if not rss_rule:
+            return True
+        try:
+            torrent_peer_count = torrent_attr.get("peer_count") or 0
             # 检查免费状态
             if rss_rule.get("free") == "FREE":
                 if not torrent_attr.get("free"):
@@ -765,35 +867,6 @@ class BrushTask(object):
                         log.debug("【Brush】%s `判断做种数, 判断条件: left:%d %s peer_count:%d %s right:%d" % (
                             title, min_count, peer_counts[0], torrent_peer_count, peer_counts[0], max_count))
                         return False
-
-            # 检查发布时间
-            if rss_rule.get("pubdate") and pubdate:
-                rule_pubdates = rss_rule.get("pubdate").split("#")
-                if len(rule_pubdates) >= 2 and rule_pubdates[1]:
-                    min_max_pubdates = rule_pubdates[1].split(',')
-                    min_pubdate = min_max_pubdates[0]
-                    max_pubdate = min_max_pubdates[1] if len(min_max_pubdates) > 1 else None
-                    localtz = pytz.timezone(Config().get_timezone())
-                    localnowtime = datetime.now().astimezone(localtz)
-                    localpubdate = pubdate.astimezone(localtz)
-                    pudate_hour = int(localnowtime.timestamp() - localpubdate.timestamp()) / 3600
-                    log.debug('【Brush】发布时间：%s，当前时间：%s，时间间隔：%f hour' % (
-                        localpubdate.isoformat(), localnowtime.isoformat(), pudate_hour))
-                    if rule_pubdates[0] == "lt" and pudate_hour >= float(min_pubdate):
-                        log.debug("【Brush】%s `判断发布时间, 判断条件: pubdate: %s %d" % (
-                            title, rule_pubdates[0], float(min_pubdate)))
-                        return False
-                    if rule_pubdates[0] == "gt" and pudate_hour <= float(min_pubdate):
-                        log.debug("【Brush】%s `判断发布时间, 判断条件: pubdate: %s %d" % (
-                            title, rule_pubdates[0], float(min_pubdate)))
-                        return False
-                    if rule_pubdates[0] == "bw" and (
-                            not max_pubdate or not (
-                            float(min_pubdate) <= pudate_hour <= float(max_pubdate))):
-                        log.debug("【Brush】%s `判断发布时间, 判断条件: pubdate: %s %d %d" % (
-                            title, rule_pubdates[0], float(min_pubdate), float(max_pubdate or 0)))
-                        return False
-
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
 
@@ -0,0 +1,57 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+
+# SQLite连接参数，每个新连接建立时执行
+SQLITE_PRAGMAS = {
+    # WAL模式下读不阻塞写，写不阻塞读
+    "journal_mode": "WAL",
+    # WAL模式下NORMAL已可保证数据库不损坏，只在检查点时同步磁盘
+    "synchronous": "NORMAL",
+    # 数据库被锁定时等待的毫秒数，避免直接报database is locked
+    "busy_timeout": 30000,
+    # 页缓存大小，负数单位为KB
+    "cache_size": -16000,
+    # 内存映射读取的最大字节数
+    "mmap_size": 256 * 1024 * 1024,
+    # 临时表和索引放在内存中
+    "temp_store": "MEMORY"
+}
+
+# 常驻连接数，SQLite同一时间只允许一个写入，连接主要用于并发读取
+POOL_SIZE = 20
+# 繁忙时允许额外创建的连接数，归还后即关闭
+POOL_MAX_OVERFLOW = 30
+# 获取连接的最长等待时间（秒）
+POOL_TIMEOUT = 30
+
+
+def create_sqlite_engine(db_path):
+    """
+    创建SQLite数据库引擎，统一设置WAL、同步模式、缓存等参数和连接池大小
+    :param db_path: 数据库文件路径
+    """
+    engine = create_engine(
+        f"sqlite:///{db_path}",
+        echo=False,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": SQLITE_PRAGMAS.get("busy_timeout") / 1000
+        },
+        poolclass=QueuePool,
+        pool_pre_ping=True,
+        pool_size=POOL_SIZE,
+        max_overflow=POOL_MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=60 * 10
+    )
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        try:
+            for key, value in SQLITE_PRAGMAS.items():
+                cursor.execute(f"PRAGMA {key}={value}")
+        finally:
+            cursor.close()
+
+    return engine
@@ -1,23 +1,19 @@
 import os
 import threading
-from sqlalchemy import create_engine, text
+from contextlib import contextmanager
+
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.pool import QueuePool
 
+from app.db.engine import create_sqlite_engine
 from app.db.models import Base
 from app.utils import ExceptionUtils, PathUtils
 from config import Config
 
 lock = threading.Lock()
-_Engine = create_engine(
-    f"sqlite:///{os.path.join(Config().get_config_path(), 'user.db')}?check_same_thread=False",
-    echo=False,
-    poolclass=QueuePool,
-    pool_pre_ping=True,
-    pool_size=100,
-    pool_recycle=60 * 10,
-    max_overflow=0
-)
+# 各线程当前工作单元的嵌套层数
+_local = threading.local()
+_Engine = create_sqlite_engine(os.path.join(Config().get_config_path(), 'user.db'))
 _Session = scoped_session(sessionmaker(bind=_Engine,
                                        autoflush=True,
                                        autocommit=False,
@@ -91,6 +87,12 @@ class MainDb:
         """
         self.session.execute(text(sql))
 
+    def execute_many(self, statement, rows):
+        """
+        按多组参数批量执行语句
+        """
+        self.session.execute(statement, rows)
+
     def flush(self):
         """
         刷写
@@ -109,6 +111,31 @@ class MainDb:
         """
         self.session.rollback()
 
+    @contextmanager
+    def unit_of_work(self):
+        """
+        工作单元，块内的所有写操作在退出时一次提交，出错时整体回滚并抛出异常，可嵌套
+        """
+        depth = getattr(_local, "depth", 0)
+        _local.depth = depth + 1
+        try:
+            yield self
+            if not depth:
+                self.commit()
+        except Exception:
+            if not depth:
+                self.rollback()
+            raise
+        finally:
+            _local.depth = depth
+
+    @staticmethod
+    def in_unit_of_work():
+        """
+        当前线程是否处于工作单元中
+        """
+        return getattr(_local, "depth", 0) > 0
+
 
 class DbPersist(object):
     """
@@ -122,9 +149,13 @@ class DbPersist(object):
         def persist(*args, **kwargs):
             try:
                 ret = f(*args, **kwargs)
-                self.db.commit()
+                # 工作单元中由工作单元统一提交
+                if not self.db.in_unit_of_work():
+                    self.db.commit()
                 return True if ret is None else ret
             except Exception as e:
+                if self.db.in_unit_of_work():
+                    raise
                 ExceptionUtils.exception_traceback(e)
                 self.db.rollback()
                 return False
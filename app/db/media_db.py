@@ -4,24 +4,18 @@ import threading
 import time
 
 from cachetools import cached, TTLCache
-from sqlalchemy import create_engine
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.pool import QueuePool
 
+from app.db.engine import create_sqlite_engine
 from app.db.models import BaseMedia, MEDIASYNCITEMS, MEDIASYNCSTATISTIC
 from app.utils import ExceptionUtils
 from config import Config
 
 lock = threading.Lock()
-_Engine = create_engine(
-    f"sqlite:///{os.path.join(Config().get_config_path(), 'media.db')}?check_same_thread=False",
-    echo=False,
-    poolclass=QueuePool,
-    pool_pre_ping=True,
-    pool_size=100,
-    pool_recycle=60 * 10,
-    max_overflow=0
-)
+# 批量写入/删除时每批的数量
+_BATCH_SIZE = 500
+_Engine = create_sqlite_engine(os.path.join(Config().get_config_path(), 'media.db'))
 _Session = scoped_session(sessionmaker(bind=_Engine,
                                        autoflush=True,
                                        autocommit=False))
@@ -37,6 +31,11 @@ class MediaDb:
     def init_db():
         with lock:
             BaseMedia.metadata.create_all(_Engine)
+            # 旧版本数据库补充ETAG字段
+            columns = [column.get("name") for column in inspect(_Engine).get_columns(MEDIASYNCITEMS.__tablename__)]
+            if "ETAG" not in columns:
+                with _Engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE {MEDIASYNCITEMS.__tablename__} ADD COLUMN ETAG TEXT"))
 
     def insert(self, server_type, iteminfo, seasoninfo):
         if not server_type or not iteminfo:
@@ -56,7 +55,8 @@ class MediaDb:
                 TMDBID=iteminfo.get("tmdbid"),
                 IMDBID=iteminfo.get("imdbid"),
                 PATH=iteminfo.get("path"),
-                JSON=json.dumps(seasoninfo)
+                JSON=json.dumps(seasoninfo),
+                ETAG=iteminfo.get("etag")
             ))
             self.session.commit()
             return True
@@ -65,6 +65,73 @@ class MediaDb:
             self.session.rollback()
         return False
 
+    def get_etags(self, server_type):
+        """
+        查询已同步项目的变更标识
+        :return: {ITEM_ID: ETAG}
+        """
+        if not server_type:
+            return {}
+        return {item_id: etag for item_id, etag in
+                self.session.query(MEDIASYNCITEMS.ITEM_ID,
+                                   MEDIASYNCITEMS.ETAG).filter(MEDIASYNCITEMS.SERVER == server_type)}
+
+    def upsert(self, server_type, items):
+        """
+        批量新增或更新项目，一批在同一个事务中完成，读取方不会看到中间状态
+        :param server_type: 媒体服务器类型
+        :param items: [(iteminfo, seasoninfo)]
+        """
+        if not server_type or not items:
+            return False
+        try:
+            for pos in range(0, len(items), _BATCH_SIZE):
+                batch = items[pos:pos + _BATCH_SIZE]
+                self.session.query(MEDIASYNCITEMS).filter(
+                    MEDIASYNCITEMS.SERVER == server_type,
+                    MEDIASYNCITEMS.ITEM_ID.in_([str(iteminfo.get("id")) for iteminfo, _ in batch])
+                ).delete(synchronize_session=False)
+                self.session.add_all([MEDIASYNCITEMS(
+                    SERVER=server_type,
+                    LIBRARY=iteminfo.get("library"),
+                    ITEM_ID=iteminfo.get("id"),
+                    ITEM_TYPE=iteminfo.get("type"),
+                    TITLE=iteminfo.get("title"),
+                    ORGIN_TITLE=iteminfo.get("originalTitle"),
+                    YEAR=iteminfo.get("year"),
+                    TMDBID=iteminfo.get("tmdbid"),
+                    IMDBID=iteminfo.get("imdbid"),
+                    PATH=iteminfo.get("path"),
+                    JSON=json.dumps(seasoninfo),
+                    ETAG=iteminfo.get("etag")
+                ) for iteminfo, seasoninfo in batch])
+                self.session.commit()
+            return True
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            self.session.rollback()
+        return False
+
+    def delete(self, server_type, item_ids):
+        """
+        批量删除项目，在同一个事务中完成
+        """
+        if not server_type or not item_ids:
+            return False
+        item_ids = list(item_ids)
+        try:
+            for pos in range(0, len(item_ids), _BATCH_SIZE):
+                self.session.query(MEDIASYNCITEMS).filter(
+                    MEDIASYNCITEMS.SERVER == server_type,
+                    MEDIASYNCITEMS.ITEM_ID.in_(item_ids[pos:pos + _BATCH_SIZE])
+                ).delete(synchronize_session=False)
+            self.session.commit()
+            return True
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            self.session.rollback()
+        return False
+
     def empty(self, server_type=None, library=None):
         try:
             if server_type and library:
@@ -150,6 +150,10 @@ class DOWNLOADER(Base):
 
 class DOWNLOADHISTORY(Base):
     __tablename__ = 'DOWNLOAD_HISTORY'
+    __table_args__ = (
+        Index('INDX_DOWNLOAD_HISTORY_DOWNLOADER', 'DOWNLOADER', 'DOWNLOAD_ID', 'DATE'),
+        Index('INDX_DOWNLOAD_HISTORY_PATH', 'SAVE_PATH', 'DATE'),
+    )
 
     ID = Column(Integer, Sequence('ID'), primary_key=True)
     TITLE = Column(Text, index=True)
@@ -204,6 +208,10 @@ class MESSAGECLIENT(Base):
 
 class RSSHISTORY(Base):
     __tablename__ = 'RSS_HISTORY'
+    __table_args__ = (
+        Index('INDX_RSS_HISTORY_NAME', 'TYPE', 'NAME', 'YEAR', 'SEASON'),
+        Index('INDX_RSS_HISTORY_TMDBID', 'TMDBID'),
+    )
 
     ID = Column(Integer, Sequence('ID'), primary_key=True)
     TYPE = Column(Text)
@@ -225,6 +233,9 @@ class RSSHISTORY(Base):
 
 class RSSMOVIES(Base):
     __tablename__ = 'RSS_MOVIES'
+    __table_args__ = (
+        Index('INDX_RSS_MOVIES_TMDBID', 'TMDBID'),
+    )
 
     ID = Column(Integer, Sequence('ID'), primary_key=True)
     NAME = Column(Text, index=True)
@@ -257,6 +268,7 @@ class RSSTORRENTS(Base):
     __tablename__ = 'RSS_TORRENTS'
     __table_args__ = (
         Index('INDX_RSS_TORRENTS_NAME', 'TITLE', 'YEAR', 'SEASON', 'EPISODE'),
+        Index('INDX_RSS_TORRENTS_TORRENT_NAME', 'TORRENT_NAME'),
     )
 
     ID = Column(Integer, Sequence('ID'), primary_key=True)
@@ -269,8 +281,27 @@ class RSSTORRENTS(Base):
     EPISODE = Column(Text)
 
 
+class RSSFEEDSTATE(Base):
+    __tablename__ = 'RSS_FEED_STATE'
+    __table_args__ = (
+        Index('UN_INDX_RSS_FEED_STATE_URL', 'URL', 'CONTEXT', unique=True),
+    )
+
+    ID = Column(Integer, Sequence('ID'), primary_key=True)
+    URL = Column(Text)
+    CONTEXT = Column(Text)
+    ETAG = Column(Text)
+    LAST_MODIFIED = Column(Text)
+    CONTENT_HASH = Column(Text)
+    ITEMS = Column(Text)
+    UPDATE_TIME = Column(Text)
+
+
 class RSSTVS(Base):
     __tablename__ = 'RSS_TVS'
+    __table_args__ = (
+        Index('INDX_RSS_TVS_TMDBID', 'TMDBID', 'SEASON'),
+    )
 
     ID = Column(Integer, Sequence('ID'), primary_key=True)
     NAME = Column(Text, index=True)
@@ -387,6 +418,9 @@ class SITEBRUSHTASK(Base):
 
 class SITEBRUSHTORRENTS(Base):
     __tablename__ = 'SITE_BRUSH_TORRENTS'
+    __table_args__ = (
+        Index('INDX_SITE_BRUSH_TORRENTS_TASK', 'TASK_ID', 'DOWNLOAD_ID'),
+    )
 
     ID = Column(Integer, Sequence('ID'), primary_key=True)
     TASK_ID = Column(Text, index=True)
@@ -488,6 +522,9 @@ class SYSTEMDICT(Base):
 
 class TRANSFERBLACKLIST(Base):
     __tablename__ = 'TRANSFER_BLACKLIST'
+    __table_args__ = (
+        Index('UN_INDX_TRANSFER_BLACKLIST_PATH', 'PATH', unique=True),
+    )
 
     ID = Column(Integer, Sequence('ID'), primary_key=True)
     PATH = Column(Text, index=True)
@@ -495,6 +532,13 @@ class TRANSFERBLACKLIST(Base):
 
 class TRANSFERHISTORY(Base):
     __tablename__ = 'TRANSFER_HISTORY'
+    __table_args__ = (
+        Index('INDX_TRANSFER_HISTORY_SOURCE', 'SOURCE_PATH', 'SOURCE_FILENAME'),
+        Index('INDX_TRANSFER_HISTORY_TMDBID', 'TMDBID', 'SEASON_EPISODE'),
+        Index('INDX_TRANSFER_HISTORY_DATE', 'DATE'),
+        Index('UN_INDX_TRANSFER_HISTORY_PATH', 'SOURCE_PATH', 'SOURCE_FILENAME', 'DEST_PATH', 'DEST_FILENAME',
+              unique=True),
+    )
 
     ID = Column(Integer, Sequence('ID'), primary_key=True)
     MODE = Column(Text)
@@ -532,6 +576,9 @@ class INDEXERSTATISTICS(Base):
 
 class TRANSFERUNKNOWN(Base):
     __tablename__ = 'TRANSFER_UNKNOWN'
+    __table_args__ = (
+        Index('UN_INDX_TRANSFER_UNKNOWN_PATH', 'PATH', unique=True),
+    )
 
     ID = Column(Integer, Sequence('ID'), primary_key=True)
     PATH = Column(Text, index=True)
@@ -579,6 +626,7 @@ class MEDIASYNCITEMS(BaseMedia):
     PATH = Column(Text)
     NOTE = Column(Text)
     JSON = Column(Text)
+    ETAG = Column(Text)
 
 
 class MEDIASYNCSTATISTIC(BaseMedia):
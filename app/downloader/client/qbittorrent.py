@@ -1,5 +1,6 @@
 import os
 import re
+import threading
 import time
 from datetime import datetime
 
@@ -21,6 +22,17 @@ class Qbittorrent(_IDownloadClient):
     # 私有属性
     _client_config = {}
     _torrent_management = False
+    # 种子状态过滤条件包含的种子状态，与QB的过滤规则一致
+    _STATUS_STATES = {
+        "downloading": ["downloading", "metaDL", "forcedMetaDL", "stalledDL", "checkingDL",
+                        "pausedDL", "stoppedDL", "queuedDL", "forcedDL"],
+        "completed": ["uploading", "stalledUP", "checkingUP", "pausedUP", "stoppedUP", "queuedUP", "forcedUP"],
+        "paused": ["pausedDL", "pausedUP", "stoppedDL", "stoppedUP"],
+        "stopped": ["pausedDL", "pausedUP", "stoppedDL", "stoppedUP"],
+        "errored": ["error", "missingFiles"]
+    }
+    # 种子列表同步间隔（秒），间隔内的查询直接使用内存中的种子列表
+    _sync_interval = 1
 
     qbc = None
     ver = None
@@ -33,6 +45,11 @@ class Qbittorrent(_IDownloadClient):
 
     def __init__(self, config):
         self._client_config = config
+        # 内存中的种子列表，通过sync/maindata增量更新
+        self._torrents = {}
+        self._rid = 0
+        self._sync_time = 0
+        self._sync_lock = threading.Lock()
         self.init_config()
         self.connect()
         # 种子自动管理模式，根据下载路径设置为下载器设置分类
@@ -176,6 +193,40 @@ class Qbittorrent(_IDownloadClient):
                 return category_name
         return None
 
+    def __sync_torrents(self):
+        """
+        通过sync/maindata增量同步种子列表，只传输上次同步后发生变化的字段
+        :return: {hash: 种子}
+        """
+        with self._sync_lock:
+            if time.time() - self._sync_time < self._sync_interval:
+                return self._torrents
+            try:
+                maindata = self.qbc.sync_maindata(rid=self._rid)
+            except Exception:
+                # 同步出错时下次全量同步
+                self._rid = 0
+                raise
+            torrents = {} if maindata.get("full_update") else dict(self._torrents)
+            for torrent_hash, changes in (maindata.get("torrents") or {}).items():
+                torrent = dict(torrents.get(torrent_hash) or {})
+                torrent.update(changes)
+                torrent["hash"] = torrent_hash
+                # 变化的种子生成新对象，已返回给调用方的种子不会被修改
+                torrents[torrent_hash] = qbittorrentapi.TorrentDictionary(torrent, client=self.qbc)
+            for torrent_hash in maindata.get("torrents_removed") or []:
+                torrents.pop(torrent_hash, None)
+            self._torrents = torrents
+            self._rid = maindata.get("rid") or 0
+            self._sync_time = time.time()
+            return torrents
+
+    def __expire_torrents(self):
+        """
+        本地修改了种子后，下次查询时立即同步
+        """
+        self._sync_time = 0
+
     def get_torrents(self, ids=None, status=None, tag=None):
         """
         获取种子列表
@@ -184,8 +235,23 @@ class Qbittorrent(_IDownloadClient):
         if not self.qbc:
             return [], True
         try:
-            torrents = self.qbc.torrents_info(torrent_hashes=ids,
-                                              status_filter=status)
+            if status and not isinstance(status, list):
+                status = [status]
+            if status and any(s not in self._STATUS_STATES for s in status):
+                torrents = self.qbc.torrents_info(torrent_hashes=ids,
+                                                  status_filter=status)
+            else:
+                torrents = list(self.__sync_torrents().values())
+                if ids:
+                    if isinstance(ids, str):
+                        ids = ids.split("|")
+                    ids = set(ids)
+                    torrents = [torrent for torrent in torrents if torrent.get("hash") in ids]
+                if status:
+                    states = set()
+                    for s in status:
+                        states.update(self._STATUS_STATES.get(s))
+                    torrents = [torrent for torrent in torrents if torrent.get("state") in states]
             if tag:
                 results = []
                 if not isinstance(tag, list):
@@ -232,6 +298,7 @@ class Qbittorrent(_IDownloadClient):
         :param ids: 种子Hash列表
         :param tag: 标签内容
         """
+        self.__expire_torrents()
         try:
             return self.qbc.torrents_delete_tags(torrent_hashes=ids, tags=tag)
         except Exception as err:
@@ -244,6 +311,7 @@ class Qbittorrent(_IDownloadClient):
         """
         if not self.qbc:
             return
+        self.__expire_torrents()
         try:
             # 打标签
             self.qbc.torrents_add_tags(tags="已整理", torrent_hashes=ids)
@@ -484,6 +552,7 @@ class Qbittorrent(_IDownloadClient):
                 category = self.__check_category(save_path)
 
             # 添加下载
+            self.__expire_torrents()
             qbc_ret = self.qbc.torrents_add(urls=urls,
                                             torrent_files=torrent_files,
                                             save_path=save_path,
@@ -505,6 +574,7 @@ class Qbittorrent(_IDownloadClient):
     def start_torrents(self, ids):
         if not self.qbc:
             return False
+        self.__expire_torrents()
         try:
             return self.qbc.torrents_resume(torrent_hashes=ids)
         except Exception as err:
@@ -514,6 +584,7 @@ class Qbittorrent(_IDownloadClient):
     def stop_torrents(self, ids):
         if not self.qbc:
             return False
+        self.__expire_torrents()
         try:
             return self.qbc.torrents_pause(torrent_hashes=ids)
         except Exception as err:
@@ -525,6 +596,7 @@ class Qbittorrent(_IDownloadClient):
             return False
         if not ids:
             return False
+        self.__expire_torrents()
         try:
             self.qbc.torrents_delete(delete_files=delete_file, torrent_hashes=ids)
             return True
@@ -1,5 +1,6 @@
 import os.path
 import re
+import threading
 import time
 from datetime import datetime
 
@@ -27,6 +28,12 @@ class Transmission(_IDownloadClient):
 
     # 私有属性
     _client_config = {}
+    # 种子列表同步间隔（秒），间隔内的查询直接使用内存中的种子列表
+    _sync_interval = 1
+    # recently-active只返回最近60秒内有变化的种子，超过该时间未同步需全量同步
+    _active_window = 50
+    # 全量同步间隔（秒）
+    _full_sync_interval = 10 * 60
 
     trc = None
     host = None
@@ -38,6 +45,11 @@ class Transmission(_IDownloadClient):
 
     def __init__(self, config):
         self._client_config = config
+        # 内存中的种子列表，通过recently-active增量更新
+        self._torrents = {}
+        self._sync_time = 0
+        self._full_sync_time = 0
+        self._sync_lock = threading.Lock()
         self.init_config()
         self.connect()
         # 设置未完成种子添加!part后缀
@@ -95,6 +107,39 @@ class Transmission(_IDownloadClient):
             ids = int(ids)
         return ids
 
+    def __sync_torrents(self):
+        """
+        通过recently-active增量同步种子列表，只查询最近有变化的种子
+        :return: {id: 种子}
+        """
+        with self._sync_lock:
+            now = time.time()
+            if now - self._sync_time < self._sync_interval:
+                return self._torrents
+            if now - self._sync_time > self._active_window \
+                    or now - self._full_sync_time > self._full_sync_interval:
+                torrents = {torrent.id: torrent for torrent in self.trc.get_torrents(arguments=self._trarg)}
+                self._full_sync_time = now
+            else:
+                active_torrents, removed_ids = self.trc.get_recently_active_torrents(arguments=self._trarg)
+                torrents = dict(self._torrents)
+                for torrent in active_torrents:
+                    torrents[torrent.id] = torrent
+                for torrent_id in removed_ids:
+                    torrents.pop(torrent_id, None)
+            self._torrents = torrents
+            self._sync_time = now
+            return torrents
+
+    def __expire_torrents(self, full=False):
+        """
+        本地修改了种子后，下次查询时立即同步
+        :param full: 是否需要全量同步，修改标签不一定会出现在recently-active中
+        """
+        self._sync_time = min(self._sync_time, time.time() - self._sync_interval)
+        if full:
+            self._full_sync_time = 0
+
     def get_torrents(self, ids=None, status=None, tag=None):
         """
         获取种子列表
@@ -104,10 +149,16 @@ class Transmission(_IDownloadClient):
             return [], True
         ids = self.__parse_ids(ids)
         try:
-            torrents = self.trc.get_torrents(ids=ids, arguments=self._trarg)
+            torrents = list(self.__sync_torrents().values())
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
             return [], True
+        if ids is not None:
+            if not isinstance(ids, list):
+                ids = [ids]
+            ids = set(str(tid) for tid in ids)
+            torrents = [torrent for torrent in torrents
+                        if str(torrent.id) in ids or torrent.hashString in ids]
         if status and not isinstance(status, list):
             status = [status]
         if tag and not isinstance(tag, list):
@@ -173,6 +224,7 @@ class Transmission(_IDownloadClient):
         else:
             tags = ["已整理"]
         # 打标签
+        self.__expire_torrents(full=True)
         try:
             self.trc.change_torrent(labels=tags, ids=ids)
             log.info(f"【{self.client_name}】{self.name} 设置种子标签成功")
@@ -186,6 +238,7 @@ class Transmission(_IDownloadClient):
         if not tid or not tag:
             return
         ids = self.__parse_ids(tid)
+        self.__expire_torrents(full=True)
         try:
             self.trc.change_torrent(labels=tag, ids=ids)
         except Exception as err:
@@ -378,6 +431,7 @@ class Transmission(_IDownloadClient):
                     download_limit=None,
                     cookie=None,
                     **kwargs):
+        self.__expire_torrents()
         try:
             ret = self.trc.add_torrent(torrent=content,
                                        download_dir=download_dir,
@@ -397,6 +451,7 @@ class Transmission(_IDownloadClient):
         if not self.trc:
             return False
         ids = self.__parse_ids(ids)
+        self.__expire_torrents()
         try:
             return self.trc.start_torrent(ids=ids)
         except Exception as err:
@@ -407,6 +462,7 @@ class Transmission(_IDownloadClient):
         if not self.trc:
             return False
         ids = self.__parse_ids(ids)
+        self.__expire_torrents()
         try:
             return self.trc.stop_torrent(ids=ids)
         except Exception as err:
@@ -419,6 +475,7 @@ class Transmission(_IDownloadClient):
         if not ids:
             return False
         ids = self.__parse_ids(ids)
+        self.__expire_torrents()
         try:
             return self.trc.remove_torrent(delete_data=delete_file, ids=ids)
         except Exception as err:
@@ -1380,6 +1380,14 @@ class Downloader:
         return self.dbhelper.get_download_history_by_downloader(downloader=downloader,
                                                                 download_id=download_id)
 
+    def get_download_history_by_downloader_ids(self, downloader, download_ids):
+        """
+        根据下载器和下载ID批量查询下载历史记录
+        :return: {下载ID: 下载记录}
+        """
+        return self.dbhelper.get_download_history_by_downloader_ids(downloader=downloader,
+                                                                    download_ids=download_ids)
+
     def update_downloader(self,
                           did,
                           name,
@@ -4,15 +4,17 @@ import random
 import re
 import shutil
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from enum import Enum
-from threading import Lock
+from threading import Lock, BoundedSemaphore
 from time import sleep
 
 import log
 from app.conf import ModuleConf
 from app.helper import DbHelper, ProgressHelper
 from app.helper import ThreadHelper
-from app.media import Media, Category, Scraper
+from app.media import Media, Category, Scraper, ScraperSession
 from app.media.meta import MetaInfo
 from app.message import Message
 from app.plugins import EventManager
@@ -25,6 +27,129 @@ from config import RMT_AUDIO_TRACK_EXT, RMT_SUBEXT, RMT_MEDIAEXT, RMT_FAVTYPE, R
 lock = Lock()
 
 
+class DeviceLimiter:
+    """
+    按目的设备限制同时进行的转移命令数，代替全局锁：
+    不同磁盘之间互不影响，同一磁盘上的复制/移动串行，硬链接/软链接只修改元数据可适当并发
+    """
+    # 复制、移动等需要搬运数据的方式，每个设备同时进行的数量
+    _data_limit = 1
+    # 硬链接、软链接，每个设备同时进行的数量
+    _link_limit = 4
+    _semaphores = {}
+
+    def __init__(self):
+        self._semaphores = {}
+
+    @staticmethod
+    def __get_device(target_file, rmt_mode):
+        """
+        计算目的文件所在设备，远程存储按转移方式区分
+        """
+        if rmt_mode in ModuleConf.REMOTE_RMT_MODES:
+            return "remote:%s" % rmt_mode.value
+        path = os.path.dirname(target_file)
+        while path and not os.path.exists(path):
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            return path
+
+    @contextmanager
+    def acquire(self, target_file, rmt_mode):
+        """
+        获取目的设备的转移许可
+        """
+        device = self.__get_device(target_file, rmt_mode)
+        link_flag = rmt_mode in [RmtMode.LINK, RmtMode.SOFTLINK]
+        with lock:
+            semaphore = self._semaphores.get((device, link_flag))
+            if not semaphore:
+                semaphore = BoundedSemaphore(self._link_limit if link_flag else self._data_limit)
+                self._semaphores[(device, link_flag)] = semaphore
+        with semaphore:
+            yield
+
+
+device_limiter = DeviceLimiter()
+
+
+class TransferSession:
+    """
+    一次转移过程中产生的转移历史、黑名单、未识别记录，先在内存中汇总，按批在一个事务中写入
+    """
+    # 每批写入的记录数
+    _batch_size = 100
+
+    def __init__(self, dbhelper):
+        self.dbhelper = dbhelper
+        self._lock = Lock()
+        self._histories = []
+        self._blacklist = []
+        self._unknowns = []
+
+    def add_history(self, in_from, rmt_mode, in_path, out_path, dest, media_info):
+        """
+        登记识别转移记录
+        """
+        row = self.dbhelper.get_transfer_history_row(in_from=in_from,
+                                                     rmt_mode=rmt_mode,
+                                                     in_path=in_path,
+                                                     out_path=out_path,
+                                                     dest=dest,
+                                                     media_info=media_info)
+        if row:
+            self.__append(self._histories, row)
+
+    def add_blacklist(self, path):
+        """
+        登记黑名单
+        """
+        if path:
+            self.__append(self._blacklist, path)
+
+    def add_unknown(self, path, dest, rmt_mode):
+        """
+        登记未识别记录
+        """
+        if path:
+            self.__append(self._unknowns, (path, dest, rmt_mode))
+
+    def __append(self, records, record):
+        with self._lock:
+            records.append(record)
+            full = len(self._histories) + len(self._blacklist) + len(self._unknowns) >= self._batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """
+        写入所有已登记的记录
+        """
+        with self._lock:
+            histories, self._histories = self._histories, []
+            blacklist, self._blacklist = self._blacklist, []
+            unknowns, self._unknowns = self._unknowns, []
+        if not histories and not blacklist and not unknowns:
+            return
+        if self.dbhelper.insert_transfer_records(histories=histories,
+                                                 blacklist=blacklist,
+                                                 unknowns=unknowns):
+            return
+        # 数据库缺少唯一索引等原因批量写入失败时逐条写入
+        log.warn("【Rmt】批量写入转移记录失败，改为逐条写入")
+        for row in histories:
+            self.dbhelper.insert_transfer_history_row(row)
+        for path in blacklist:
+            self.dbhelper.insert_transfer_blacklist(path)
+        for path, dest, rmt_mode in unknowns:
+            self.dbhelper.insert_transfer_unknown(path, dest, rmt_mode)
+
+
 @singleton
 class FileTransfer:
     media = None
@@ -54,6 +179,7 @@ class FileTransfer:
     _tv_file_rmt_format = ""
     _ignored_paths = []
     _ignored_files = ''
+    _transfer_threads = 4
 
     def __init__(self):
         self.init_config()
@@ -130,6 +256,10 @@ class FileTransfer:
                     r'%s' % re.sub(r';', r'|', ignored_files))
             # 高质量文件覆盖
             self._filesize_cover = media.get('filesize_cover')
+            # 同时转移的文件数
+            transfer_threads = media.get('transfer_threads')
+            if str(transfer_threads).isdigit() and int(transfer_threads) > 0:
+                self._transfer_threads = int(transfer_threads)
             # 电影重命名格式
             movie_name_format = media.get(
                 'movie_name_format') or DEFAULT_MOVIE_FORMAT
@@ -157,7 +287,7 @@ class FileTransfer:
         :param target_file: 目标文件路径
         :param rmt_mode: RmtMode转移方式
         """
-        with lock:
+        with device_limiter.acquire(target_file, rmt_mode):
             if rmt_mode == RmtMode.LINK:
                 # 更链接
                 retcode, retmsg = SystemUtils.link(file_item, target_file)
@@ -348,18 +478,20 @@ class FileTransfer:
                     log.error("【Rmt】音轨文件 %s %s失败：%s" % (file_name, rmt_mode.value, str(reason)))
         return 0
 
-    def __transfer_bluray_dir(self, file_path, new_path, rmt_mode):
+    def __transfer_bluray_dir(self, file_path, new_path, rmt_mode, session):
         """
         转移蓝光文件夹
         :param file_path: 原路径
         :param new_path: 新路径
         :param rmt_mode: RmtMode转移方式
+        :param session: 转移记录
         """
         log.info("【Rmt】正在%s目录：%s 到 %s" % (rmt_mode.value, file_path, new_path))
         # 复制
         retcode = self.__transfer_dir_files(src_dir=file_path,
                                             target_dir=new_path,
                                             rmt_mode=rmt_mode,
+                                            session=session,
                                             bludir=True)
         if retcode == 0:
             log.info("【Rmt】文件 %s %s完成" % (file_path, rmt_mode.value))
@@ -390,12 +522,13 @@ class FileTransfer:
                 return True
         return False
 
-    def __transfer_dir_files(self, src_dir, target_dir, rmt_mode, bludir=False):
+    def __transfer_dir_files(self, src_dir, target_dir, rmt_mode, session, bludir=False):
         """
         按目录结构转移所有文件
         :param src_dir: 原路径
         :param target_dir: 新路径
         :param rmt_mode: RmtMode转移方式
+        :param session: 转移记录
         :param bludir: 是否蓝光目录
         """
         file_list = PathUtils.get_dir_files(src_dir)
@@ -415,17 +548,18 @@ class FileTransfer:
                 break
             else:
                 if not bludir:
-                    self.dbhelper.insert_transfer_blacklist(file)
+                    session.add_blacklist(file)
         if retcode == 0 and bludir:
-            self.dbhelper.insert_transfer_blacklist(src_dir)
+            session.add_blacklist(src_dir)
         return retcode
 
-    def __transfer_origin_file(self, file_item, target_dir, rmt_mode):
+    def __transfer_origin_file(self, file_item, target_dir, rmt_mode, session):
         """
         按原文件名link文件到目的目录
         :param file_item: 原文件路径
         :param target_dir: 目的目录
         :param rmt_mode: RmtMode转移方式
+        :param session: 转移记录
         """
         if not file_item or not target_dir:
             return -1
@@ -444,7 +578,8 @@ class FileTransfer:
                      (rmt_mode.value, file_item, target_dir))
             retcode = self.__transfer_dir_files(src_dir=file_item,
                                                 target_dir=target_dir,
-                                                rmt_mode=rmt_mode)
+                                                rmt_mode=rmt_mode,
+                                                session=session)
         # 文件
         else:
             target_file = os.path.join(target_dir, os.path.basename(file_item))
@@ -455,7 +590,7 @@ class FileTransfer:
                                               target_file=target_file,
                                               rmt_mode=rmt_mode)
             if retcode == 0:
-                self.dbhelper.insert_transfer_blacklist(file_item)
+                session.add_blacklist(file_item)
         if retcode == 0:
             log.info("【Rmt】%s %s到unknown完成" % (file_item, rmt_mode.value))
         else:
@@ -463,12 +598,13 @@ class FileTransfer:
                       (file_item, rmt_mode.value, retcode))
         return retcode
 
-    def __transfer_file(self, file_item, new_file, rmt_mode, over_flag=False, old_file=None):
+    def __transfer_file(self, file_item, new_file, rmt_mode, session, over_flag=False, old_file=None):
         """
         转移一个文件，同时处理其他相关文件
         :param file_item: 原文件路径
         :param new_file: 新文件路径
         :param rmt_mode: RmtMode转移方式
+        :param session: 转移记录
         :param over_flag: 是否覆盖，为True时会先删除再转移
         """
         file_name = os.path.basename(file_item)
@@ -484,7 +620,7 @@ class FileTransfer:
                                           rmt_mode=rmt_mode)
         if retcode == 0:
             log.info("【Rmt】文件 %s %s完成" % (file_name, rmt_mode.value))
-            self.dbhelper.insert_transfer_blacklist(file_item)
+            session.add_blacklist(file_item)
         else:
             log.error("【Rmt】文件 %s %s失败，错误码 %s" %
                       (file_name, rmt_mode.value, str(retcode)))
@@ -527,7 +663,11 @@ class FileTransfer:
         :return: 处理状态，错误信息
         """
 
+        # 本次转移的数据库记录，结束时统一写入
+        transfer_session = TransferSession(self.dbhelper)
+
         def __finish_transfer(status, message):
+            transfer_session.flush()
             if status:
                 self.progress.update(ptype=ProgressKey.FileTransfer,
                                      value=100,
@@ -656,150 +796,77 @@ class FileTransfer:
 
         # 电视剧可能有多集，如果在循环里发消息就太多了，要在外面发消息
         message_medias = {}
+        message_lock = Lock()
 
-        # 处理识别后的每一个文件或单个文件夹
-        for file_item, media in Medias.items():
-            try:
-                # 总数量
-                total_count = total_count + 1
-
-                if not udf_flag:
-                    if re.search(r'[./\s\[]+Sample[/.\s\]]+', file_item, re.IGNORECASE):
-                        log.warn("【Rmt】%s 可能是预告片，跳过..." % file_item)
-                        continue
+        # 多个文件时识别、判断等在当前线程按顺序进行，文件转移及后续处理并发进行
+        # 自定义转移遇错即停、蓝光原盘只有一个目录，均按顺序处理
+        if not udf_flag and not bluray_disk_dir and len(Medias) > 1 and self._transfer_threads > 1:
+            executor = ThreadPoolExecutor(max_workers=self._transfer_threads)
+        else:
+            executor = None
+        # 各文件共享的刮削会话，同一剧集的nfo和图片只写入一次
+        scraper_session = ScraperSession(self.media)
+        # 已提交的转移任务
+        transfer_tasks = []
+        # 已提交任务的目的文件，同一目的文件需等前面的任务完成后再判断
+        planned_files = set()
+
+        def __handle_result(result):
+            """
+            汇总单个文件的转移结果
+            """
+            nonlocal success_flag, error_message, failed_count, alert_count
+            if not result:
+                return
+            ret, ret_message = result
+            if ret == 0:
+                return
+            success_flag = False
+            error_message = ret_message
+            self.progress.update(ptype=ProgressKey.FileTransfer, text=error_message)
+            failed_count += 1
+            alert_count += 1
+            if error_message not in alert_messages:
+                alert_messages.append(error_message)
+
+        def __wait_tasks():
+            """
+            等待已提交的转移任务全部完成
+            """
+            for task in transfer_tasks:
+                __handle_result(task.result())
+            transfer_tasks.clear()
+            planned_files.clear()
 
-                # 文件名
-                file_name = os.path.basename(file_item)
-                # 更新进度
-                self.progress.update(ptype=ProgressKey.FileTransfer,
-                                     value=round(total_count / len(Medias) * 100) - (0.5 / len(Medias) * 100),
-                                     text="正在处理：%s ..." % file_name)
+        try:
+            # 处理识别后的每一个文件或单个文件夹
+            for file_item, media in Medias.items():
+                try:
+                    # 总数量
+                    total_count = total_count + 1
 
-                # 数据库记录的路径
-                if bluray_disk_dir:
-                    reg_path = bluray_disk_dir
-                else:
-                    reg_path = file_item
-                # 未识别
-                if not media or not media.tmdb_info or not media.get_title_string():
-                    log.warn("【Rmt】%s 无法识别媒体信息！" % file_name)
-                    success_flag = False
-                    error_message = "无法识别媒体信息"
-                    self.progress.update(ptype=ProgressKey.FileTransfer, text=error_message)
-                    if udf_flag:
-                        return __finish_transfer(success_flag, error_message)
-                    # 记录未识别
-                    is_need_insert_unknown = self.dbhelper.is_need_insert_transfer_unknown(
-                        reg_path)
-                    if is_need_insert_unknown:
-                        self.dbhelper.insert_transfer_unknown(
-                            reg_path, target_dir, rmt_mode)
-                        alert_count += 1
-                    failed_count += 1
-                    if error_message not in alert_messages and is_need_insert_unknown:
-                        alert_messages.append(error_message)
-                    # 原样转移过去
-                    if unknown_dir:
-                        log.warn("【Rmt】%s 按原文件名转移到未识别目录：%s" %
-                                 (file_name, unknown_dir))
-                        self.__transfer_origin_file(
-                            file_item=file_item, target_dir=unknown_dir, rmt_mode=rmt_mode)
-                    elif self._unknown_path:
-                        unknown_path = self.__get_best_unknown_path(in_path)
-                        if not unknown_path:
+                    if not udf_flag:
+                        if re.search(r'[./\s\[]+Sample[/.\s\]]+', file_item, re.IGNORECASE):
+                            log.warn("【Rmt】%s 可能是预告片，跳过..." % file_item)
                             continue
-                        log.warn("【Rmt】%s 按原文件名转移到未识别目录：%s" %
-                                 (file_name, unknown_path))
-                        self.__transfer_origin_file(
-                            file_item=file_item, target_dir=unknown_path, rmt_mode=rmt_mode)
-                    else:
-                        log.error("【Rmt】%s 无法识别媒体信息！" % file_name)
-                    continue
-                # 当前文件大小
-                media.size = os.path.getsize(file_item)
-                # 目的目录，有输入target_dir时，往这个目录放
-                if target_dir:
-                    dist_path = target_dir
-                else:
-                    dist_path = self.get_best_target_path(
-                        mtype=media.type, in_path=in_path, size=media.size)
-                if not dist_path:
-                    log.error("【Rmt】文件转移失败，目的路径不存在！")
-                    success_flag = False
-                    error_message = "目的路径不存在"
-                    failed_count += 1
-                    alert_count += 1
-                    if error_message not in alert_messages:
-                        alert_messages.append(error_message)
-                    continue
-                if dist_path and not os.path.exists(dist_path) and rmt_mode not in ModuleConf.REMOTE_RMT_MODES:
-                    return __finish_transfer(False, "目录不存在：%s" % dist_path)
-
-                # 判断文件是否已存在，返回：目录存在标志、目录名、文件存在标志、文件名
-                dir_exist_flag, ret_dir_path, file_exist_flag, ret_file_path = self.__is_media_exists(
-                    dist_path, media)
-                # 新文件后缀
-                file_ext = os.path.splitext(file_item)[-1]
-                new_file = ret_file_path
-                # 已存在的文件数量
-                exist_filenum = 0
-                handler_flag = False
-                # 路径存在
-                if dir_exist_flag:
-                    # 蓝光原盘
+
+                    # 文件名
+                    file_name = os.path.basename(file_item)
+                    # 更新进度
+                    self.progress.update(ptype=ProgressKey.FileTransfer,
+                                         value=round(total_count / len(Medias) * 100) - (0.5 / len(Medias) * 100),
+                                         text="正在处理：%s ..." % file_name)
+
+                    # 数据库记录的路径
                     if bluray_disk_dir:
-                        log.warn("【Rmt】蓝光原盘目录已存在：%s" % ret_dir_path)
-                        if udf_flag:
-                            return __finish_transfer(False, "蓝光原盘目录已存在：%s" % ret_dir_path)
-                        failed_count += 1
-                        continue
-                    # 文件存在
-                    if file_exist_flag:
-                        exist_filenum = exist_filenum + 1
-                        if rmt_mode != RmtMode.SOFTLINK:
-                            orgin_file_size = os.path.getsize(ret_file_path)
-                            if media.size > orgin_file_size and self._filesize_cover or udf_flag:
-                                # 原文件
-                                old_file = ret_file_path
-                                # 拆分后缀
-                                ret_file_path, ret_file_ext = os.path.splitext(ret_file_path)
-                                # 新文件
-                                new_file = "%s%s" % (ret_file_path, file_ext)
-                                # 覆盖
-                                log.info(
-                                    f"【Rmt】文件 {old_file} 已存在，原文件大小：{orgin_file_size}，新文件大小：{media.size}，覆盖为 {new_file} ...")
-                                ret = self.__transfer_file(file_item=file_item,
-                                                           new_file=new_file,
-                                                           rmt_mode=rmt_mode,
-                                                           over_flag=True,
-                                                           old_file=old_file)
-                                if ret != 0:
-                                    success_flag = False
-                                    error_message = "文件转移失败，错误码 %s" % ret
-                                    self.progress.update(ptype=ProgressKey.FileTransfer, text=error_message)
-                                    if udf_flag:
-                                        return __finish_transfer(success_flag, error_message)
-                                    failed_count += 1
-                                    alert_count += 1
-                                    if error_message not in alert_messages:
-                                        alert_messages.append(error_message)
-                                    continue
-                                handler_flag = True
-                            else:
-                                log.warn("【Rmt】文件 %s 已存在" % ret_file_path)
-                                failed_count += 1
-                                continue
-                        else:
-                            log.warn("【Rmt】文件 %s 已存在" % ret_file_path)
-                            failed_count += 1
-                            continue
-                # 路径不存在
-                else:
-                    if not ret_dir_path:
-                        log.error("【Rmt】拼装目录路径错误，无法从文件名中识别出季集信息：%s" %
-                                  file_item)
+                        reg_path = bluray_disk_dir
+                    else:
+                        reg_path = file_item
+                    # 未识别
+                    if not media or not media.tmdb_info or not media.get_title_string():
+                        log.warn("【Rmt】%s 无法识别媒体信息！" % file_name)
                         success_flag = False
-                        error_message = "识别失败，无法从文件名中识别出季集信息"
+                        error_message = "无法识别媒体信息"
                         self.progress.update(ptype=ProgressKey.FileTransfer, text=error_message)
                         if udf_flag:
                             return __finish_transfer(success_flag, error_message)
@@ -807,40 +874,105 @@ class FileTransfer:
                         is_need_insert_unknown = self.dbhelper.is_need_insert_transfer_unknown(
                             reg_path)
                         if is_need_insert_unknown:
-                            self.dbhelper.insert_transfer_unknown(
-                                reg_path, target_dir, rmt_mode)
+                            transfer_session.add_unknown(reg_path, target_dir, rmt_mode)
                             alert_count += 1
                         failed_count += 1
                         if error_message not in alert_messages and is_need_insert_unknown:
                             alert_messages.append(error_message)
+                        # 原样转移过去
+                        if unknown_dir:
+                            log.warn("【Rmt】%s 按原文件名转移到未识别目录：%s" %
+                                     (file_name, unknown_dir))
+                            self.__transfer_origin_file(
+                                file_item=file_item, target_dir=unknown_dir, rmt_mode=rmt_mode, session=transfer_session)
+                        elif self._unknown_path:
+                            unknown_path = self.__get_best_unknown_path(in_path)
+                            if not unknown_path:
+                                continue
+                            log.warn("【Rmt】%s 按原文件名转移到未识别目录：%s" %
+                                     (file_name, unknown_path))
+                            self.__transfer_origin_file(
+                                file_item=file_item, target_dir=unknown_path, rmt_mode=rmt_mode, session=transfer_session)
+                        else:
+                            log.error("【Rmt】%s 无法识别媒体信息！" % file_name)
                         continue
-                    elif rmt_mode not in ModuleConf.REMOTE_RMT_MODES:
-                        # 创建目录
-                        log.debug("【Rmt】正在创建目录：%s" % ret_dir_path)
-                        os.makedirs(ret_dir_path)
-                # 转移蓝光原盘
-                if bluray_disk_dir:
-                    ret = self.__transfer_bluray_dir(
-                        file_item, ret_dir_path, rmt_mode)
-                    if ret != 0:
+                    # 当前文件大小
+                    media.size = os.path.getsize(file_item)
+                    # 目的目录，有输入target_dir时，往这个目录放
+                    if target_dir:
+                        dist_path = target_dir
+                    else:
+                        dist_path = self.get_best_target_path(
+                            mtype=media.type, in_path=in_path, size=media.size)
+                    if not dist_path:
+                        log.error("【Rmt】文件转移失败，目的路径不存在！")
                         success_flag = False
-                        error_message = "蓝光目录转移失败，错误码：%s" % ret
-                        self.progress.update(ptype=ProgressKey.FileTransfer, text=error_message)
-                        if udf_flag:
-                            return __finish_transfer(success_flag, error_message)
+                        error_message = "目的路径不存在"
                         failed_count += 1
                         alert_count += 1
                         if error_message not in alert_messages:
                             alert_messages.append(error_message)
                         continue
-                else:
-                    # 开始转移文件
-                    if not handler_flag:
-                        if not ret_file_path:
-                            log.error("【Rmt】拼装文件路径错误，无法从文件名中识别出集数：%s" %
+                    if dist_path and not os.path.exists(dist_path) and rmt_mode not in ModuleConf.REMOTE_RMT_MODES:
+                        __wait_tasks()
+                        return __finish_transfer(False, "目录不存在：%s" % dist_path)
+
+                    # 判断文件是否已存在，返回：目录存在标志、目录名、文件存在标志、文件名
+                    dir_exist_flag, ret_dir_path, file_exist_flag, ret_file_path = self.__is_media_exists(
+                        dist_path, media)
+                    if ret_file_path and ret_file_path in planned_files:
+                        # 与未完成的任务目的文件相同（如同一集的多个版本），等待完成后重新判断
+                        __wait_tasks()
+                        dir_exist_flag, ret_dir_path, file_exist_flag, ret_file_path = self.__is_media_exists(
+                            dist_path, media)
+                    # 新文件后缀
+                    file_ext = os.path.splitext(file_item)[-1]
+                    new_file = ret_file_path
+                    # 已存在的文件数量
+                    exist_filenum = 0
+                    # 覆盖时的原文件
+                    old_file = None
+                    handler_flag = False
+                    # 路径存在
+                    if dir_exist_flag:
+                        # 蓝光原盘
+                        if bluray_disk_dir:
+                            log.warn("【Rmt】蓝光原盘目录已存在：%s" % ret_dir_path)
+                            if udf_flag:
+                                return __finish_transfer(False, "蓝光原盘目录已存在：%s" % ret_dir_path)
+                            failed_count += 1
+                            continue
+                        # 文件存在
+                        if file_exist_flag:
+                            exist_filenum = exist_filenum + 1
+                            if rmt_mode != RmtMode.SOFTLINK:
+                                orgin_file_size = os.path.getsize(ret_file_path)
+                                if media.size > orgin_file_size and self._filesize_cover or udf_flag:
+                                    # 原文件
+                                    old_file = ret_file_path
+                                    # 拆分后缀
+                                    ret_file_path, ret_file_ext = os.path.splitext(ret_file_path)
+                                    # 新文件
+                                    new_file = "%s%s" % (ret_file_path, file_ext)
+                                    # 覆盖
+                                    log.info(
+                                        f"【Rmt】文件 {old_file} 已存在，原文件大小：{orgin_file_size}，新文件大小：{media.size}，覆盖为 {new_file} ...")
+                                    handler_flag = True
+                                else:
+                                    log.warn("【Rmt】文件 %s 已存在" % ret_file_path)
+                                    failed_count += 1
+                                    continue
+                            else:
+                                log.warn("【Rmt】文件 %s 已存在" % ret_file_path)
+                                failed_count += 1
+                                continue
+                    # 路径不存在
+                    else:
+                        if not ret_dir_path:
+                            log.error("【Rmt】拼装目录路径错误，无法从文件名中识别出季集信息：%s" %
                                       file_item)
                             success_flag = False
-                            error_message = "识别失败，无法从文件名中识别出集数"
+                            error_message = "识别失败，无法从文件名中识别出季集信息"
                             self.progress.update(ptype=ProgressKey.FileTransfer, text=error_message)
                             if udf_flag:
                                 return __finish_transfer(success_flag, error_message)
@@ -848,106 +980,82 @@ class FileTransfer:
                             is_need_insert_unknown = self.dbhelper.is_need_insert_transfer_unknown(
                                 reg_path)
                             if is_need_insert_unknown:
-                                self.dbhelper.insert_transfer_unknown(
-                                    reg_path, target_dir, rmt_mode)
+                                transfer_session.add_unknown(reg_path, target_dir, rmt_mode)
                                 alert_count += 1
                             failed_count += 1
                             if error_message not in alert_messages and is_need_insert_unknown:
                                 alert_messages.append(error_message)
                             continue
-                        new_file = "%s%s" % (ret_file_path, file_ext)
-                        ret = self.__transfer_file(file_item=file_item,
-                                                   new_file=new_file,
-                                                   rmt_mode=rmt_mode,
-                                                   over_flag=False)
-                        if ret != 0:
+                        elif rmt_mode not in ModuleConf.REMOTE_RMT_MODES:
+                            # 创建目录
+                            log.debug("【Rmt】正在创建目录：%s" % ret_dir_path)
+                            os.makedirs(ret_dir_path, exist_ok=True)
+                    if not bluray_disk_dir and not handler_flag:
+                        if not ret_file_path:
+                            log.error("【Rmt】拼装文件路径错误，无法从文件名中识别出集数：%s" %
+                                      file_item)
                             success_flag = False
-                            error_message = "文件转移失败，错误码 %s" % ret
+                            error_message = "识别失败，无法从文件名中识别出集数"
                             self.progress.update(ptype=ProgressKey.FileTransfer, text=error_message)
                             if udf_flag:
                                 return __finish_transfer(success_flag, error_message)
+                            # 记录未识别
+                            is_need_insert_unknown = self.dbhelper.is_need_insert_transfer_unknown(
+                                reg_path)
+                            if is_need_insert_unknown:
+                                transfer_session.add_unknown(reg_path, target_dir, rmt_mode)
+                                alert_count += 1
                             failed_count += 1
-                            alert_count += 1
-                            if error_message not in alert_messages:
+                            if error_message not in alert_messages and is_need_insert_unknown:
                                 alert_messages.append(error_message)
                             continue
-                # 查询TMDB详情，需要全部数据
-                media.set_tmdb_info(self.media.get_tmdb_info(mtype=media.type,
-                                                             tmdbid=media.tmdb_id,
-                                                             append_to_response="all"))
-                # 输出路径
-                out_path = new_file if not bluray_disk_dir else ret_dir_path
-                # 转移历史记录
-                self.dbhelper.insert_transfer_history(
-                    in_from=in_from,
-                    rmt_mode=rmt_mode,
-                    in_path=reg_path,
-                    out_path=out_path,
-                    dest=dist_path,
-                    media_info=media)
-                # 未识别手动识别或历史记录重新识别的批处理模式
-                if isinstance(episode[1], bool) and episode[1]:
-                    # 未识别手动识别，更改未识别记录为已处理
-                    self.update_transfer_unknown_state(file_item)
-                # 电影立即发送消息
-                if media.type == MediaType.MOVIE:
-                    self.message.send_transfer_movie_message(in_from,
-                                                             media,
-                                                             exist_filenum,
-                                                             self._movie_category_flag)
-                # 否则登记汇总发消息
-                else:
-                    # 按季汇总
-                    message_key = "%s-%s" % (media.get_title_string(),
-                                             media.get_season_string())
-                    if not message_medias.get(message_key):
-                        message_medias[message_key] = media
-                    # 汇总集数、大小
-                    if not message_medias[message_key].is_in_episode(media.get_episode_list()):
-                        message_medias[message_key].total_episodes += media.total_episodes
-                        message_medias[message_key].size += media.size
-                # 生成nfo及poster
-                if bluray_disk_dir and media.type == MediaType.MOVIE:
-                    # 原盘文件的情况下 使用目录名称.nfo 生成
-                    self.scraper.gen_scraper_files(media=media,
-                                                   dir_path=ret_dir_path,
-                                                   file_name=os.path.basename(ret_dir_path),
-                                                   file_ext=file_ext,
-                                                   rmt_mode=rmt_mode)
-                else:
-                    self.scraper.gen_scraper_files(media=media,
-                                                   dir_path=ret_dir_path,
-                                                   file_name=os.path.basename(ret_file_path),
-                                                   file_ext=file_ext,
-                                                   rmt_mode=rmt_mode)
-                # 更新进度
-                self.progress.update(ptype=ProgressKey.FileTransfer,
-                                     value=round(total_count / len(Medias) * 100),
-                                     text="%s 转移完成" % file_name)
-                # 移动模式随机休眠（兼容一些网盘挂载目录）
-                if rmt_mode == RmtMode.MOVE:
-                    sleep(round(random.uniform(0, 1), 1))
-
-                # 解发字幕下载事件
-                self.eventmanager.send_event(EventType.SubtitleDownload, {
-                    "media_info": media.to_dict(),
-                    "file": ret_file_path,
-                    "file_ext": os.path.splitext(file_item)[-1],
-                    "bluray": True if bluray_disk_dir else False
-                })
-                # 解发转移完成事件
-                self.eventmanager.send_event(EventType.TransferFinished, {
-                    "in_path": in_path,
-                    "file": file_item,
-                    "target_path": out_path,
-                    "dest": dist_path,
-                    "media_info": media.to_dict()
-                })
-
-            except Exception as err:
-                ExceptionUtils.exception_traceback(err)
-                log.error("【Rmt】文件转移时发生错误：%s - %s" %
-                          (str(err), traceback.format_exc()))
+                        new_file = "%s%s" % (ret_file_path, file_ext)
+                    # 转移文件及后续处理
+                    transfer_kwargs = {
+                        "in_from": in_from,
+                        "in_path": in_path,
+                        "rmt_mode": rmt_mode,
+                        "file_item": file_item,
+                        "reg_path": reg_path,
+                        "media": media,
+                        "dist_path": dist_path,
+                        "ret_dir_path": ret_dir_path,
+                        "ret_file_path": ret_file_path,
+                        "new_file": new_file,
+                        "old_file": old_file,
+                        "over_flag": handler_flag,
+                        "bluray_disk_dir": bluray_disk_dir,
+                        "exist_filenum": exist_filenum,
+                        "episode": episode,
+                        "progress_value": round(total_count / len(Medias) * 100),
+                        "message_medias": message_medias,
+                        "message_lock": message_lock,
+                        "session": transfer_session,
+                        "scraper_session": scraper_session
+                    }
+                    if executor:
+                        planned_files.add(ret_file_path)
+                        transfer_tasks.append(executor.submit(self.__transfer_media_file, **transfer_kwargs))
+                    else:
+                        result = self.__transfer_media_file(**transfer_kwargs)
+                        if udf_flag and result and result[0] != 0:
+                            self.progress.update(ptype=ProgressKey.FileTransfer, text=result[1])
+                            return __finish_transfer(False, result[1])
+                        __handle_result(result)
+                except Exception as err:
+                    ExceptionUtils.exception_traceback(err)
+                    log.error("【Rmt】文件转移时发生错误：%s - %s" %
+                              (str(err), traceback.format_exc()))
+            # 等待所有转移任务完成
+            if executor:
+                __wait_tasks()
+        finally:
+            # 提前返回或出错时也要关闭线程池
+            if executor:
+                executor.shutdown()
+            # 等待刮削图片保存完成
+            scraper_session.close()
+        transfer_session.flush()
         # 循环结束
         # 统计完成情况，发送通知
         if message_medias:
@@ -972,12 +1080,138 @@ class FileTransfer:
                     and os.path.exists(in_path) \
                     and os.path.isdir(in_path) \
                     and not root_path \
-                    and not PathUtils.get_dir_files(in_path=in_path, exts=RMT_MEDIAEXT) \
-                    and not PathUtils.get_dir_files(in_path=in_path, exts=['.!qb', '.part']):
+                    and not PathUtils.has_dir_files(in_path=in_path, exts=RMT_MEDIAEXT) \
+                    and not PathUtils.has_dir_files(in_path=in_path, exts=['.!qb', '.part']):
                 log.info("【Rmt】目录下已无媒体文件及正在下载的文件，移动模式下删除目录：%s" % in_path)
                 shutil.rmtree(in_path)
         return __finish_transfer(success_flag, error_message)
 
+    def __transfer_media_file(self,
+                              in_from,
+                              in_path,
+                              rmt_mode,
+                              file_item,
+                              reg_path,
+                              media,
+                              dist_path,
+                              ret_dir_path,
+                              ret_file_path,
+                              new_file,
+                              old_file,
+                              over_flag,
+                              bluray_disk_dir,
+                              exist_filenum,
+                              episode,
+                              progress_value,
+                              message_medias,
+                              message_lock,
+                              session,
+                              scraper_session=None):
+        """
+        转移单个文件并完成记录历史、发送消息、刮削等后续处理，可在线程池中执行
+        :return: 错误码、错误信息，发生异常时返回None
+        """
+        try:
+            file_name = os.path.basename(file_item)
+            file_ext = os.path.splitext(file_item)[-1]
+            # 转移蓝光原盘
+            if bluray_disk_dir:
+                ret = self.__transfer_bluray_dir(
+                    file_item, ret_dir_path, rmt_mode, session)
+                if ret != 0:
+                    return ret, "蓝光目录转移失败，错误码：%s" % ret
+            else:
+                # 开始转移文件
+                ret = self.__transfer_file(file_item=file_item,
+                                           new_file=new_file,
+                                           rmt_mode=rmt_mode,
+                                           session=session,
+                                           over_flag=over_flag,
+                                           old_file=old_file)
+                if ret != 0:
+                    return ret, "文件转移失败，错误码 %s" % ret
+            # 查询TMDB详情，需要全部数据
+            media.set_tmdb_info(self.media.get_tmdb_info(mtype=media.type,
+                                                         tmdbid=media.tmdb_id,
+                                                         append_to_response="all"))
+            # 输出路径
+            out_path = new_file if not bluray_disk_dir else ret_dir_path
+            # 转移历史记录
+            session.add_history(
+                in_from=in_from,
+                rmt_mode=rmt_mode,
+                in_path=reg_path,
+                out_path=out_path,
+                dest=dist_path,
+                media_info=media)
+            # 未识别手动识别或历史记录重新识别的批处理模式
+            if isinstance(episode[1], bool) and episode[1]:
+                # 未识别手动识别，更改未识别记录为已处理
+                self.update_transfer_unknown_state(file_item)
+            # 电影立即发送消息
+            if media.type == MediaType.MOVIE:
+                self.message.send_transfer_movie_message(in_from,
+                                                         media,
+                                                         exist_filenum,
+                                                         self._movie_category_flag)
+            # 否则登记汇总发消息
+            else:
+                # 按季汇总
+                message_key = "%s-%s" % (media.get_title_string(),
+                                         media.get_season_string())
+                with message_lock:
+                    if not message_medias.get(message_key):
+                        message_medias[message_key] = media
+                    # 汇总集数、大小
+                    if not message_medias[message_key].is_in_episode(media.get_episode_list()):
+                        message_medias[message_key].total_episodes += media.total_episodes
+                        message_medias[message_key].size += media.size
+            # 生成nfo及poster
+            if bluray_disk_dir and media.type == MediaType.MOVIE:
+                # 原盘文件的情况下 使用目录名称.nfo 生成
+                self.scraper.gen_scraper_files(media=media,
+                                               dir_path=ret_dir_path,
+                                               file_name=os.path.basename(ret_dir_path),
+                                               file_ext=file_ext,
+                                               rmt_mode=rmt_mode,
+                                               session=scraper_session)
+            else:
+                self.scraper.gen_scraper_files(media=media,
+                                               dir_path=ret_dir_path,
+                                               file_name=os.path.basename(ret_file_path),
+                                               file_ext=file_ext,
+                                               rmt_mode=rmt_mode,
+                                               session=scraper_session)
+            # 更新进度
+            self.progress.update(ptype=ProgressKey.FileTransfer,
+                                 value=progress_value,
+                                 text="%s 转移完成" % file_name)
+            # 移动模式随机休眠（兼容一些网盘挂载目录）
+            if rmt_mode == RmtMode.MOVE:
+                sleep(round(random.uniform(0, 1), 1))
+
+            # 解发字幕下载事件
+            self.eventmanager.send_event(EventType.SubtitleDownload, {
+                "media_info": media.to_dict(),
+                "file": ret_file_path,
+                "file_ext": file_ext,
+                "bluray": True if bluray_disk_dir else False
+            })
+            # 解发转移完成事件
+            self.eventmanager.send_event(EventType.TransferFinished, {
+                "in_path": in_path,
+                "file": file_item,
+                "target_path": out_path,
+                "dest": dist_path,
+                "media_info": media.to_dict()
+            })
+            return 0, ""
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+            log.error("【Rmt】文件转移时发生错误：%s - %s" %
+                      (str(err), traceback.format_exc()))
+            return None
+
     def transfer_manually(self, s_path, t_path, mode):
         """
         全量转移，用于使用命令调用
@@ -1125,15 +1359,14 @@ class FileTransfer:
             for dest_path in self._movie_path:
                 # 判断精选
                 fav_path = os.path.join(dest_path, RMT_FAVTYPE, dir_name)
-                fav_files = PathUtils.get_dir_files(fav_path, RMT_MEDIAEXT)
                 # 其它分类
                 if self._movie_category_flag:
                     dest_path = os.path.join(
                         dest_path, meta_info.category, dir_name)
                 else:
                     dest_path = os.path.join(dest_path, dir_name)
-                files = PathUtils.get_dir_files(dest_path, RMT_MEDIAEXT)
-                if len(files) > 0 or len(fav_files) > 0:
+                if PathUtils.has_dir_files(dest_path, RMT_MEDIAEXT) \
+                        or PathUtils.has_dir_files(fav_path, RMT_MEDIAEXT):
                     return [{'title': meta_info.title, 'year': meta_info.year}]
             return []
         # 电视剧
@@ -1160,8 +1393,7 @@ class FileTransfer:
                 # 目录不存在
                 if not os.path.exists(dest_path):
                     continue
-                files = PathUtils.get_dir_files(dest_path, RMT_MEDIAEXT)
-                for file in files:
+                for file in PathUtils.iter_dir_files(dest_path, RMT_MEDIAEXT):
                     file_meta_info = MetaInfo(os.path.basename(file))
                     if not file_meta_info.get_season_list() or not file_meta_info.get_episode_list():
                         continue
@@ -1410,7 +1642,7 @@ class FileTransfer:
             if re.findall(r"^S\d{2}|^Season", os.path.basename(filedir), re.I):
                 # 当前是季文件夹，判断并删除
                 seaon_dir = filedir
-                if seaon_dir.count('/') > 1 and not PathUtils.get_dir_files(seaon_dir, exts=RMT_MEDIAEXT):
+                if seaon_dir.count('/') > 1 and not PathUtils.has_dir_files(seaon_dir, exts=RMT_MEDIAEXT):
                     shutil.rmtree(seaon_dir)
                 # 媒体文件夹
                 media_dir = os.path.dirname(seaon_dir)
@@ -1420,7 +1652,7 @@ class FileTransfer:
             if media_dir != '/' \
                     and media_dir.count('/') > 1 \
                     and not re.search(r'[a-zA-Z]:/$', media_dir) \
-                    and not PathUtils.get_dir_files(media_dir, exts=RMT_MEDIAEXT):
+                    and not PathUtils.has_dir_files(media_dir, exts=RMT_MEDIAEXT):
                 shutil.rmtree(media_dir)
             return True, f"{file} 删除成功"
         except Exception as e:
@@ -15,3 +15,4 @@ from .ffmpeg_helper import FfmpegHelper
 from .redis_helper import RedisHelper
 from .rss_helper import RssHelper
 from .plugin_helper import PluginHelper
+from .image_cache_helper import ImageCacheHelper
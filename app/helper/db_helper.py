@@ -4,6 +4,7 @@ import time
 import json
 from enum import Enum
 from sqlalchemy import cast, func, and_, case
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from app.db import MainDb, DbPersist
 from app.db.models import *
@@ -14,6 +15,12 @@ from app.utils.types import MediaType, RmtMode
 class DbHelper:
     _db = MainDb()
 
+    def unit_of_work(self):
+        """
+        工作单元，块内调用的写方法在退出时一次提交，出错时整体回滚
+        """
+        return self._db.unit_of_work()
+
     @DbPersist(_db)
     def insert_search_results(self, media_items: list, title=None, ident_flag=True):
         """
@@ -109,19 +116,19 @@ class DbHelper:
             }
         )
 
-    @DbPersist(_db)
-    def insert_transfer_history(self, in_from: Enum, rmt_mode: RmtMode, in_path, out_path, dest, media_info):
+    @staticmethod
+    def get_transfer_history_row(in_from: Enum, rmt_mode: RmtMode, in_path, out_path, dest, media_info):
         """
-        插入识别转移记录
+        生成识别转移记录
         """
         if not media_info or not media_info.tmdb_info:
-            return
+            return None
         if in_path:
             in_path = os.path.normpath(in_path)
             source_path = os.path.dirname(in_path)
             source_filename = os.path.basename(in_path)
         else:
-            return
+            return None
         if out_path:
             outpath = os.path.normpath(out_path)
             dest_path = os.path.dirname(outpath)
@@ -131,31 +138,82 @@ class DbHelper:
             dest_path = ""
             dest_filename = ""
             season_episode = media_info.get_season_string()
-        title = media_info.title
-        timestr = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
-        if self.is_transfer_history_exists(source_path, source_filename, dest_path, dest_filename):
+        return {
+            "MODE": str(rmt_mode.value),
+            "TYPE": media_info.type.value,
+            "CATEGORY": media_info.category,
+            "TMDBID": int(media_info.tmdb_id),
+            "TITLE": media_info.title,
+            "YEAR": media_info.year,
+            "SEASON_EPISODE": season_episode,
+            "SOURCE": str(in_from.value),
+            "SOURCE_PATH": source_path,
+            "SOURCE_FILENAME": source_filename,
+            "DEST": dest or "",
+            "DEST_PATH": dest_path,
+            "DEST_FILENAME": dest_filename,
+            "DATE": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
+        }
+
+    def insert_transfer_history(self, in_from: Enum, rmt_mode: RmtMode, in_path, out_path, dest, media_info):
+        """
+        插入识别转移记录
+        """
+        return self.insert_transfer_history_row(self.get_transfer_history_row(in_from=in_from,
+                                                                              rmt_mode=rmt_mode,
+                                                                              in_path=in_path,
+                                                                              out_path=out_path,
+                                                                              dest=dest,
+                                                                              media_info=media_info))
+
+    @DbPersist(_db)
+    def insert_transfer_history_row(self, row):
+        """
+        插入识别转移记录，已存在时更新时间
+        """
+        if not row:
+            return
+        if self.is_transfer_history_exists(row.get("SOURCE_PATH"), row.get("SOURCE_FILENAME"),
+                                           row.get("DEST_PATH"), row.get("DEST_FILENAME")):
             # 更新历史转移记录的时间
-            self.update_transfer_history_date(source_path, source_filename, dest_path, dest_filename, timestr)
+            self.update_transfer_history_date(row.get("SOURCE_PATH"), row.get("SOURCE_FILENAME"),
+                                              row.get("DEST_PATH"), row.get("DEST_FILENAME"), row.get("DATE"))
             return
-        dest = dest or ""
-        self._db.insert(
-            TRANSFERHISTORY(
-                MODE=str(rmt_mode.value),
-                TYPE=media_info.type.value,
-                CATEGORY=media_info.category,
-                TMDBID=int(media_info.tmdb_id),
-                TITLE=title,
-                YEAR=media_info.year,
-                SEASON_EPISODE=season_episode,
-                SOURCE=str(in_from.value),
-                SOURCE_PATH=source_path,
-                SOURCE_FILENAME=source_filename,
-                DEST=dest,
-                DEST_PATH=dest_path,
-                DEST_FILENAME=dest_filename,
-                DATE=timestr
+        self._db.insert(TRANSFERHISTORY(**row))
+
+    @DbPersist(_db)
+    def insert_transfer_records(self, histories=None, blacklist=None, unknowns=None):
+        """
+        在一个事务中批量写入转移记录，依赖唯一索引处理重复记录
+        :param histories: 识别转移记录，已存在时只更新时间
+        :param blacklist: 黑名单路径，已存在时忽略
+        :param unknowns: 未识别记录(路径, 目的目录, 转移方式)，已存在时忽略
+        """
+        if histories:
+            statement = sqlite_insert(TRANSFERHISTORY)
+            statement = statement.on_conflict_do_update(
+                index_elements=[TRANSFERHISTORY.SOURCE_PATH,
+                                TRANSFERHISTORY.SOURCE_FILENAME,
+                                TRANSFERHISTORY.DEST_PATH,
+                                TRANSFERHISTORY.DEST_FILENAME],
+                set_={"DATE": statement.excluded.DATE}
             )
-        )
+            self._db.execute_many(statement, histories)
+        if blacklist:
+            statement = sqlite_insert(TRANSFERBLACKLIST).on_conflict_do_nothing(
+                index_elements=[TRANSFERBLACKLIST.PATH]
+            )
+            self._db.execute_many(statement, [{"PATH": os.path.normpath(path)} for path in blacklist])
+        if unknowns:
+            statement = sqlite_insert(TRANSFERUNKNOWN).on_conflict_do_nothing(
+                index_elements=[TRANSFERUNKNOWN.PATH]
+            )
+            self._db.execute_many(statement, [{
+                "PATH": os.path.normpath(path),
+                "DEST": os.path.normpath(dest) if dest else "",
+                "STATE": 'N',
+                "MODE": str(rmt_mode.value)
+            } for path, dest, rmt_mode in unknowns])
 
     def get_transfer_history(self, search, page, rownum):
         """
@@ -1609,6 +1667,23 @@ class DbHelper:
             DOWNLOADHISTORY.DOWNLOAD_ID == download_id
         ).order_by(DOWNLOADHISTORY.DATE.desc()).first()
 
+    def get_download_history_by_downloader_ids(self, downloader, download_ids):
+        """
+        根据下载器批量查找下载历史
+        :return: {下载ID: 最新的下载记录}
+        """
+        if not download_ids:
+            return {}
+        download_ids = list(set(download_ids))
+        histories = {}
+        for pos in range(0, len(download_ids), 500):
+            for history in self._db.query(DOWNLOADHISTORY).filter(
+                    DOWNLOADHISTORY.DOWNLOADER == downloader,
+                    DOWNLOADHISTORY.DOWNLOAD_ID.in_(download_ids[pos:pos + 500])
+            ).order_by(DOWNLOADHISTORY.DATE):
+                histories[history.DOWNLOAD_ID] = history
+        return histories
+
     @DbPersist(_db)
     def update_brushtask(self, brush_id, item):
         """
@@ -1800,6 +1875,21 @@ class DbHelper:
             return None
         return self._db.query(SITEBRUSHTORRENTS).filter(SITEBRUSHTORRENTS.ENCLOSURE == enclosure).first()
 
+    def get_brushtask_torrent_enclosures(self, enclosures):
+        """
+        批量查询已在刷流任务中的种子URL
+        :param enclosures: 种子URL列表
+        :return: 已存在的种子URL集合
+        """
+        enclosures = [enclosure for enclosure in set(enclosures) if enclosure]
+        exists_enclosures = set()
+        # SQLite单条语句的参数数量有限制，分批查询
+        for pos in range(0, len(enclosures), 500):
+            rows = self._db.query(SITEBRUSHTORRENTS.ENCLOSURE).filter(
+                SITEBRUSHTORRENTS.ENCLOSURE.in_(enclosures[pos:pos + 500])).distinct().all()
+            exists_enclosures.update(row[0] for row in rows)
+        return exists_enclosures
+
     def is_brushtask_torrent_exists(self, brush_id, title, enclosure):
         """
         查询刷流任务种子是否已存在
@@ -0,0 +1,183 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from PIL import Image
+
+import log
+from app.utils import RequestUtils, ExceptionUtils
+from app.utils.commons import singleton
+from config import Config
+
+lock = threading.Lock()
+
+
+@singleton
+class ImageCacheHelper(object):
+    """
+    图片磁盘缓存，以URL的哈希命名文件，按最近访问顺序淘汰超出容量的文件
+    """
+    # 缓存容量（字节）
+    _max_size = 512 * 1024 * 1024
+    # 缩略图允许的宽度，避免任意宽度产生过多文件
+    _allowed_widths = [200, 300, 500]
+    _cache_path = None
+    # 缓存文件及大小，按访问顺序排列
+    _files = OrderedDict()
+    _total_size = 0
+    # 正在下载的URL
+    _fetching = {}
+
+    def __init__(self):
+        self.init_config()
+
+    def init_config(self):
+        self._cache_path = os.path.join(Config().get_config_path(), "cache", "images")
+        os.makedirs(self._cache_path, exist_ok=True)
+        with lock:
+            self._files = OrderedDict()
+            self._total_size = 0
+            self._fetching = {}
+            files = []
+            for entry in os.scandir(self._cache_path):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, entry.name, stat.st_size))
+            for _, name, size in sorted(files):
+                self._files[name] = size
+                self._total_size += size
+            self.__evict()
+
+    def get_image(self, url, width=None):
+        """
+        获取图片的缓存文件，未缓存时下载，同一URL同时只下载一次
+        :param url: 图片地址
+        :param width: 缩略图宽度，为空时返回原图
+        :return: 缓存文件路径，获取失败时返回None
+        """
+        if not url:
+            return None
+        if width and width not in self._allowed_widths:
+            width = min(self._allowed_widths, key=lambda w: abs(w - width))
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        name = f"{key}_{width}" if width else key
+        path = self.__touch(name)
+        if path:
+            return path
+        if width:
+            # 缩略图由原图生成
+            origin_path = self.get_image(url)
+            if not origin_path:
+                return None
+            return self.__fetch(name, lambda: self.__resize(origin_path, width))
+        return self.__fetch(name, lambda: self.__download(url))
+
+    def __touch(self, name):
+        """
+        命中缓存时更新访问顺序
+        """
+        with lock:
+            if name not in self._files:
+                return None
+            self._files.move_to_end(name)
+        path = os.path.join(self._cache_path, name)
+        try:
+            os.utime(path)
+        except OSError:
+            # 文件已被删除
+            with lock:
+                self._total_size -= self._files.pop(name, 0)
+            return None
+        return path
+
+    def __fetch(self, name, loader):
+        """
+        生成缓存文件，并发请求同一文件时等待第一个请求的结果
+        """
+        with lock:
+            event = self._fetching.get(name)
+            owner = event is None
+            if owner:
+                event = self._fetching[name] = threading.Event()
+        if not owner:
+            event.wait(timeout=60)
+            return self.__touch(name)
+        try:
+            content = loader()
+            if not content:
+                return None
+            path = os.path.join(self._cache_path, name)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+            with lock:
+                self._total_size += len(content) - self._files.pop(name, 0)
+                self._files[name] = len(content)
+                self.__evict()
+            return path
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+            return None
+        finally:
+            with lock:
+                self._fetching.pop(name, None)
+            event.set()
+
+    def __evict(self):
+        """
+        淘汰最久未访问的文件，直到不超过缓存容量，需在锁内调用
+        """
+        while self._total_size > self._max_size and self._files:
+            name, size = self._files.popitem(last=False)
+            self._total_size -= size
+            try:
+                os.remove(os.path.join(self._cache_path, name))
+            except OSError:
+                pass
+
+    @staticmethod
+    def __download(url):
+        """
+        下载图片
+        """
+        if "douban" in url:
+            ret = RequestUtils(referer="https://movie.douban.com").get_res(url)
+        else:
+            ret = RequestUtils().get_res(url)
+        if ret and ret.status_code == 200 and ret.content:
+            return ret.content
+        log.debug(f"【ImageCache】图片下载失败：{url}")
+        return None
+
+    @staticmethod
+    def __resize(path, width):
+        """
+        按宽度等比例缩小图片，原图不大于该宽度时直接使用原图
+        """
+        with Image.open(path) as img:
+            if img.width <= width:
+                with open(path, "rb") as f:
+                    return f.read()
+            height = round(img.height * width / img.width)
+            img = img.convert("RGB").resize((width, height), resample=Image.LANCZOS)
+            buffer = BytesIO()
+            img.save(buffer, format="JPEG", quality=85)
+            return buffer.getvalue()
+
+    @staticmethod
+    def get_mimetype(path):
+        """
+        根据文件头判断图片类型
+        """
+        with open(path, "rb") as f:
+            head = f.read(12)
+        if head.startswith(b"\x89PNG"):
+            return "image/png"
+        if head.startswith(b"GIF8"):
+            return "image/gif"
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            return "image/webp"
+        return "image/jpeg"
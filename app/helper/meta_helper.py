@@ -1,6 +1,6 @@
 import os
 import pickle
-import random
+import sqlite3
 import time
 from enum import Enum
 from threading import RLock
@@ -14,10 +14,29 @@ lock = RLock()
 CACHE_EXPIRE_TIMESTAMP_STR = "cache_expire_timestamp"
 EXPIRE_TIMESTAMP = 7 * 24 * 3600
 
+# 缓存表结构，DATA字段保存完整的缓存内容，其余字段用于索引和列表展示
+_META_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS TMDB_META ("
+    "KEY TEXT PRIMARY KEY, "
+    "TMDBID TEXT, "
+    "TITLE TEXT, "
+    "YEAR TEXT, "
+    "MEDIA_TYPE TEXT, "
+    "POSTER_PATH TEXT, "
+    "BACKDROP_PATH TEXT, "
+    "EXPIRE INTEGER, "
+    "DATA BLOB)",
+    "CREATE INDEX IF NOT EXISTS INDX_TMDB_META_TMDBID ON TMDB_META (TMDBID)",
+    # 缓存列表按KEY任意位置搜索，标题索引用不上，只增加写入开销
+    "DROP INDEX IF EXISTS INDX_TMDB_META_TITLE",
+    "CREATE INDEX IF NOT EXISTS INDX_TMDB_META_EXPIRE ON TMDB_META (EXPIRE)"
+]
+
 
 @singleton
 class MetaHelper(object):
     """
+    TMDB识别缓存，以SQLite保存，内存中只保留未落盘的变更
     {
         "id": '',
         "title": '',
@@ -25,9 +44,15 @@ class MetaHelper(object):
         "type": MediaType
     }
     """
-    _meta_data = {}
+    # 未落盘的新增/修改条目，值为None表示待删除
+    _dirty_data = {}
+    # 只更新了过期时间的条目
+    _touched_data = {}
+    # 未识别的条目，只保存在内存中
+    _unknown_data = {}
 
     _meta_path = None
+    _db = None
     _tmdb_cache_expire = False
 
     def __init__(self):
@@ -37,15 +62,117 @@ class MetaHelper(object):
         laboratory = Config().get_config('laboratory')
         if laboratory:
             self._tmdb_cache_expire = laboratory.get("tmdb_cache_expire")
-        self._meta_path = os.path.join(Config().get_config_path(), 'tmdb.dat')
-        self._meta_data = self.__load_meta_data(self._meta_path)
+        with lock:
+            if self._db:
+                self.save_meta_data(force=True)
+                self._db.close()
+            self._dirty_data = {}
+            self._touched_data = {}
+            self._unknown_data = {}
+            self._meta_path = os.path.join(Config().get_config_path(), 'tmdb.db')
+            self._db = self.__open_db(self._meta_path)
+            self.__migrate_pickle_data(os.path.join(Config().get_config_path(), 'tmdb.dat'))
+
+    @staticmethod
+    def __open_db(path):
+        """
+        打开缓存数据库
+        """
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for sql in _META_SCHEMA:
+            conn.execute(sql)
+        conn.commit()
+        return conn
+
+    def __migrate_pickle_data(self, pickle_path):
+        """
+        将旧版本的tmdb.dat一次性迁移到数据库中，迁移完成后重命名旧文件
+        """
+        if not os.path.exists(pickle_path):
+            return
+        try:
+            with open(pickle_path, 'rb') as f:
+                data = pickle.load(f)
+            if isinstance(data, dict):
+                self.__write_items([(k, v) for k, v in data.items() if str(v.get("id")) != '0'])
+            os.replace(pickle_path, "%s.bak" % pickle_path)
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+
+    @staticmethod
+    def __item_row(key, item):
+        """
+        将缓存条目转换为数据库行
+        """
+        media_type = item.get("type")
+        if isinstance(media_type, Enum):
+            media_type = media_type.value
+        return (key,
+                str(item.get("id")),
+                item.get("title"),
+                item.get("year"),
+                media_type,
+                item.get("poster_path"),
+                item.get("backdrop_path"),
+                item.get(CACHE_EXPIRE_TIMESTAMP_STR),
+                pickle.dumps(item, pickle.HIGHEST_PROTOCOL))
+
+    def __write_items(self, items):
+        """
+        批量写入缓存条目
+        """
+        if not items:
+            return
+        with lock:
+            self._db.executemany("INSERT OR REPLACE INTO TMDB_META "
+                                 "(KEY, TMDBID, TITLE, YEAR, MEDIA_TYPE, POSTER_PATH, BACKDROP_PATH, EXPIRE, DATA) "
+                                 "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                 [self.__item_row(k, v) for k, v in items])
+            self._db.commit()
+
+    def __read_item(self, key):
+        """
+        读取一个缓存条目，优先读取未落盘的数据
+        """
+        if key in self._dirty_data:
+            return self._dirty_data.get(key)
+        if key in self._unknown_data:
+            return self._unknown_data.get(key)
+        row = self._db.execute("SELECT DATA, EXPIRE FROM TMDB_META WHERE KEY = ?", (key,)).fetchone()
+        if not row:
+            return None
+        info = pickle.loads(row[0])
+        # 续期只更新EXPIRE字段，以其为准
+        if row[1] is not None:
+            info[CACHE_EXPIRE_TIMESTAMP_STR] = row[1]
+        if key in self._touched_data:
+            info[CACHE_EXPIRE_TIMESTAMP_STR] = self._touched_data.get(key)
+        return info
+
+    def __put_item(self, key, item):
+        """
+        写入一个缓存条目到待保存列表
+        """
+        self._touched_data.pop(key, None)
+        if str(item.get("id")) == '0':
+            self._unknown_data[key] = item
+            self._dirty_data.pop(key, None)
+        else:
+            self._dirty_data[key] = item
+            self._unknown_data.pop(key, None)
 
     def clear_meta_data(self):
         """
         清空所有TMDB缓存
         """
         with lock:
-            self._meta_data = {}
+            self._dirty_data = {}
+            self._touched_data = {}
+            self._unknown_data = {}
+            self._db.execute("DELETE FROM TMDB_META")
+            self._db.commit()
 
     def get_meta_data_path(self):
         """
@@ -58,12 +185,15 @@ class MetaHelper(object):
         根据KEY值获取缓存值
         """
         with lock:
-            info: dict = self._meta_data.get(key)
+            info: dict = self.__read_item(key)
             if info:
                 expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
                 if not expire or int(time.time()) < expire:
                     info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                    self.update_meta_data({key: info})
+                    if key in self._dirty_data or key in self._unknown_data:
+                        self.__put_item(key, info)
+                    else:
+                        self._touched_data[key] = info[CACHE_EXPIRE_TIMESTAMP_STR]
                 elif expire and self._tmdb_cache_expire:
                     self.delete_meta_data(key)
             return info or {}
@@ -76,22 +206,36 @@ class MetaHelper(object):
         @param num: 单页大小
         @return: 总数, 缓存列表
         """
+        num = int(num)
         if page == 1:
             begin_pos = 0
         else:
             begin_pos = (page - 1) * num
+        if search:
+            # 缓存列表为管理页面使用，按KEY任意位置匹配，数据量有限，不使用索引
+            search = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            where = "WHERE KEY LIKE ? ESCAPE '\\' AND TMDBID != '0'"
+            params = ("%%%s%%" % search,)
+        else:
+            where = "WHERE TMDBID != '0'"
+            params = ()
 
         with lock:
-            search_metas = [(k, {
-                "id": v.get("id"),
-                "title": v.get("title"),
-                "year": v.get("year"),
-                "media_type": v.get("type").value if isinstance(v.get("type"), Enum) else v.get("type"),
-                "poster_path": v.get("poster_path"),
-                "backdrop_path": v.get("backdrop_path")
-            },  str(k).replace("[电影]", "").replace("[电视剧]", "").replace("[未知]", "").replace("-None", ""))
-                for k, v in self._meta_data.items() if search.lower() in k.lower() and v.get("id") != 0]
-            return len(search_metas), search_metas[begin_pos: begin_pos + num]
+            self.save_meta_data(force=True)
+            total = self._db.execute("SELECT COUNT(1) FROM TMDB_META %s" % where, params).fetchone()[0]
+            rows = self._db.execute("SELECT KEY, TMDBID, TITLE, YEAR, MEDIA_TYPE, POSTER_PATH, BACKDROP_PATH "
+                                    "FROM TMDB_META %s ORDER BY ROWID LIMIT ? OFFSET ?" % where,
+                                    params + (num, begin_pos)).fetchall()
+        search_metas = [(k, {
+            "id": int(tmdbid) if str(tmdbid).isdigit() else tmdbid,
+            "title": title,
+            "year": year,
+            "media_type": media_type,
+            "poster_path": poster_path,
+            "backdrop_path": backdrop_path
+        }, str(k).replace("[电影]", "").replace("[电视剧]", "").replace("[未知]", "").replace("-None", ""))
+            for k, tmdbid, title, year, media_type, poster_path, backdrop_path in rows]
+        return total, search_metas
 
     def delete_meta_data(self, key):
         """
@@ -100,25 +244,31 @@ class MetaHelper(object):
         @return: 被删除的缓存内容
         """
         with lock:
-            return self._meta_data.pop(key, None)
+            info = self.__read_item(key)
+            self._unknown_data.pop(key, None)
+            self._touched_data.pop(key, None)
+            if info and str(info.get("id")) != '0':
+                self._dirty_data[key] = None
+            else:
+                self._dirty_data.pop(key, None)
+            return info
 
     def delete_meta_data_by_tmdbid(self, tmdbid):
         """
         清空对应TMDBID的所有缓存记录，以强制更新TMDB中最新的数据
         """
-        for key in list(self._meta_data):
-            if str(self._meta_data.get(key, {}).get("id")) == str(tmdbid):
-                with lock:
-                    self._meta_data.pop(key)
+        with lock:
+            for key in [k for k, v in self._dirty_data.items() if v and str(v.get("id")) == str(tmdbid)]:
+                self._dirty_data.pop(key)
+            self._db.execute("DELETE FROM TMDB_META WHERE TMDBID = ?", (str(tmdbid),))
+            self._db.commit()
 
     def delete_unknown_meta(self):
         """
         清除未识别的缓存记录，以便重新搜索TMDB
         """
-        for key in list(self._meta_data):
-            if str(self._meta_data.get(key, {}).get("id")) == '0':
-                with lock:
-                    self._meta_data.pop(key)
+        with lock:
+            self._unknown_data = {}
 
     def modify_meta_data(self, key, title):
         """
@@ -128,25 +278,12 @@ class MetaHelper(object):
         @return: 被修改后缓存内容
         """
         with lock:
-            if self._meta_data.get(key):
-                self._meta_data[key]['title'] = title
-                self._meta_data[key][CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-            return self._meta_data.get(key)
-
-    @staticmethod
-    def __load_meta_data(path):
-        """
-        从文件中加载缓存
-        """
-        try:
-            if os.path.exists(path):
-                with open(path, 'rb') as f:
-                    data = pickle.load(f)
-                return data
-            return {}
-        except Exception as e:
-            ExceptionUtils.exception_traceback(e)
-            return {}
+            info = self.__read_item(key)
+            if info:
+                info['title'] = title
+                info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
+                self.__put_item(key, info)
+            return info
 
     def update_meta_data(self, meta_data):
         """
@@ -156,65 +293,43 @@ class MetaHelper(object):
             return
         with lock:
             for key, item in meta_data.items():
-                if not self._meta_data.get(key):
+                if not self.__read_item(key):
                     item[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                    self._meta_data[key] = item
+                    self.__put_item(key, item)
 
     def save_meta_data(self, force=False):
         """
-        保存缓存数据到文件
-        """
-        meta_data = self.__load_meta_data(self._meta_path)
-        new_meta_data = {k: v for k, v in self._meta_data.items() if str(v.get("id")) != '0'}
-
-        if not force \
-                and not self._random_sample(new_meta_data) \
-                and meta_data.keys() == new_meta_data.keys():
-            return
-
-        with open(self._meta_path, 'wb') as f:
-            pickle.dump(new_meta_data, f, pickle.HIGHEST_PROTOCOL)
-
-    def _random_sample(self, new_meta_data):
+        将变更的缓存条目增量保存到数据库，同时清理过期条目
         """
-        采样分析是否需要保存
-        """
-        ret = False
-        if len(new_meta_data) < 25:
-            keys = list(new_meta_data.keys())
-            for k in keys:
-                info = new_meta_data.get(k)
-                expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
-                if not expire:
-                    ret = True
-                    info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                elif int(time.time()) >= expire:
-                    ret = True
-                    if self._tmdb_cache_expire:
-                        new_meta_data.pop(k)
-        else:
-            count = 0
-            keys = random.sample(new_meta_data.keys(), 25)
-            for k in keys:
-                info = new_meta_data.get(k)
-                expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
-                if not expire:
-                    ret = True
-                    info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                elif int(time.time()) >= expire:
-                    ret = True
-                    if self._tmdb_cache_expire:
-                        new_meta_data.pop(k)
-                        count += 1
-            if count >= 5:
-                ret |= self._random_sample(new_meta_data)
-        return ret
+        with lock:
+            dirty_data, self._dirty_data = self._dirty_data, {}
+            touched_data, self._touched_data = self._touched_data, {}
+            try:
+                deleted = [(k,) for k, v in dirty_data.items() if v is None]
+                if deleted:
+                    self._db.executemany("DELETE FROM TMDB_META WHERE KEY = ?", deleted)
+                if touched_data:
+                    self._db.executemany("UPDATE TMDB_META SET EXPIRE = ? WHERE KEY = ?",
+                                         [(v, k) for k, v in touched_data.items()])
+                if self._tmdb_cache_expire:
+                    self._db.execute("DELETE FROM TMDB_META WHERE EXPIRE < ?", (int(time.time()),))
+                self._db.commit()
+                self.__write_items([(k, v) for k, v in dirty_data.items() if v is not None])
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                self._db.rollback()
+                # 保存失败时保留变更，下次再试
+                for key, item in dirty_data.items():
+                    self._dirty_data.setdefault(key, item)
+                for key, expire in touched_data.items():
+                    self._touched_data.setdefault(key, expire)
 
     def get_cache_title(self, key):
         """
         获取缓存的标题
         """
-        cache_media_info = self._meta_data.get(key)
+        with lock:
+            cache_media_info = self.__read_item(key)
         if not cache_media_info or not cache_media_info.get("id"):
             return None
         return cache_media_info.get("title")
@@ -223,7 +338,9 @@ class MetaHelper(object):
         """
         重新设置缓存标题
         """
-        cache_media_info = self._meta_data.get(key)
-        if not cache_media_info:
-            return
-        self._meta_data[key]['title'] = cn_title
+        with lock:
+            cache_media_info = self.__read_item(key)
+            if not cache_media_info:
+                return
+            cache_media_info['title'] = cn_title
+            self.__put_item(key, cache_media_info)
@@ -20,7 +20,8 @@ class ProgressHelper(object):
         self._process_detail[ptype] = {
             "enable": False,
             "value": 0,
-            "text": "请稍候..."
+            "text": "请稍候...",
+            "data": None
         }
 
     def start(self, ptype=ProgressKey.Search):
@@ -36,7 +37,7 @@ class ProgressHelper(object):
             return
         self._process_detail[ptype]['enable'] = False
 
-    def update(self, value=None, text=None, ptype=ProgressKey.Search):
+    def update(self, value=None, text=None, ptype=ProgressKey.Search, data=None):
         if isinstance(ptype, Enum):
             ptype = ptype.value
         if not self._process_detail.get(ptype, {}).get('enable'):
@@ -45,6 +46,8 @@ class ProgressHelper(object):
             self._process_detail[ptype]['value'] = value
         if text:
             self._process_detail[ptype]['text'] = text
+        if data is not None:
+            self._process_detail[ptype]['data'] = data
 
     def get_process(self, ptype=ProgressKey.Search):
         if isinstance(ptype, Enum):
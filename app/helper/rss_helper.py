@@ -1,100 +1,205 @@
-import xml.dom.minidom
+import hashlib
+import itertools
+import json
+import time
+
+import charset_normalizer
 
 from app.db import MainDb, DbPersist
-from app.db.models import RSSTORRENTS
-from app.utils import RssTitleUtils, StringUtils, RequestUtils, ExceptionUtils, DomUtils
+from app.db.models import RSSTORRENTS, RSSFEEDSTATE
+from app.utils import RssTitleUtils, StringUtils, RequestUtils, ExceptionUtils, DomUtils, cacheman
 from config import Config
 
+# 启动时加载到缓存的最近RSS记录数
+RSSD_CACHE_WARM_SIZE = 5000
+# 批量查询时每条语句的参数数
+RSSD_QUERY_BATCH_SIZE = 500
+
 
 class RssHelper:
     _db = MainDb()
+    _rssd_cache_warmed = False
+    # 拉取状态超过天数未更新时清理
+    _feed_state_expire_days = 7
 
-    @staticmethod
-    def parse_rssxml(url, proxy=False):
+    _special_title_sites = {
+        'pt.keepfrds.com': RssTitleUtils.keepfriends_title
+    }
+
+    _rss_expired_msg = [
+        "RSS 链接已过期, 您需要获得一个新的!",
+        "RSS Link has expired, You need to get a new one!"
+    ]
+
+    def parse_rssxml(self, url, proxy=False, context=None):
         """
         解析RSS订阅URL，获取RSS中的种子信息
         :param url: RSS地址
         :param proxy: 是否使用代理
+        :param context: 处理条件的指纹，传入时只返回RSS中新出现的种子，见iter_rssxml
         :return: 种子信息列表，如为None代表Rss过期
         """
-        _special_title_sites = {
-            'pt.keepfrds.com': RssTitleUtils.keepfriends_title
-        }
+        rss_items = self.iter_rssxml(url=url, proxy=proxy, context=context)
+        if rss_items is None:
+            return None
+        return list(rss_items)
 
-        _rss_expired_msg = [
-            "RSS 链接已过期, 您需要获得一个新的!",
-            "RSS Link has expired, You need to get a new one!"
-        ]
-
-        # 开始处理
-        ret_array = []
+    def iter_rssxml(self, url, proxy=False, context=None):
+        """
+        流式解析RSS订阅URL，边下载边返回RSS中的种子信息
+        :param url: RSS地址
+        :param proxy: 是否使用代理
+        :param context: 处理条件的指纹（如订阅清单），传入时启用增量拉取：处理条件与上次相同时发送条件请求，
+                        RSS未变化（304或内容相同）时不解析，否则只返回上次没有出现过的种子；
+                        全部种子返回后才记录本次状态，如有种子因临时原因未处理，需调用reset_feed_state
+        :return: 种子信息生成器，如为None代表Rss过期
+        """
         if not url:
-            return []
+            return iter([])
         site_domain = StringUtils.get_url_domain(url)
+        feed_state = self.get_feed_state(url=url, context=context) if context is not None else None
         try:
-            ret = RequestUtils(proxies=Config().get_proxies() if proxy else None).get_res(url)
+            ret = RequestUtils(proxies=Config().get_proxies() if proxy else None).get_res(
+                url,
+                stream=True,
+                headers=self.get_conditional_headers(feed_state))
             if not ret:
-                return []
-            ret.encoding = ret.apparent_encoding
+                return iter([])
+        except Exception as e2:
+            ExceptionUtils.exception_traceback(e2)
+            return iter([])
+        content_hash = None
+        if context is not None:
+            # 增量拉取需要计算整个内容的摘要，一次读取完成
+            if ret.status_code == 304:
+                ret.close()
+                return iter([])
+            content = ret.content
+            content_hash = hashlib.md5(content).hexdigest()
+            if feed_state and feed_state.CONTENT_HASH == content_hash:
+                return iter([])
+            ret_chunks = iter([content])
+        else:
+            ret_chunks = ret.iter_content(chunk_size=64 * 1024)
+        # 解析出第一个种子前的原始内容，用于判断RSS过期等非XML内容
+        head_chunks = []
+
+        def __iter_chunks():
+            for chunk in ret_chunks:
+                if head_chunks is not None:
+                    head_chunks.append(chunk)
+                yield chunk
+
+        chunks = __iter_chunks()
+        items = RssHelper.__iter_rss_items(chunks=chunks,
+                                           encoding=ret.encoding if "charset" in ret.headers.get(
+                                               "content-type", "").lower() else None,
+                                           site_domain=site_domain)
+        try:
+            first_item = next(items, None)
         except Exception as e2:
+            try:
+                content = b"".join(head_chunks) + b"".join(chunks)
+            except Exception as e3:
+                ExceptionUtils.exception_traceback(e3)
+                content = b"".join(head_chunks)
+            finally:
+                ret.close()
+            # RSS过期 观众RSS 链接已过期，您需要获得一个新的！  pthome RSS Link has expired, You need to get a new one!
+            ret_xml = content.decode(charset_normalizer.detect(content).get("encoding") or "utf-8", errors="replace")
+            if ret_xml in RssHelper._rss_expired_msg:
+                return None
             ExceptionUtils.exception_traceback(e2)
-            return []
-        if ret:
-            ret_xml = ret.text
+            return iter([])
+        head_chunks = None
+        # 上次已经返回过的种子
+        seen_enclosures = set(json.loads(feed_state.ITEMS or "[]")) if feed_state else set()
+
+        def __iter_items():
+            enclosures = []
             try:
-                # 解析XML
-                dom_tree = xml.dom.minidom.parseString(ret_xml)
-                rootNode = dom_tree.documentElement
-                items = rootNode.getElementsByTagName("item")
-                for item in items:
-                    try:
-                        # 标题
-                        title = DomUtils.tag_value(item, "title", default="")
-                        if not title:
-                            continue
-                        # 标题特殊处理
-                        if site_domain and site_domain in _special_title_sites:
-                            title = _special_title_sites.get(site_domain)(title)
-                        # 描述
-                        description = DomUtils.tag_value(item, "description", default="")
-                        # 种子页面
-                        link = DomUtils.tag_value(item, "link", default="")
-                        # 种子链接
-                        enclosure = DomUtils.tag_value(item, "enclosure", "url", default="")
-                        if not enclosure and not link:
-                            continue
-                        # 部分RSS只有link没有enclosure
-                        if not enclosure and link:
-                            enclosure = link
-                            link = None
-                        # 大小
-                        size = DomUtils.tag_value(item, "enclosure", "length", default=0)
-                        if size and str(size).isdigit():
-                            size = int(size)
-                        else:
-                            size = 0
-                        # 发布日期
-                        pubdate = DomUtils.tag_value(item, "pubDate", default="")
-                        if pubdate:
-                            # 转换为时间
-                            pubdate = StringUtils.get_time_stamp(pubdate)
-                        # 返回对象
-                        tmp_dict = {'title': title,
-                                    'enclosure': enclosure,
-                                    'size': size,
-                                    'description': description,
-                                    'link': link,
-                                    'pubdate': pubdate}
-                        ret_array.append(tmp_dict)
-                    except Exception as e1:
-                        ExceptionUtils.exception_traceback(e1)
+                for item in itertools.chain([first_item], items) if first_item else []:
+                    enclosures.append(item.get("enclosure"))
+                    if item.get("enclosure") in seen_enclosures:
                         continue
-            except Exception as e2:
-                # RSS过期 观众RSS 链接已过期，您需要获得一个新的！  pthome RSS Link has expired, You need to get a new one!
-                if ret_xml in _rss_expired_msg:
-                    return None
-                ExceptionUtils.exception_traceback(e2)
-        return ret_array
+                    yield item
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                return
+            finally:
+                ret.close()
+            # 全部处理完成后记录状态
+            if context is not None:
+                self.update_feed_state(url=url,
+                                       context=context,
+                                       etag=ret.headers.get("ETag"),
+                                       last_modified=ret.headers.get("Last-Modified"),
+                                       content_hash=content_hash,
+                                       items=enclosures)
+
+        return __iter_items()
+
+    @staticmethod
+    def get_conditional_headers(feed_state):
+        """
+        根据上次的RSS状态生成条件请求头
+        """
+        if not feed_state:
+            return None
+        headers = {}
+        if feed_state.ETAG:
+            headers["If-None-Match"] = feed_state.ETAG
+        if feed_state.LAST_MODIFIED:
+            headers["If-Modified-Since"] = feed_state.LAST_MODIFIED
+        return headers
+
+    @staticmethod
+    def __iter_rss_items(chunks, encoding, site_domain):
+        """
+        从RSS内容分块中逐个解析种子信息
+        """
+        for item in DomUtils.iter_elements(chunks=chunks, tag_name="item", encoding=encoding):
+            try:
+                # 标题
+                title = DomUtils.elem_value(item, "title", default="")
+                if not title:
+                    continue
+                # 标题特殊处理
+                if site_domain and site_domain in RssHelper._special_title_sites:
+                    title = RssHelper._special_title_sites.get(site_domain)(title)
+                # 描述
+                description = DomUtils.elem_value(item, "description", default="")
+                # 种子页面
+                link = DomUtils.elem_value(item, "link", default="")
+                # 种子链接
+                enclosure = DomUtils.elem_value(item, "enclosure", "url", default="")
+                if not enclosure and not link:
+                    continue
+                # 部分RSS只有link没有enclosure
+                if not enclosure and link:
+                    enclosure = link
+                    link = None
+                # 大小
+                size = DomUtils.elem_value(item, "enclosure", "length", default=0)
+                if size and str(size).isdigit():
+                    size = int(size)
+                else:
+                    size = 0
+                # 发布日期
+                pubdate = DomUtils.elem_value(item, "pubDate", default="")
+                if pubdate:
+                    # 转换为时间
+                    pubdate = StringUtils.get_time_stamp(pubdate)
+                # 返回对象
+                yield {'title': title,
+                       'enclosure': enclosure,
+                       'size': size,
+                       'description': description,
+                       'link': link,
+                       'pubdate': pubdate}
+            except Exception as e1:
+                ExceptionUtils.exception_traceback(e1)
+                continue
 
     @DbPersist(_db)
     def insert_rss_torrents(self, media_info):
@@ -111,6 +216,83 @@ class RssHelper:
                 SEASON=media_info.get_season_string(),
                 EPISODE=media_info.get_episode_string()
             ))
+        self.__cache_rssd(torrent_name=media_info.org_string, enclosure=media_info.enclosure)
+
+    @staticmethod
+    def __cache_rssd(torrent_name=None, enclosure=None):
+        """
+        记录已处理过的名称和下载链接，只缓存已处理的结果
+        """
+        if torrent_name:
+            cacheman["rss_processed"].set("N:%s" % torrent_name, True)
+        if enclosure:
+            cacheman["rss_processed"].set("E:%s" % enclosure, True)
+
+    def warm_rssd_cache(self):
+        """
+        加载最近处理过的RSS记录到缓存
+        """
+        if RssHelper._rssd_cache_warmed:
+            return
+        RssHelper._rssd_cache_warmed = True
+        rows = self._db.query(RSSTORRENTS.TORRENT_NAME, RSSTORRENTS.ENCLOSURE) \
+            .order_by(RSSTORRENTS.ID.desc()) \
+            .limit(RSSD_CACHE_WARM_SIZE).all()
+        for torrent_name, enclosure in rows:
+            self.__cache_rssd(torrent_name=torrent_name, enclosure=enclosure)
+
+    def __get_rssd_by_column(self, column, prefix, values):
+        """
+        批量查询指定字段的值是否处理过，缓存未命中的一次IN查询
+        """
+        self.warm_rssd_cache()
+        values = [value for value in set(values) if value]
+        rssd_values = {value for value in values if cacheman["rss_processed"].get("%s:%s" % (prefix, value))}
+        query_values = [value for value in values if value not in rssd_values]
+        # SQLite单条语句的参数数量有限制，分批查询
+        for pos in range(0, len(query_values), RSSD_QUERY_BATCH_SIZE):
+            rows = self._db.query(column).filter(
+                column.in_(query_values[pos:pos + RSSD_QUERY_BATCH_SIZE])).distinct().all()
+            for row in rows:
+                rssd_values.add(row[0])
+                cacheman["rss_processed"].set("%s:%s" % (prefix, row[0]), True)
+        return rssd_values
+
+    def get_rssd_enclosures(self, enclosures):
+        """
+        批量查询RSS是否处理过，根据下载链接
+        :param enclosures: 下载链接列表
+        :return: 已处理过的下载链接集合
+        """
+        return self.__get_rssd_by_column(RSSTORRENTS.ENCLOSURE, "E", enclosures)
+
+    def get_rssd_names(self, torrent_names):
+        """
+        批量查询RSS是否处理过，根据名称
+        :param torrent_names: 名称列表
+        :return: 已处理过的名称集合
+        """
+        return self.__get_rssd_by_column(RSSTORRENTS.TORRENT_NAME, "N", torrent_names)
+
+    def iter_rssd_articles(self, articles, batch_size=100):
+        """
+        按批查询RSS条目是否处理过，适用于边下载边解析的RSS
+        :param articles: RSS条目，需包含enclosure
+        :param batch_size: 每批查询的条目数
+        :return: 条目、是否处理过
+        """
+        articles = iter(articles)
+        while True:
+            batch = list(itertools.islice(articles, batch_size))
+            if not batch:
+                break
+            rssd_enclosures = self.get_rssd_enclosures([article.get("enclosure") for article in batch])
+            for article in batch:
+                enclosure = article.get("enclosure")
+                # 同一批中前面的条目可能刚刚处理
+                yield article, not enclosure \
+                    or enclosure in rssd_enclosures \
+                    or bool(cacheman["rss_processed"].get("E:%s" % enclosure))
 
     def is_rssd_by_enclosure(self, enclosure):
         """
@@ -118,10 +300,7 @@ class RssHelper:
         """
         if not enclosure:
             return True
-        if self._db.query(RSSTORRENTS).filter(RSSTORRENTS.ENCLOSURE == enclosure).count() > 0:
-            return True
-        else:
-            return False
+        return enclosure in self.get_rssd_enclosures([enclosure])
 
     def is_rssd_by_simple(self, torrent_name, enclosure):
         """
@@ -130,10 +309,9 @@ class RssHelper:
         if not torrent_name and not enclosure:
             return True
         if enclosure:
-            ret = self._db.query(RSSTORRENTS).filter(RSSTORRENTS.ENCLOSURE == enclosure).count()
+            return enclosure in self.get_rssd_enclosures([enclosure])
         else:
-            ret = self._db.query(RSSTORRENTS).filter(RSSTORRENTS.TORRENT_NAME == torrent_name).count()
-        return True if ret > 0 else False
+            return torrent_name in self.get_rssd_names([torrent_name])
 
     @DbPersist(_db)
     def simple_insert_rss_torrents(self, title, enclosure):
@@ -145,6 +323,7 @@ class RssHelper:
                 TORRENT_NAME=title,
                 ENCLOSURE=enclosure
             ))
+        self.__cache_rssd(torrent_name=title, enclosure=enclosure)
 
     @DbPersist(_db)
     def simple_delete_rss_torrents(self, title, enclosure=None):
@@ -156,6 +335,8 @@ class RssHelper:
                                                RSSTORRENTS.ENCLOSURE == enclosure).delete()
         else:
             self._db.query(RSSTORRENTS).filter(RSSTORRENTS.TORRENT_NAME == title).delete()
+        # 删除后无法确定其它记录的状态，重新从数据库查询
+        cacheman["rss_processed"].clear()
 
     @DbPersist(_db)
     def truncate_rss_history(self):
@@ -163,3 +344,57 @@ class RssHelper:
         清空RSS历史记录
         """
         self._db.query(RSSTORRENTS).delete()
+        cacheman["rss_processed"].clear()
+
+    def get_feed_state(self, url, context=None):
+        """
+        查询RSS地址上次拉取的状态
+        :param url: RSS地址
+        :param context: 处理条件的指纹，同一RSS地址按指纹分别记录状态
+        """
+        if not url:
+            return None
+        return self._db.query(RSSFEEDSTATE).filter(RSSFEEDSTATE.URL == url,
+                                                   RSSFEEDSTATE.CONTEXT == context).first()
+
+    @DbPersist(_db)
+    def update_feed_state(self, url, context, etag, last_modified, content_hash, items):
+        """
+        记录RSS地址本次拉取的状态
+        :param url: RSS地址
+        :param context: 处理条件的指纹
+        :param etag: 响应的ETag
+        :param last_modified: 响应的Last-Modified
+        :param content_hash: 响应内容的摘要
+        :param items: 本次RSS中所有种子的标识
+        """
+        self._db.query(RSSFEEDSTATE).filter(RSSFEEDSTATE.URL == url,
+                                            RSSFEEDSTATE.CONTEXT == context).delete()
+        # 处理条件变化后旧指纹的状态不会再使用，清理长时间未更新的记录
+        expire_time = time.strftime('%Y-%m-%d %H:%M:%S',
+                                    time.localtime(time.time() - self._feed_state_expire_days * 24 * 3600))
+        self._db.query(RSSFEEDSTATE).filter(RSSFEEDSTATE.URL == url,
+                                            RSSFEEDSTATE.UPDATE_TIME < expire_time).delete()
+        self._db.insert(
+            RSSFEEDSTATE(
+                URL=url,
+                CONTEXT=context,
+                ETAG=etag,
+                LAST_MODIFIED=last_modified,
+                CONTENT_HASH=content_hash,
+                ITEMS=json.dumps(items),
+                UPDATE_TIME=time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
+            ))
+
+    @DbPersist(_db)
+    def reset_feed_state(self, url, context=None):
+        """
+        清除RSS地址的拉取状态，下次拉取时重新处理所有种子
+        :param url: RSS地址
+        :param context: 处理条件的指纹，为空时清除该地址的所有状态
+        """
+        if context is None:
+            self._db.query(RSSFEEDSTATE).filter(RSSFEEDSTATE.URL == url).delete()
+        else:
+            self._db.query(RSSFEEDSTATE).filter(RSSFEEDSTATE.URL == url,
+                                                RSSFEEDSTATE.CONTEXT == context).delete()
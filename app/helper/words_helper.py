@@ -2,22 +2,107 @@ import regex as re
 import cn2an
 
 from app.helper.db_helper import DbHelper
+from app.utils.ac_automaton import AcAutomaton
 from app.utils.commons import singleton
 from app.utils.exception_utils import ExceptionUtils
 
+# 正则元字符，不含这些字符的正则识别词按字面量匹配
+_REGEX_META_CHARS = set(".^$*+?{}[]\\|()")
+
 
 @singleton
 class WordsHelper:
     dbhelper = None
     # 识别词
     words_info = []
+    # 预编译后的识别词规则
+    _compiled_words = []
+    # 普通识别词及正则识别词中的字面量锚点组成的多模式匹配器
+    _anchor_matcher = None
+    # 识别词版本，每次重新加载时递增，用于识别结果缓存失效
+    version = 0
 
     def __init__(self):
         self.init_config()
 
     def init_config(self):
         self.dbhelper = DbHelper()
-        self.words_info = self.dbhelper.get_custom_words(enabled=1)
+        self.update_words(self.dbhelper.get_custom_words(enabled=1))
+
+    def update_words(self, words_info):
+        """
+        加载识别词，一次性编译所有正则并构建锚点匹配器
+        """
+        compiled_words = []
+        anchors = set()
+        for word_info in words_info:
+            compiled_word = self.__compile_word(word_info)
+            anchors.update(compiled_word.get("anchors"))
+            compiled_words.append(compiled_word)
+        self._anchor_matcher = AcAutomaton(anchors)
+        self._compiled_words = compiled_words
+        self.words_info = words_info
+        self.version += 1
+
+    @staticmethod
+    def __is_literal(word):
+        """
+        判断正则识别词是否不含正则元字符，可直接作为字面量锚点
+        """
+        return bool(word) and not any(char in _REGEX_META_CHARS for char in word)
+
+    @staticmethod
+    def __compile_regex(pattern):
+        """
+        编译正则，返回编译结果和错误信息
+        """
+        try:
+            return re.compile(r'%s' % pattern), ""
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+            return None, str(err)
+
+    def __compile_word(self, word_info):
+        """
+        编译单个识别词，anchors为规则生效时标题中必然出现的字面量
+        """
+        compiled_word = {"info": word_info, "anchors": frozenset()}
+        match word_info.TYPE:
+            case 1 | 2:
+                replaced = word_info.REPLACED
+                if word_info.REGEX:
+                    compiled_word["replaced_re"], compiled_word["replaced_err"] = self.__compile_regex(replaced)
+                    if self.__is_literal(replaced):
+                        compiled_word["anchors"] = frozenset([replaced])
+                elif replaced:
+                    compiled_word["anchors"] = frozenset([replaced])
+            case 3:
+                compiled_word["replaced_re"], compiled_word["replaced_err"] = \
+                    self.__compile_regex(word_info.REPLACED)
+                if self.__is_literal(word_info.REPLACED):
+                    compiled_word["anchors"] = frozenset([word_info.REPLACED])
+                compiled_word.update(self.__compile_offset(word_info.FRONT, word_info.BACK))
+            case 4:
+                compiled_word.update(self.__compile_offset(word_info.FRONT, word_info.BACK))
+                compiled_word["anchors"] = frozenset([w for w in [word_info.FRONT, word_info.BACK]
+                                                      if self.__is_literal(w)])
+        if any(value for key, value in compiled_word.items() if key.endswith("_err")):
+            # 格式有误的识别词每次都要执行，以便报告错误信息
+            compiled_word["anchors"] = frozenset()
+        return compiled_word
+
+    def __compile_offset(self, front, back):
+        """
+        编译集偏移的前后定位词及集数提取正则
+        """
+        offset_res = {}
+        if back:
+            offset_res["back_re"], offset_res["back_err"] = self.__compile_regex(back)
+        if front:
+            offset_res["front_re"], offset_res["front_err"] = self.__compile_regex(front)
+        offset_res["offset_re"], offset_res["offset_err"] = self.__compile_regex(
+            r'(?<=%s.*?)[0-9一二三四五六七八九十]+(?=.*?%s)' % (front, back))
+        return offset_res
 
     def process(self, title):
         # 错误信息
@@ -28,14 +113,21 @@ class WordsHelper:
         used_replaced_words = []
         # 应用集偏移
         used_offset_words = []
+        # 标题中出现的锚点，标题变化后重新计算
+        title_anchors = self._anchor_matcher.search(title) if self._anchor_matcher else set()
         # 应用识别词
-        for word_info in self.words_info:
+        for compiled_word in self._compiled_words:
+            # 锚点未出现的规则不可能生效，直接跳过
+            if not compiled_word.get("anchors") <= title_anchors:
+                continue
+            word_info = compiled_word.get("info")
+            org_title = title
             match word_info.TYPE:
                 case 1:
                     # 屏蔽
                     ignored = word_info.REPLACED
                     ignored_word = ignored
-                    title, ignore_msg, ignore_flag = self.replace_regex(title, ignored, "") \
+                    title, ignore_msg, ignore_flag = self.replace_regex(title, compiled_word, "") \
                         if word_info.REGEX else self.replace_noregex(title, ignored, "")
                     if ignore_flag:
                         used_ignored_words.append(ignored_word)
@@ -45,7 +137,7 @@ class WordsHelper:
                     # 替换
                     replaced, replace = word_info.REPLACED, word_info.REPLACE
                     replaced_word = f"{replaced} ⇒ {replace}"
-                    title, replace_msg, replace_flag = self.replace_regex(title, replaced, replace) \
+                    title, replace_msg, replace_flag = self.replace_regex(title, compiled_word, replace) \
                         if word_info.REGEX else self.replace_noregex(title, replaced, replace)
                     if replace_flag:
                         used_replaced_words.append(replaced_word)
@@ -62,10 +154,10 @@ class WordsHelper:
                     # 记录替换前title
                     title_cache = title
                     # 替换
-                    title, replace_msg, replace_flag = self.replace_regex(title, replaced, replace)
+                    title, replace_msg, replace_flag = self.replace_regex(title, compiled_word, replace)
                     # 替换应用成功进行集数偏移
                     if replace_flag:
-                        title, offset_msg, offset_flag = self.episode_offset(title, front, back, offset)
+                        title, offset_msg, offset_flag = self.episode_offset(title, compiled_word, front, back, offset)
                         # 集数偏移应用成功
                         if offset_flag:
                             used_replaced_words.append(replaced_word)
@@ -81,22 +173,27 @@ class WordsHelper:
                     # 集数偏移
                     front, back, offset = word_info.FRONT, word_info.BACK, word_info.OFFSET
                     offset_word = f"{front} + {back} >> {offset}"
-                    title, offset_msg, offset_flag = self.episode_offset(title, front, back, offset)
+                    title, offset_msg, offset_flag = self.episode_offset(title, compiled_word, front, back, offset)
                     if offset_flag:
                         used_offset_words.append(offset_word)
                     elif offset_msg:
                         msg.append(f"自定义集偏移词 {offset_word} 格式有误：{offset_msg}")
                 case _:
                     pass
+            if title != org_title:
+                title_anchors = self._anchor_matcher.search(title)
         return title, msg, {"ignored": used_ignored_words, "replaced": used_replaced_words, "offset": used_offset_words}
 
     @staticmethod
-    def replace_regex(title, replaced, replace) -> (str, str, bool):
+    def replace_regex(title, compiled_word, replace) -> (str, str, bool):
+        replaced_re = compiled_word.get("replaced_re")
+        if not replaced_re:
+            return title, compiled_word.get("replaced_err"), False
         try:
-            if not re.findall(r'%s' % replaced, title):
+            if not replaced_re.search(title):
                 return title, "", False
             else:
-                return re.sub(r'%s' % replaced, r'%s' % replace, title), "", True
+                return replaced_re.sub(r'%s' % replace, title), "", True
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
             return title, str(err), False
@@ -113,14 +210,16 @@ class WordsHelper:
             return title, str(err), False
 
     @staticmethod
-    def episode_offset(title, front, back, offset) -> (str, str, bool):
-        try:
-            if back and not re.findall(r'%s' % back, title):
-                return title, "", False
-            if front and not re.findall(r'%s' % front, title):
+    def episode_offset(title, compiled_word, front, back, offset) -> (str, str, bool):
+        for pattern in ["back", "front", "offset"]:
+            if compiled_word.get(f"{pattern}_err"):
+                return title, compiled_word.get(f"{pattern}_err"), False
+            if pattern != "offset" \
+                    and compiled_word.get(f"{pattern}_re") \
+                    and not compiled_word.get(f"{pattern}_re").search(title):
                 return title, "", False
-            offset_word_info_re = re.compile(r'(?<=%s.*?)[0-9一二三四五六七八九十]+(?=.*?%s)' % (front, back))
-            episode_nums_str = re.findall(offset_word_info_re, title)
+        try:
+            episode_nums_str = compiled_word.get("offset_re").findall(title)
             if not episode_nums_str:
                 return title, "", False
             episode_nums_offset_str = []
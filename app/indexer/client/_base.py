@@ -1,5 +1,5 @@
 import datetime
-import xml.dom.minidom
+import itertools
 from abc import ABCMeta, abstractmethod
 
 import log
@@ -81,14 +81,15 @@ class _IIndexClient(metaclass=ABCMeta):
                                                         replace_word=" ",
                                                         allow_space=True)
         api_url = f"{indexer.domain}?apikey={self.api_key}&t=search&q={search_word}"
+        # 边下载边解析，解析出的种子直接进入过滤
         result_array = self.__parse_torznabxml(api_url)
-        if len(result_array) == 0:
+        first_result = next(result_array, None)
+        if first_result is None:
             log.warn(f"【{self.index_type}】{indexer.name} 未检索到数据")
             self.progress.update(ptype='search', text=f"{indexer.name} 未检索到数据")
             return []
         else:
-            log.warn(f"【{self.index_type}】{indexer.name} 返回数据：{len(result_array)}")
-            return self.filter_search_results(result_array=result_array,
+            return self.filter_search_results(result_array=itertools.chain([first_result], result_array),
                                               order_seq=order_seq,
                                               indexer=indexer,
                                               filter_args=filter_args,
@@ -98,52 +99,46 @@ class _IIndexClient(metaclass=ABCMeta):
     @staticmethod
     def __parse_torznabxml(url):
         """
-        从torznab xml中解析种子信息
+        从torznab xml中流式解析种子信息
         :param url: URL地址
-        :return: 解析出来的种子信息列表
+        :return: 解析出来的种子信息生成器
         """
         if not url:
-            return []
+            return
         try:
-            ret = RequestUtils(timeout=10).get_res(url)
+            ret = RequestUtils(timeout=10).get_res(url, stream=True)
         except Exception as e2:
             ExceptionUtils.exception_traceback(e2)
-            return []
+            return
         if not ret:
-            return []
-        xmls = ret.text
-        if not xmls:
-            return []
-
-        torrents = []
+            return
         try:
-            # 解析XML
-            dom_tree = xml.dom.minidom.parseString(xmls)
-            root_node = dom_tree.documentElement
-            items = root_node.getElementsByTagName("item")
-            for item in items:
+            encoding = ret.encoding if "charset" in ret.headers.get("content-type", "").lower() else None
+            for item in DomUtils.iter_elements(chunks=ret.iter_content(chunk_size=64 * 1024),
+                                               tag_name="item",
+                                               encoding=encoding):
                 try:
                     # indexer id
-                    indexer_id = DomUtils.tag_value(item, "jackettindexer", "id",
-                                                    default=DomUtils.tag_value(item, "prowlarrindexer", "id", ""))
+                    indexer_id = DomUtils.elem_value(item, "jackettindexer", "id",
+                                                     default=DomUtils.elem_value(item, "prowlarrindexer", "id", ""))
                     # indexer
-                    indexer = DomUtils.tag_value(item, "jackettindexer",
-                                                 default=DomUtils.tag_value(item, "prowlarrindexer", default=""))
+                    indexer = DomUtils.elem_value(item, "jackettindexer",
+                                                  default=DomUtils.elem_value(item, "prowlarrindexer", default=""))
 
                     # 标题
-                    title = DomUtils.tag_value(item, "title", default="")
+                    title = DomUtils.elem_value(item, "title", default="")
                     if not title:
                         continue
                     # 种子链接
-                    enclosure = DomUtils.tag_value(item, "enclosure", "url", default="")
+                    enclosure = DomUtils.elem_value(item, "enclosure", "url", default="")
                     if not enclosure:
                         continue
                     # 描述
-                    description = DomUtils.tag_value(item, "description", default="")
+                    description = DomUtils.elem_value(item, "description", default="")
                     # 种子大小
-                    size = DomUtils.tag_value(item, "size", default=0)
+                    size = DomUtils.elem_value(item, "size", default=0)
                     # 种子页面
-                    page_url = DomUtils.tag_value(item, "comments", default="")
+                    page_url = DomUtils.elem_value(item, "comments", default="")
 
                     # 做种数
                     seeders = 0
@@ -158,10 +153,10 @@ class _IIndexClient(metaclass=ABCMeta):
                     # imdbid
                     imdbid = ""
 
-                    torznab_attrs = item.getElementsByTagName("torznab:attr")
+                    torznab_attrs = DomUtils.find_elems(item, "torznab:attr")
                     for torznab_attr in torznab_attrs:
-                        name = torznab_attr.getAttribute('name')
-                        value = torznab_attr.getAttribute('value')
+                        name = torznab_attr.get('name', '')
+                        value = torznab_attr.get('value', '')
                         if name == "seeders":
                             seeders = value
                         if name == "peers":
@@ -175,30 +170,28 @@ class _IIndexClient(metaclass=ABCMeta):
                         if name == "imdbid":
                             imdbid = value
 
-                    tmp_dict = {'indexer_id': indexer_id,
-                                'indexer': indexer,
-                                'title': title,
-                                'enclosure': enclosure,
-                                'description': description,
-                                'size': size,
-                                'seeders': seeders,
-                                'peers': peers,
-                                'freeleech': freeleech,
-                                'downloadvolumefactor': downloadvolumefactor,
-                                'uploadvolumefactor': uploadvolumefactor,
-                                'page_url': page_url,
-                                'imdbid': imdbid}
-                    torrents.append(tmp_dict)
+                    yield {'indexer_id': indexer_id,
+                           'indexer': indexer,
+                           'title': title,
+                           'enclosure': enclosure,
+                           'description': description,
+                           'size': size,
+                           'seeders': seeders,
+                           'peers': peers,
+                           'freeleech': freeleech,
+                           'downloadvolumefactor': downloadvolumefactor,
+                           'uploadvolumefactor': uploadvolumefactor,
+                           'page_url': page_url,
+                           'imdbid': imdbid}
                 except Exception as e:
                     ExceptionUtils.exception_traceback(e)
                     continue
         except Exception as e2:
             ExceptionUtils.exception_traceback(e2)
-            pass
-
-        return torrents
+        finally:
+            ret.close()
 
-    def filter_search_results(self, result_array: list,
+    def filter_search_results(self, result_array,
                               order_seq,
                               indexer,
                               filter_args: dict,
@@ -212,7 +205,10 @@ class _IIndexClient(metaclass=ABCMeta):
         index_rule_fail = 0
         index_match_fail = 0
         index_error = 0
+        # 结果可能是边下载边解析的生成器，需自行计数
+        result_count = 0
         for item in result_array:
+            result_count += 1
             # 名称
             torrent_name = item.get('title')
             # 描述
@@ -371,14 +367,14 @@ class _IIndexClient(metaclass=ABCMeta):
         # 计算耗时
         end_time = datetime.datetime.now()
         log.info(
-            f"【{self.client_name}】{indexer.name} {len(result_array)} 条数据中，"
+            f"【{self.client_name}】{indexer.name} {result_count} 条数据中，"
             f"过滤 {index_rule_fail}，"
             f"不匹配 {index_match_fail}，"
             f"错误 {index_error}，"
             f"有效 {index_sucess}，"
             f"耗时 {(end_time - start_time).seconds} 秒")
         self.progress.update(ptype=ProgressKey.Search,
-                             text=f"{indexer.name} {len(result_array)} 条数据中，"
+                             text=f"{indexer.name} {result_count} 条数据中，"
                                   f"过滤 {index_rule_fail}，"
                                   f"不匹配 {index_match_fail}，"
                                   f"错误 {index_error}，"
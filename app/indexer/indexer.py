@@ -1,5 +1,7 @@
 import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 import log
 from app.helper import ProgressHelper, SubmoduleHelper, DbHelper
@@ -16,6 +18,11 @@ class Indexer(object):
     _client_type = None
     progress = None
     dbhelper = None
+    # 常驻搜索线程池，所有搜索共用
+    _search_executor = None
+    _search_threads = 10
+    # 单个索引站点的搜索超时时间（秒），包括下载、解析和过滤结果，可通过pt.search_timeout配置
+    _search_timeout = 120
 
     def __init__(self):
         self._indexer_schemas = SubmoduleHelper.import_submodules(
@@ -32,6 +39,12 @@ class Indexer(object):
         self._client = self.__get_client(indexer)
         if self._client:
             self._client_type = self._client.get_type()
+        search_timeout = Config().get_config("pt").get('search_timeout')
+        if search_timeout and str(search_timeout).isdigit():
+            self._search_timeout = int(search_timeout)
+        if not self._search_executor:
+            self._search_executor = ThreadPoolExecutor(max_workers=self._search_threads,
+                                                       thread_name_prefix="indexer-search")
 
     def __build_class(self, ctype, conf):
         for indexer_schema in self._indexer_schemas:
@@ -119,13 +132,41 @@ class Indexer(object):
         :param in_from: 搜索渠道
         :return: 命中的资源媒体信息列表
         """
+        ret_array = []
+        for _, result in self.iter_search_by_keyword(key_word=key_word,
+                                                     filter_args=filter_args,
+                                                     match_media=match_media,
+                                                     in_from=in_from):
+            ret_array.extend(result)
+        return ret_array
+
+    def iter_search_by_keyword(self,
+                               key_word: [str, list],
+                               filter_args: dict,
+                               match_media=None,
+                               in_from: SearchType = None,
+                               cancel_event: threading.Event = None,
+                               late_callback=None,
+                               timeout=None):
+        """
+        根据关键字调用 Index API 搜索，每个索引站点返回后立即输出其结果，慢站点不阻塞已返回的结果
+        :param key_word: 搜索的关键字，不能为空
+        :param filter_args: 过滤条件，同search_by_keyword
+        :param match_media: 需要匹配的媒体信息
+        :param in_from: 搜索渠道
+        :param cancel_event: 取消标志，置位后不再等待未返回的索引站点
+        :param timeout: 单个索引站点的搜索超时时间（秒），为空时使用默认值
+        :param late_callback: 超时的站点在后台搜索完成后，通过该回调返回结果：late_callback(索引站点, 资源媒体信息列表)
+        :return: (索引站点, 命中的资源媒体信息列表) 生成器
+        """
         if not key_word:
-            return []
+            return
 
         indexers = self.get_indexers(check=True)
         if not indexers:
             log.error("没有配置索引器，无法搜索！")
-            return []
+            return
+        timeout = timeout or self._search_timeout
         # 计算耗时
         start_time = datetime.datetime.now()
         if filter_args and filter_args.get("site"):
@@ -133,40 +174,85 @@ class Indexer(object):
             self.progress.update(ptype=ProgressKey.Search,
                                  text="开始搜索 %s，站点：%s ..." % (key_word, filter_args.get("site")))
         else:
-            log.info(f"【{self._client_type.value}】开始并行搜索 %s，线程数：%s ..." % (key_word, len(indexers)))
+            log.info(f"【{self._client_type.value}】开始并行搜索 %s，线程数：%s ..."
+                     % (key_word, min(len(indexers), self._search_threads)))
             self.progress.update(ptype=ProgressKey.Search,
-                                 text="开始并行搜索 %s，线程数：%s ..." % (key_word, len(indexers)))
-        # 多线程
-        executor = ThreadPoolExecutor(max_workers=len(indexers))
-        all_task = []
-        for index in indexers:
-            order_seq = 100 - int(index.pri)
-            task = executor.submit(self._client.search,
-                                   order_seq,
-                                   index,
-                                   key_word,
-                                   filter_args,
-                                   match_media,
-                                   in_from)
-            all_task.append(task)
-        ret_array = []
+                                 text="开始并行搜索 %s，线程数：%s ..."
+                                      % (key_word, min(len(indexers), self._search_threads)))
+        # 各站点实际开始搜索的时间，排队中的站点不计入超时
+        started = {}
+
+        def __late_result(_future, _index):
+            """
+            超时站点搜索完成后，记录并返回结果
+            """
+            if _future.cancelled() or _future.exception():
+                return
+            result = _future.result()
+            if not result:
+                return
+            log.info(f"【{self._client_type.value}】{_index.name} 超时后返回 {len(result)} 个资源")
+            if late_callback and not (cancel_event and cancel_event.is_set()):
+                try:
+                    late_callback(_index, result)
+                except Exception as e:
+                    ExceptionUtils.exception_traceback(e)
+
+        def __search(_index):
+            started[_index.id] = time.time()
+            return self._client.search(100 - int(_index.pri),
+                                       _index,
+                                       key_word,
+                                       filter_args,
+                                       match_media,
+                                       in_from)
+
+        pending = {self._search_executor.submit(__search, index): index for index in indexers}
+        result_count = 0
         finish_count = 0
-        for future in as_completed(all_task):
-            result = future.result()
-            finish_count += 1
-            self.progress.update(ptype=ProgressKey.Search,
-                                 value=round(100 * (finish_count / len(all_task))))
-            if result:
-                ret_array = ret_array + result
+        try:
+            while pending:
+                if cancel_event and cancel_event.is_set():
+                    log.info(f"【{self._client_type.value}】搜索已取消，放弃 {len(pending)} 个未返回的站点")
+                    break
+                done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    finish_count += 1
+                    self.progress.update(ptype=ProgressKey.Search,
+                                         value=round(100 * (finish_count / len(indexers))))
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        ExceptionUtils.exception_traceback(e)
+                        continue
+                    if result:
+                        result_count += len(result)
+                        yield index, result
+                # 超时的站点不再等待，线程在后台自然结束
+                now = time.time()
+                for future, index in list(pending.items()):
+                    begin = started.get(index.id)
+                    if begin and now - begin > timeout:
+                        pending.pop(future)
+                        finish_count += 1
+                        log.warn(f"【{self._client_type.value}】{index.name} 搜索超时（{timeout}秒），结果将在后台返回")
+                        future.add_done_callback(lambda _future, _index=index: __late_result(_future, _index))
+                        self.progress.update(ptype=ProgressKey.Search,
+                                             text=f"{index.name} 搜索超时，结果将在后台返回",
+                                             value=round(100 * (finish_count / len(indexers))))
+        finally:
+            # 取消或中途停止迭代时，排队中的站点不再执行
+            for future in pending:
+                future.cancel()
         # 计算耗时
         end_time = datetime.datetime.now()
         log.info(f"【{self._client_type.value}】所有站点搜索完成，有效资源数：%s，总耗时 %s 秒"
-                 % (len(ret_array), (end_time - start_time).seconds))
+                 % (result_count, (end_time - start_time).seconds))
         self.progress.update(ptype=ProgressKey.Search,
                              text="所有站点搜索完成，有效资源数：%s，总耗时 %s 秒"
-                                  % (len(ret_array), (end_time - start_time).seconds),
+                                  % (result_count, (end_time - start_time).seconds),
                              value=100)
-        return ret_array
 
     def get_indexer_statistics(self):
         """
@@ -1,5 +1,5 @@
 from .category import Category
 from .media import Media
-from .scraper import Scraper
+from .scraper import Scraper, ScraperSession
 from .douban import DouBan
 from .bangumi import Bangumi
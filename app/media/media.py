@@ -1,8 +1,10 @@
+import copy
 import difflib
 import os
 import random
 import re
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 
 import zhconv
@@ -38,6 +40,8 @@ class Media:
     _search_tmdbweb = None
     _chatgpt_enable = None
     _default_language = None
+    # 按文件识别时同时查询的名称数
+    _recognize_threads = 4
 
     def __init__(self):
         self.init_config()
@@ -60,8 +64,9 @@ class Media:
             self.tmdb = TMDb()
             # 域名
             self.tmdb.domain = Config().get_tmdbapi_url()
-            # 开启缓存
+            # 开启缓存，查询结果保存在磁盘上，重启后继续使用
             self.tmdb.cache = True
+            self.tmdb.cache_path = os.path.join(Config().get_config_path(), "cache", "tmdb_api.db")
             # APIKEY
             self.tmdb.api_key = app.get('rmt_tmdbkey')
             # 语种
@@ -163,6 +168,24 @@ class Media:
                     ret_names.append(name)
         return tmdb_info, ret_names
 
+    def get_tmdb_names(self, mtype: MediaType, tmdbid):
+        """
+        查询媒体在TMDB中的标题、原始标题和所有译名，用于订阅的名称匹配
+        :param mtype: 类型：电影、电视剧、动漫
+        :param tmdbid: TMDB的ID
+        :return: 所有名称的清单
+        """
+        if not self.tmdb:
+            return []
+        tmdb_info, names = self.__search_tmdb_allnames(mtype, tmdbid)
+        if not tmdb_info:
+            return names
+        if mtype == MediaType.MOVIE:
+            titles = [tmdb_info.get("title"), tmdb_info.get("original_title")]
+        else:
+            titles = [tmdb_info.get("name"), tmdb_info.get("original_name")]
+        return [title for title in titles if title and title not in names] + names
+
     def __search_tmdb(self, file_media_name,
                       search_type,
                       first_media_year=None,
@@ -901,11 +924,15 @@ class Media:
             return {}
         # 设置语言
         self.__set_language(language)
-        # 返回结果
-        return_media_infos = {}
         # 不是list的转为list
         if not isinstance(file_list, list):
             file_list = [file_list]
+        # 识别后的文件，按文件顺序
+        file_meta_infos = []
+        # 按名称分组的待搜索文件
+        search_groups = {}
+        # 上级目录的识别结果，同一目录下的文件只识别一次
+        parent_infos = {}
         # 遍历每个文件，看得出来的名称是不是不一样，不一样的先搜索媒体信息
         for file_path in file_list:
             try:
@@ -915,8 +942,6 @@ class Media:
                 # 解析媒体名称
                 # 先用自己的名称
                 file_name = os.path.basename(file_path)
-                parent_name = os.path.basename(os.path.dirname(file_path))
-                parent_parent_name = os.path.basename(PathUtils.get_parent_paths(file_path, 2))
                 # 过滤掉蓝光原盘目录下的子文件
                 if not os.path.isdir(file_path) \
                         and PathUtils.get_bluray_dir(file_path):
@@ -928,15 +953,7 @@ class Media:
                     meta_info = MetaInfo(title=file_name)
                     # 识别不到则使用上级的名称
                     if not meta_info.get_name() or not meta_info.year:
-                        parent_info = MetaInfo(parent_name)
-                        if not parent_info.get_name() or not parent_info.year:
-                            parent_parent_info = MetaInfo(parent_parent_name)
-                            parent_info.type = parent_parent_info.type if parent_parent_info.type and parent_info.type != MediaType.TV else parent_info.type
-                            parent_info.cn_name = parent_parent_info.cn_name if parent_parent_info.cn_name else parent_info.cn_name
-                            parent_info.en_name = parent_parent_info.en_name if parent_parent_info.en_name else parent_info.en_name
-                            parent_info.year = parent_parent_info.year if parent_parent_info.year else parent_info.year
-                            parent_info.begin_season = NumberUtils.max_ele(parent_info.begin_season,
-                                                                           parent_parent_info.begin_season)
+                        parent_info = self.__get_parent_meta_info(file_path, parent_infos)
                         if not meta_info.get_name():
                             meta_info.cn_name = parent_info.cn_name
                             meta_info.en_name = parent_info.en_name
@@ -951,9 +968,9 @@ class Media:
                     if not meta_info.get_name() or not meta_info.type:
                         log.warn("【Rmt】%s 未识别出有效信息！" % meta_info.org_string)
                         continue
-                    # 区配缓存及TMDB
-                    file_media_info = self.__fill_media_info(meta_info, True, False, chinese)
-                    meta_info.set_tmdb_info(file_media_info)
+                    # 名称、年份、类型、季相同的文件只需要搜索一次
+                    group_key = (self.__make_cache_key(meta_info), meta_info.cn_name, meta_info.en_name)
+                    search_groups.setdefault(group_key, []).append(meta_info)
                 # 自带TMDB信息
                 else:
                     meta_info = MetaInfo(title=file_name, mtype=media_type)
@@ -969,14 +986,77 @@ class Media:
                             meta_info.end_episode = end_ep
                     # 加入缓存
                     self.save_rename_cache(file_name, tmdb_info)
-                # 按文件路程存储
-                return_media_infos[file_path] = meta_info
+                file_meta_infos.append((file_path, meta_info))
             except Exception as err:
                 print(str(err))
                 log.error("【Rmt】发生错误：%s - %s" % (str(err), traceback.format_exc()))
+        # 区配缓存及TMDB，不同名称的分组并发查询
+        failed_metas = set()
+        if search_groups:
+            groups = list(search_groups.values())
+            if len(groups) > 1:
+                with ThreadPoolExecutor(max_workers=min(len(groups), self._recognize_threads)) as executor:
+                    for failed in executor.map(lambda x: self.__fill_media_info_group(x, chinese), groups):
+                        failed_metas.update(failed)
+            else:
+                failed_metas.update(self.__fill_media_info_group(groups[0], chinese))
+        # 按文件路程存储
+        return_media_infos = {}
+        for file_path, meta_info in file_meta_infos:
+            if id(meta_info) in failed_metas:
+                continue
+            return_media_infos[file_path] = meta_info
         # 循环结束
         return return_media_infos
 
+    @staticmethod
+    def __get_parent_meta_info(file_path, parent_infos):
+        """
+        识别文件上级及上上级目录的名称，结果按目录保存在parent_infos中
+        """
+        parent_name = os.path.basename(os.path.dirname(file_path))
+        parent_parent_name = os.path.basename(PathUtils.get_parent_paths(file_path, 2))
+        parent_key = (parent_name, parent_parent_name)
+        if parent_key in parent_infos:
+            return parent_infos[parent_key]
+        parent_info = MetaInfo(parent_name)
+        if not parent_info.get_name() or not parent_info.year:
+            parent_parent_info = MetaInfo(parent_parent_name)
+            parent_info.type = parent_parent_info.type if parent_parent_info.type and parent_info.type != MediaType.TV else parent_info.type
+            parent_info.cn_name = parent_parent_info.cn_name if parent_parent_info.cn_name else parent_info.cn_name
+            parent_info.en_name = parent_parent_info.en_name if parent_parent_info.en_name else parent_info.en_name
+            parent_info.year = parent_parent_info.year if parent_parent_info.year else parent_info.year
+            parent_info.begin_season = NumberUtils.max_ele(parent_info.begin_season,
+                                                           parent_parent_info.begin_season)
+        parent_infos[parent_key] = parent_info
+        return parent_info
+
+    def __fill_media_info_group(self, meta_infos, chinese=True):
+        """
+        为同名的一组文件查询TMDB信息：第一个文件正常搜索并写入缓存，
+        第二个文件从缓存中获取，其余文件复制第二个文件的结果
+        :return: 查询出错的MetaInfo对象id
+        """
+        failed = set()
+        cache_media_info = None
+        for index, meta_info in enumerate(meta_infos):
+            try:
+                if index < 2:
+                    file_media_info = self.__fill_media_info(meta_info, True, False, chinese)
+                    if index == 1:
+                        cache_media_info = file_media_info
+                else:
+                    file_media_info = copy.deepcopy(cache_media_info)
+                meta_info.set_tmdb_info(file_media_info)
+            except Exception as err:
+                print(str(err))
+                log.error("【Rmt】发生错误：%s - %s" % (str(err), traceback.format_exc()))
+                failed.add(id(meta_info))
+                if index == 1:
+                    # 缓存查询失败时，其余文件各自查询
+                    return failed | self.__fill_media_info_group(meta_infos[2:], chinese)
+        return failed
+
     def __dict_tmdbpersons(self, infos, chinese=True):
         """
         TMDB人员信息转为字典
@@ -148,6 +148,11 @@ class MetaBase(object):
     _subtitle_season_all_re = r"[全|共]\s*([0-9一二三四五六七八九十]+)\s*季|([0-9一二三四五六七八九十]+)\s*季\s*[全|共]"
     _subtitle_episode_re = r"(?<![全|共]\s*)[第\s]+([0-9一二三四五六七八九十百零EP\-]+)\s*[集话話期](?!\s*[全|共])"
     _subtitle_episode_all_re = r"([0-9一二三四五六七八九十百零]+)\s*集\s*[全|共]|[全|共]\s*([0-9一二三四五六七八九十百零]+)\s*[集话話期]"
+    _subtitle_flag_re_c = re.compile(r'[全第季集话話期]', re.IGNORECASE)
+    _subtitle_season_re_c = re.compile(_subtitle_season_re, re.IGNORECASE)
+    _subtitle_season_all_re_c = re.compile(_subtitle_season_all_re, re.IGNORECASE)
+    _subtitle_episode_re_c = re.compile(_subtitle_episode_re, re.IGNORECASE)
+    _subtitle_episode_all_re_c = re.compile(_subtitle_episode_all_re, re.IGNORECASE)
 
     def __init__(self, title, subtitle=None, fileflag=False):
         self.category_handler = Category()
@@ -645,9 +650,9 @@ class MetaBase(object):
         if not title_text:
             return
         title_text = f" {title_text} "
-        if re.search(r'[全第季集话話期]', title_text, re.IGNORECASE):
+        if self._subtitle_flag_re_c.search(title_text):
             # 第x季
-            season_str = re.search(r'%s' % self._subtitle_season_re, title_text, re.IGNORECASE)
+            season_str = self._subtitle_season_re_c.search(title_text)
             if season_str:
                 seasons = season_str.group(1)
                 if seasons:
@@ -678,7 +683,7 @@ class MetaBase(object):
                 self.type = MediaType.TV
                 self._subtitle_flag = True
             # 第x集
-            episode_str = re.search(r'%s' % self._subtitle_episode_re, title_text, re.IGNORECASE)
+            episode_str = self._subtitle_episode_re_c.search(title_text)
             if episode_str:
                 episodes = episode_str.group(1)
                 if episodes:
@@ -709,7 +714,7 @@ class MetaBase(object):
                 self.type = MediaType.TV
                 self._subtitle_flag = True
             # x集全
-            episode_all_str = re.search(r'%s' % self._subtitle_episode_all_re, title_text, re.IGNORECASE)
+            episode_all_str = self._subtitle_episode_all_re_c.search(title_text)
             if episode_all_str:
                 episode_all = episode_all_str.group(1)
                 if not episode_all:
@@ -725,7 +730,7 @@ class MetaBase(object):
                     self.type = MediaType.TV
                     self._subtitle_flag = True
             # 全x季 x季全
-            season_all_str = re.search(r"%s" % self._subtitle_season_all_re, title_text, re.IGNORECASE)
+            season_all_str = self._subtitle_season_all_re_c.search(title_text)
             if season_all_str:
                 season_all = season_all_str.group(1)
                 if not season_all:
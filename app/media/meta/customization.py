@@ -9,10 +9,14 @@ class CustomizationMatcher(object):
     """
     customization = None
     custom_separator = None
+    _customization_re = None
+    # 配置版本，自定义占位符变化时递增
+    version = 0
 
     def __init__(self):
         self.customization = None
         self.custom_separator = None
+        self._customization_re = None
 
     def match(self, title=None):
         """
@@ -23,10 +27,11 @@ class CustomizationMatcher(object):
             return ""
         if not self.customization:
             return ""
-        customization_re = re.compile(r"%s" % self.customization)
+        if not self._customization_re:
+            self._customization_re = re.compile(r"%s" % self.customization)
         # 处理重复多次的情况，保留先后顺序（按添加自定义占位符的顺序）
         unique_customization = {}
-        for item in re.findall(customization_re, title):
+        for item in self._customization_re.findall(title):
             if not isinstance(item, tuple):
                 item = (item,)
             for i in range(len(item)):
@@ -42,3 +47,5 @@ class CustomizationMatcher(object):
         """
         self.customization = customization
         self.custom_separator = separator
+        self._customization_re = None
+        self.version += 1
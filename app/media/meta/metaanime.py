@@ -16,6 +16,21 @@ class MetaAnime(MetaBase):
     """
     _anime_no_words = ['CHS&CHT', 'MP4', 'GB MP4', 'WEB-DL']
     _name_nostring_re = r"S\d{2}\s*-\s*S\d{2}|S\d{2}|\s+S\d{1,2}|EP?\d{2,4}\s*-\s*EP?\d{2,4}|EP?\d{2,4}|\s+EP?\d{1,4}"
+    # 预编译正则
+    _name_nostring_re_c = re.compile(_name_nostring_re, re.IGNORECASE)
+    _bracket_name_re_c = re.compile(r'\[(.+?)]')
+    _pix_x_re_c = re.compile(r'x', re.IGNORECASE)
+    _pix_split_re_c = re.compile(r'[Xx]')
+    _bangumi_re_c = re.compile(r"新番|月?番|[日美国][漫剧]")
+    _bangumi_prefix_re_c = re.compile(".*番.|.*[日美国][漫剧].")
+    _category_re_c = re.compile(r"[动漫画纪录片电影视连续剧集日美韩中港台海外亚洲华语大陆综艺原盘高清]{2,}|TV|Animation|Movie|Documentar|Anime",
+                                re.IGNORECASE)
+    _first_item_re_c = re.compile(r"^[^]]*]")
+    _size_re_c = re.compile(r'[0-9.]+\s*[MGT]i?B(?![A-Z]+)', re.IGNORECASE)
+    _tv_episode_re_c = re.compile(r"\[TV\s+(\d{1,4})", re.IGNORECASE)
+    _4k_re_c = re.compile(r'\[4k]', re.IGNORECASE)
+    _bracket_digit_re_c = re.compile(r"\[\d+", re.IGNORECASE)
+    _name_chars_re_c = re.compile(r'[\d|#:：\-()（）\u4e00-\u9fff]')
 
     def __init__(self, title, subtitle=None, fileflag=False):
         super().__init__(title, subtitle, fileflag)
@@ -38,7 +53,7 @@ class MetaAnime(MetaBase):
                     if anitopy_info:
                         name = anitopy_info.get("anime_title")
                 if not name or name in self._anime_no_words or (len(name) < 5 and not StringUtils.is_chinese(name)):
-                    name_match = re.search(r'\[(.+?)]', title)
+                    name_match = self._bracket_name_re_c.search(title)
                     if name_match and name_match.group(1):
                         name = name_match.group(1).strip()
                 # 拆份中英文名称
@@ -63,10 +78,10 @@ class MetaAnime(MetaBase):
                 if self.cn_name:
                     _, self.cn_name, _, _, _, _ = StringUtils.get_keyword_from_string(self.cn_name)
                     if self.cn_name:
-                        self.cn_name = re.sub(r'%s' % self._name_nostring_re, '', self.cn_name, flags=re.IGNORECASE).strip()
+                        self.cn_name = self._name_nostring_re_c.sub('', self.cn_name).strip()
                         self.cn_name = zhconv.convert(self.cn_name, "zh-hans")
                 if self.en_name:
-                    self.en_name = re.sub(r'%s' % self._name_nostring_re, '', self.en_name, flags=re.IGNORECASE).strip().title()
+                    self.en_name = self._name_nostring_re_c.sub('', self.en_name).strip().title()
                     self._name = StringUtils.str_title(self.en_name)
                 # 年份
                 year = anitopy_info.get("anime_year")
@@ -137,8 +152,8 @@ class MetaAnime(MetaBase):
                 if isinstance(self.resource_pix, list):
                     self.resource_pix = self.resource_pix[0]
                 if self.resource_pix:
-                    if re.search(r'x', self.resource_pix, re.IGNORECASE):
-                        self.resource_pix = re.split(r'[Xx]', self.resource_pix)[-1] + "p"
+                    if self._pix_x_re_c.search(self.resource_pix):
+                        self.resource_pix = self._pix_split_re_c.split(self.resource_pix)[-1] + "p"
                     else:
                         self.resource_pix = self.resource_pix.lower()
                     if str(self.resource_pix).isdigit():
@@ -166,8 +181,8 @@ class MetaAnime(MetaBase):
         except Exception as e:
             ExceptionUtils.exception_traceback(e)
 
-    @staticmethod
-    def __prepare_title(title):
+    @classmethod
+    def __prepare_title(cls, title):
         """
         对命名进行预处理
         """
@@ -176,23 +191,21 @@ class MetaAnime(MetaBase):
         # 所有【】换成[]
         title = title.replace("【", "[").replace("】", "]").strip()
         # 截掉xx番剧漫
-        match = re.search(r"新番|月?番|[日美国][漫剧]", title)
+        match = cls._bangumi_re_c.search(title)
         if match and match.span()[1] < len(title) - 1:
-            title = re.sub(".*番.|.*[日美国][漫剧].", "", title)
+            title = cls._bangumi_prefix_re_c.sub("", title)
         elif match:
             title = title[:title.rfind('[')]
         # 截掉分类
         first_item = title.split(']')[0]
-        if first_item and re.search(r"[动漫画纪录片电影视连续剧集日美韩中港台海外亚洲华语大陆综艺原盘高清]{2,}|TV|Animation|Movie|Documentar|Anime",
-                                    zhconv.convert(first_item, "zh-hans"),
-                                    re.IGNORECASE):
-            title = re.sub(r"^[^]]*]", "", title).strip()
+        if first_item and cls._category_re_c.search(zhconv.convert(first_item, "zh-hans")):
+            title = cls._first_item_re_c.sub("", title).strip()
         # 去掉大小
-        title = re.sub(r'[0-9.]+\s*[MGT]i?B(?![A-Z]+)', "", title, flags=re.IGNORECASE)
+        title = cls._size_re_c.sub("", title)
         # 将TVxx改为xx
-        title = re.sub(r"\[TV\s+(\d{1,4})", r"[\1", title, flags=re.IGNORECASE)
+        title = cls._tv_episode_re_c.sub(r"[\1", title)
         # 将4K转为2160p
-        title = re.sub(r'\[4k]', '2160p', title, flags=re.IGNORECASE)
+        title = cls._4k_re_c.sub('2160p', title)
         # 处理/分隔的中英文标题
         names = title.split("]")
         if len(names) > 1 and title.find("- ") == -1:
@@ -211,8 +224,8 @@ class MetaAnime(MetaBase):
                         titles.append("%s%s" % (left_char, name.split("/")[0].strip()))
                 elif name:
                     if StringUtils.is_chinese(name) and not StringUtils.is_all_chinese(name):
-                        if not re.search(r"\[\d+", name, re.IGNORECASE):
-                            name = re.sub(r'[\d|#:：\-()（）\u4e00-\u9fff]', '', name).strip()
+                        if not cls._bracket_digit_re_c.search(name):
+                            name = cls._name_chars_re_c.sub('', name).strip()
                         if not name or name.strip().isdigit():
                             continue
                     if name == '[':
@@ -1,13 +1,31 @@
+import copy
 import os.path
+import threading
+
 import regex as re
+from cacheout import LRUCache
 
 import log
 from app.helper import WordsHelper
+from app.media.meta.customization import CustomizationMatcher
 from app.media.meta.metaanime import MetaAnime
 from app.media.meta.metavideo import MetaVideo
+from app.media.meta.release_groups import ReleaseGroupsMatcher
 from app.utils.types import MediaType
 from config import RMT_MEDIAEXT
 
+# 识别结果缓存，KEY中包含识别词和制作组配置的版本，配置变化后旧结果自然失效
+_META_CACHE = LRUCache(maxsize=2048)
+_META_CACHE_STATS = {"hits": 0, "misses": 0}
+_meta_cache_lock = threading.Lock()
+
+# 动漫判断正则
+_ANIME_BRACKET_RE = re.compile(r'【[+0-9XVPI-]+】\s*【', re.IGNORECASE)
+_ANIME_EPISODE_RE = re.compile(r'\s+-\s+[\dv]{1,4}\s+', re.IGNORECASE)
+_VIDEO_SEASON_EPISODE_RE = re.compile(r"S\d{2}\s*-\s*S\d{2}|S\d{2}|\s+S\d{1,2}|EP?\d{2,4}\s*-\s*EP?\d{2,4}|EP?\d{2,4}|\s+EP?\d{1,4}",
+                                      re.IGNORECASE)
+_ANIME_SQUARE_BRACKET_RE = re.compile(r'\[[+0-9XVPI-]+]\s*\[', re.IGNORECASE)
+
 
 def MetaInfo(title, subtitle=None, mtype=None):
     """
@@ -17,7 +35,28 @@ def MetaInfo(title, subtitle=None, mtype=None):
     :param mtype: 指定识别类型，为空则自动识别类型
     :return: MetaAnime、MetaVideo
     """
+    cache_key = (title,
+                 subtitle,
+                 mtype,
+                 WordsHelper().version,
+                 ReleaseGroupsMatcher().version,
+                 CustomizationMatcher().version)
+    meta_info = _META_CACHE.get(cache_key)
+    if meta_info is not None:
+        with _meta_cache_lock:
+            _META_CACHE_STATS["hits"] += 1
+        return _copy_meta_info(meta_info)
+    with _meta_cache_lock:
+        _META_CACHE_STATS["misses"] += 1
+    meta_info = _parse_meta_info(title, subtitle)
+    _META_CACHE.set(cache_key, meta_info)
+    return _copy_meta_info(meta_info)
 
+
+def _parse_meta_info(title, subtitle=None):
+    """
+    应用识别词并识别名称
+    """
     # 记录原始名称
     org_title = title
     # 应用自定义识别词，获取识别词处理后名称
@@ -49,6 +88,37 @@ def MetaInfo(title, subtitle=None, mtype=None):
     return meta_info
 
 
+def _copy_meta_info(meta_info):
+    """
+    复制缓存的识别结果，调用方修改返回对象时不影响缓存
+    """
+    new_meta_info = copy.copy(meta_info)
+    for key, value in vars(meta_info).items():
+        if isinstance(value, (list, dict)):
+            setattr(new_meta_info, key, copy.copy(value))
+    return new_meta_info
+
+
+def get_metainfo_cache_stats():
+    """
+    获取识别结果缓存的命中统计
+    :return: 命中次数、未命中次数、缓存条目数
+    """
+    with _meta_cache_lock:
+        return {
+            "hits": _META_CACHE_STATS["hits"],
+            "misses": _META_CACHE_STATS["misses"],
+            "size": _META_CACHE.size()
+        }
+
+
+def clear_metainfo_cache():
+    """
+    清空识别结果缓存
+    """
+    _META_CACHE.clear()
+
+
 def is_anime(name):
     """
     判断是否为动漫
@@ -57,13 +127,12 @@ def is_anime(name):
     """
     if not name:
         return False
-    if re.search(r'【[+0-9XVPI-]+】\s*【', name, re.IGNORECASE):
+    if _ANIME_BRACKET_RE.search(name):
         return True
-    if re.search(r'\s+-\s+[\dv]{1,4}\s+', name, re.IGNORECASE):
+    if _ANIME_EPISODE_RE.search(name):
         return True
-    if re.search(r"S\d{2}\s*-\s*S\d{2}|S\d{2}|\s+S\d{1,2}|EP?\d{2,4}\s*-\s*EP?\d{2,4}|EP?\d{2,4}|\s+EP?\d{1,4}", name,
-                 re.IGNORECASE):
+    if _VIDEO_SEASON_EPISODE_RE.search(name):
         return False
-    if re.search(r'\[[+0-9XVPI-]+]\s*\[', name, re.IGNORECASE):
+    if _ANIME_SQUARE_BRACKET_RE.search(name):
         return True
     return False
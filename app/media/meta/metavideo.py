@@ -1,5 +1,7 @@
 import os
 import re
+from collections import namedtuple
+from functools import lru_cache
 
 from config import RMT_MEDIAEXT
 from app.media.meta._base import MetaBase
@@ -9,6 +11,10 @@ from app.utils.types import MediaType
 from app.media.meta.release_groups import ReleaseGroupsMatcher
 from app.media.meta.customization import CustomizationMatcher
 
+# 单个token的识别结果
+TokenInfo = namedtuple("TokenInfo", ["roman", "season", "episode", "resources_type", "part",
+                                     "pix", "pix2", "source", "effect", "video_encode", "audio_encode"])
+
 
 class MetaVideo(MetaBase):
     """
@@ -49,6 +55,29 @@ class MetaVideo(MetaBase):
     _resources_pix_re2 = r"(^[248]+K)"
     _video_encode_re = r"^[HX]26[45]$|^AVC$|^HEVC$|^VC\d?$|^MPEG\d?$|^Xvid$|^DivX$|^HDR\d*$"
     _audio_encode_re = r"^DTS\d?$|^DTSHD$|^DTSHDMA$|^Atmos$|^TrueHD\d?$|^AC3$|^\dAudios?$|^DDP\d?$|^DD\d?$|^LPCM\d?$|^AAC\d?$|^FLAC\d?$|^HD\d?$|^MA\d?$"
+    # 预编译正则式区，导入时只编译一次
+    _season_re_c = re.compile(_season_re, re.IGNORECASE)
+    _episode_re_c = re.compile(_episode_re, re.IGNORECASE)
+    _part_re_c = re.compile(_part_re, re.IGNORECASE)
+    _roman_numerals_c = re.compile(_roman_numerals)
+    _source_re_c = re.compile(r"(%s)" % _source_re, re.IGNORECASE)
+    _effect_re_c = re.compile(r"(%s)" % _effect_re, re.IGNORECASE)
+    _resources_type_re_c = re.compile(r"(%s)" % _resources_type_re, re.IGNORECASE)
+    _name_no_begin_re_c = re.compile(_name_no_begin_re)
+    _name_no_chinese_re_c = re.compile(_name_no_chinese_re, re.IGNORECASE)
+    _name_se_words_c = re.compile("%s" % _name_se_words, re.IGNORECASE)
+    _name_nostring_re_c = re.compile(_name_nostring_re, re.IGNORECASE)
+    _resources_pix_re_c = re.compile(_resources_pix_re, re.IGNORECASE)
+    _resources_pix_re2_c = re.compile(_resources_pix_re2, re.IGNORECASE)
+    _video_encode_re_c = re.compile(r"(%s)" % _video_encode_re, re.IGNORECASE)
+    _audio_encode_re_c = re.compile(r"(%s)" % _audio_encode_re, re.IGNORECASE)
+    _year_range_re_c = re.compile(r'([\s.]+)(\d{4})-(\d{4})')
+    _size_re_c = re.compile(r'[0-9.]+\s*[MGT]i?B(?![A-Z]+)', re.IGNORECASE)
+    _date_re_c = re.compile(r'\d{4}[\s._-]\d{1,2}[\s._-]\d{1,2}')
+    _diy_re_c = re.compile(r'D[Ii]Y')
+    _diy_title_re_c = re.compile(r'-D[Ii]Y@')
+    _season_end_re_c = re.compile(r"SEASON$", re.IGNORECASE)
+    _spaces_re_c = re.compile(r'\s+')
 
     def __init__(self, title, subtitle=None, fileflag=False):
         super().__init__(title, subtitle, fileflag)
@@ -66,13 +95,13 @@ class MetaVideo(MetaBase):
             self.type = MediaType.TV
             return
         # 去掉名称中第1个[]的内容
-        title = re.sub(r'%s' % self._name_no_begin_re, "", title, count=1)
+        title = self._name_no_begin_re_c.sub("", title, count=1)
         # 把xxxx-xxxx年份换成前一个年份，常出现在季集上
-        title = re.sub(r'([\s.]+)(\d{4})-(\d{4})', r'\1\2', title)
+        title = self._year_range_re_c.sub(r'\1\2', title)
         # 把大小去掉
-        title = re.sub(r'[0-9.]+\s*[MGT]i?B(?![A-Z]+)', "", title, flags=re.IGNORECASE)
+        title = self._size_re_c.sub("", title)
         # 把年月日去掉
-        title = re.sub(r'\d{4}[\s._-]\d{1,2}[\s._-]\d{1,2}', "", title)
+        title = self._date_re_c.sub("", title)
         # 拆分tokens
         tokens = Tokens(title)
         self.tokens = tokens
@@ -116,8 +145,8 @@ class MetaVideo(MetaBase):
             self.resource_type = self._source.strip()
         # 提取原盘DIY
         if self.resource_type and "BluRay" in self.resource_type:
-            if (self.subtitle and re.findall(r'D[Ii]Y', self.subtitle)) \
-                    or re.findall(r'-D[Ii]Y@', original_title):
+            if (self.subtitle and self._diy_re_c.search(self.subtitle)) \
+                    or self._diy_title_re_c.search(original_title):
                 self.resource_type = f"{self.resource_type} DIY"
         # 解析副标题，只要季和集
         self.init_subtitle(self.org_string)
@@ -140,9 +169,8 @@ class MetaVideo(MetaBase):
     def __fix_name(self, name):
         if not name:
             return name
-        name = re.sub(r'%s' % self._name_nostring_re, '', name,
-                      flags=re.IGNORECASE).strip()
-        name = re.sub(r'\s+', ' ', name)
+        name = self._name_nostring_re_c.sub('', name).strip()
+        name = self._spaces_re_c.sub(' ', name)
         if name.isdigit() \
                 and int(name) < 1800 \
                 and not self.year \
@@ -158,6 +186,30 @@ class MetaVideo(MetaBase):
                 name = None
         return name
 
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def classify_token(token):
+        """
+        一次性计算token对各类正则的匹配结果，相同的token在不同标题间大量重复，结果被缓存
+        """
+        source = MetaVideo._source_re_c.search(token)
+        effect = MetaVideo._effect_re_c.search(token)
+        part = MetaVideo._part_re_c.search(token)
+        pix2 = MetaVideo._resources_pix_re2_c.search(token)
+        video_encode = MetaVideo._video_encode_re_c.search(token)
+        audio_encode = MetaVideo._audio_encode_re_c.search(token)
+        return TokenInfo(roman=bool(MetaVideo._roman_numerals_c.search(token)),
+                         season=tuple(MetaVideo._season_re_c.findall(token)),
+                         episode=tuple(MetaVideo._episode_re_c.findall(token)),
+                         resources_type=bool(MetaVideo._resources_type_re_c.search(token)),
+                         part=part.group(1) if part else None,
+                         pix=tuple(MetaVideo._resources_pix_re_c.findall(token)),
+                         pix2=pix2.group(1) if pix2 else None,
+                         source=source.group(1) if source else None,
+                         effect=effect.group(1) if effect else None,
+                         video_encode=video_encode.group(1) if video_encode else None,
+                         audio_encode=audio_encode.group(1) if audio_encode else None)
+
     def __init_name(self, token):
         if not token:
             return
@@ -185,12 +237,13 @@ class MetaVideo(MetaBase):
             if not self.cn_name:
                 self.cn_name = token
             elif not self._stop_cnname_flag:
-                if not re.search("%s" % self._name_no_chinese_re, token, flags=re.IGNORECASE) \
-                        and not re.search("%s" % self._name_se_words, token, flags=re.IGNORECASE):
+                if not self._name_no_chinese_re_c.search(token) \
+                        and not self._name_se_words_c.search(token):
                     self.cn_name = "%s %s" % (self.cn_name, token)
                 self._stop_cnname_flag = True
         else:
-            is_roman_digit = re.search(self._roman_numerals, token)
+            token_info = self.classify_token(token)
+            is_roman_digit = token_info.roman
             # 阿拉伯数字或者罗马数字
             if token.isdigit() or is_roman_digit:
                 # 第季集后面的不要
@@ -226,16 +279,16 @@ class MetaVideo(MetaBase):
                     # 名字未出现前的第一个数字，记下来
                     if not self._unknown_name_str:
                         self._unknown_name_str = token
-            elif re.search(r"%s" % self._season_re, token, re.IGNORECASE):
+            elif token_info.season:
                 # 季的处理
-                if self.en_name and re.search(r"SEASON$", self.en_name, re.IGNORECASE):
+                if self.en_name and self._season_end_re_c.search(self.en_name):
                     # 如果匹配到季，英文名结尾为Season，说明Season属于标题，不应在后续作为干扰词去除
                     self.en_name += ' '
                 self._stop_name_flag = True
                 return
-            elif re.search(r"%s" % self._episode_re, token, re.IGNORECASE) \
-                    or re.search(r"(%s)" % self._resources_type_re, token, re.IGNORECASE) \
-                    or re.search(r"%s" % self._resources_pix_re, token, re.IGNORECASE):
+            elif token_info.episode \
+                    or token_info.resources_type \
+                    or token_info.pix:
                 # 集、来源、版本等不要
                 self._stop_name_flag = True
                 return
@@ -259,10 +312,10 @@ class MetaVideo(MetaBase):
                 and not self.resource_pix \
                 and not self.resource_type:
             return
-        re_res = re.search(r"%s" % self._part_re, token, re.IGNORECASE)
-        if re_res:
+        part = self.classify_token(token).part
+        if part:
             if not self.part:
-                self.part = re_res.group(1)
+                self.part = part
             nextv = self.tokens.cur()
             if nextv \
                     and ((nextv.isdigit() and (len(nextv) == 1 or len(nextv) == 2 and nextv.startswith('0')))
@@ -287,7 +340,7 @@ class MetaVideo(MetaBase):
                 self.en_name = "%s %s" % (self.en_name.strip(), self.year)
             elif self.cn_name:
                 self.cn_name = "%s %s" % (self.cn_name, self.year)
-        elif self.en_name and re.search(r"SEASON$", self.en_name, re.IGNORECASE):
+        elif self.en_name and self._season_end_re_c.search(self.en_name):
             # 如果匹配到年，且英文名结尾为Season，说明Season属于标题，不应在后续作为干扰词去除
             self.en_name += ' '
         self.year = token
@@ -298,7 +351,8 @@ class MetaVideo(MetaBase):
     def __init_resource_pix(self, token):
         if not self.get_name():
             return
-        re_res = re.findall(r"%s" % self._resources_pix_re, token, re.IGNORECASE)
+        token_info = self.classify_token(token)
+        re_res = token_info.pix
         if re_res:
             self._last_token_type = "pix"
             self._continue_flag = False
@@ -323,16 +377,15 @@ class MetaVideo(MetaBase):
                     and self.resource_pix[-1] not in 'kpi':
                 self.resource_pix = "%sp" % self.resource_pix
         else:
-            re_res = re.search(r"%s" % self._resources_pix_re2, token, re.IGNORECASE)
-            if re_res:
+            if token_info.pix2:
                 self._last_token_type = "pix"
                 self._continue_flag = False
                 self._stop_name_flag = True
                 if not self.resource_pix:
-                    self.resource_pix = re_res.group(1).lower()
+                    self.resource_pix = token_info.pix2.lower()
 
     def __init_season(self, token):
-        re_res = re.findall(r"%s" % self._season_re, token, re.IGNORECASE)
+        re_res = self.classify_token(token).season
         if re_res:
             self._last_token_type = "season"
             self.type = MediaType.TV
@@ -379,7 +432,7 @@ class MetaVideo(MetaBase):
             self._last_token_type = "SEASON"
 
     def __init_episode(self, token):
-        re_res = re.findall(r"%s" % self._episode_re, token, re.IGNORECASE)
+        re_res = self.classify_token(token).episode
         if re_res:
             self._last_token_type = "episode"
             self._continue_flag = False
@@ -451,13 +504,13 @@ class MetaVideo(MetaBase):
     def __init_resource_type(self, token):
         if not self.get_name():
             return
-        source_res = re.search(r"(%s)" % self._source_re, token, re.IGNORECASE)
-        if source_res:
+        token_info = self.classify_token(token)
+        if token_info.source:
             self._last_token_type = "source"
             self._continue_flag = False
             self._stop_name_flag = True
             if not self._source:
-                self._source = source_res.group(1)
+                self._source = token_info.source
                 self._last_token = self._source.upper()
             return
         elif token.upper() == "DL" \
@@ -476,12 +529,11 @@ class MetaVideo(MetaBase):
             self._source = "WEB-DL"
             self._continue_flag = False
             return
-        effect_res = re.search(r"(%s)" % self._effect_re, token, re.IGNORECASE)
-        if effect_res:
+        if token_info.effect:
             self._last_token_type = "effect"
             self._continue_flag = False
             self._stop_name_flag = True
-            effect = effect_res.group(1)
+            effect = token_info.effect
             if effect not in self._effect:
                 self._effect.append(effect)
             self._last_token = effect.upper()
@@ -495,17 +547,17 @@ class MetaVideo(MetaBase):
                 and not self.begin_season \
                 and not self.begin_episode:
             return
-        re_res = re.search(r"(%s)" % self._video_encode_re, token, re.IGNORECASE)
-        if re_res:
+        video_encode = self.classify_token(token).video_encode
+        if video_encode:
             self._continue_flag = False
             self._stop_name_flag = True
             self._last_token_type = "videoencode"
             if not self.video_encode:
-                self.video_encode = re_res.group(1).upper()
+                self.video_encode = video_encode.upper()
                 self._last_token = self.video_encode
             elif self.video_encode == "10bit":
-                self.video_encode = f"{re_res.group(1).upper()} 10bit"
-                self._last_token = re_res.group(1).upper()
+                self.video_encode = f"{video_encode.upper()} 10bit"
+                self._last_token = video_encode.upper()
         elif token.upper() in ['H', 'X']:
             self._continue_flag = False
             self._stop_name_flag = True
@@ -535,19 +587,19 @@ class MetaVideo(MetaBase):
                 and not self.begin_season \
                 and not self.begin_episode:
             return
-        re_res = re.search(r"(%s)" % self._audio_encode_re, token, re.IGNORECASE)
-        if re_res:
+        audio_encode = self.classify_token(token).audio_encode
+        if audio_encode:
             self._continue_flag = False
             self._stop_name_flag = True
             self._last_token_type = "audioencode"
-            self._last_token = re_res.group(1).upper()
+            self._last_token = audio_encode.upper()
             if not self.audio_encode:
-                self.audio_encode = re_res.group(1)
+                self.audio_encode = audio_encode
             else:
                 if self.audio_encode.upper() == "DTS":
-                    self.audio_encode = "%s-%s" % (self.audio_encode, re_res.group(1))
+                    self.audio_encode = "%s-%s" % (self.audio_encode, audio_encode)
                 else:
-                    self.audio_encode = "%s %s" % (self.audio_encode, re_res.group(1))
+                    self.audio_encode = "%s %s" % (self.audio_encode, audio_encode)
         elif token.isdigit() \
                 and self._last_token_type == "audioencode":
             if self.audio_encode:
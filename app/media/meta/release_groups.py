@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 import regex as re
 from app.utils.commons import singleton
 
@@ -8,8 +10,11 @@ class ReleaseGroupsMatcher(object):
     识别制作组、字幕组
     """
     __release_groups = None
+    __groups_re = None
     custom_release_groups = None
     custom_separator = None
+    # 配置版本，自定义制作组变化时递增
+    version = 0
     RELEASE_GROUPS = {
         "0ff": ['FF(?:(?:A|WE)B|CD|E(?:DU|B)|TV)'],
         "1pt": [],
@@ -79,6 +84,15 @@ class ReleaseGroupsMatcher(object):
             for release_group in site_groups:
                 release_groups.append(release_group)
         self.__release_groups = '|'.join(release_groups)
+        self.__groups_re = self.__compile_groups(self.__release_groups)
+
+    @staticmethod
+    @lru_cache(maxsize=16)
+    def __compile_groups(groups):
+        """
+        编译制作组正则，相同的制作组列表只编译一次
+        """
+        return re.compile(r"(?<=[-@\[￡【&])(?:%s)(?=[@.\s\]\[】&])" % groups, re.I)
 
     def match(self, title=None, groups=None):
         """
@@ -90,14 +104,15 @@ class ReleaseGroupsMatcher(object):
             return ""
         if not groups:
             if self.custom_release_groups:
-                groups = f"{self.__release_groups}|{self.custom_release_groups}"
+                groups_re = self.__compile_groups(f"{self.__release_groups}|{self.custom_release_groups}")
             else:
-                groups = self.__release_groups
+                groups_re = self.__groups_re
+        else:
+            groups_re = self.__compile_groups(groups)
         title = f"{title} "
-        groups_re = re.compile(r"(?<=[-@\[￡【&])(?:%s)(?=[@.\s\]\[】&])" % groups, re.I)
         # 处理一个制作组识别多次的情况，保留顺序
         unique_groups = []
-        for item in re.findall(groups_re, title):
+        for item in groups_re.findall(title):
             if item not in unique_groups:
                 unique_groups.append(item)
         separator = self.custom_separator or "@"
@@ -109,3 +124,4 @@ class ReleaseGroupsMatcher(object):
         """
         self.custom_release_groups = release_groups
         self.custom_separator = separator
+        self.version += 1
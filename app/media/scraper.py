@@ -1,5 +1,10 @@
+import hashlib
 import os.path
+import re
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
 from xml.dom import minidom
 
 from requests.exceptions import RequestException
@@ -11,11 +16,148 @@ from app.media.douban import DouBan
 from app.media.meta import MetaInfo
 from app.utils.commons import retry
 from config import Config, RMT_MEDIAEXT
-from app.utils import DomUtils, RequestUtils, ExceptionUtils, NfoReader, SystemUtils
+from app.utils import DomUtils, RequestUtils, ExceptionUtils, NfoReader, SystemUtils, PathUtils
 from app.utils.types import MediaType, SystemConfigKey, RmtMode
 from app.media import Media
 
 
+class ScraperSession:
+    """
+    一次刮削过程中共享的TMDB信息和图片下载：同一剧集、同一季只查询一次，
+    图片在后台并发下载，同一地址只下载一次，同一文件只保存一次；
+    可在并发转移的多个线程间共享，同一剧集目录的刮削串行进行
+    """
+    # 同时下载图片的线程数
+    _image_threads = 5
+    # 内存中保留的已下载图片数，供其它目录复用
+    _max_image_contents = 20
+    # 内存中保留的nfo识别结果、TMDB信息、季信息、图片下载锁、目录锁数，超过时淘汰最久未使用的
+    _max_cache_size = 200
+
+    def __init__(self, media):
+        self.media = media
+        self._lock = Lock()
+        # nfo文件 -> tmdbid
+        self._nfo_tmdbids = OrderedDict()
+        # (类型, tmdbid) -> TMDB信息
+        self._tmdb_infos = OrderedDict()
+        # (tmdbid, 季) -> 季信息
+        self._season_infos = OrderedDict()
+        # 图片地址 -> 下载锁
+        self._url_locks = OrderedDict()
+        # 剧集目录 -> 刮削锁
+        self._dir_locks = OrderedDict()
+        # 图片地址 -> 图片内容
+        self._image_contents = OrderedDict()
+        # 已提交保存的图片文件
+        self._image_tasks = {}
+        self._executor = ThreadPoolExecutor(max_workers=self._image_threads,
+                                            thread_name_prefix="scraper-image")
+
+    def get_nfo_tmdbid(self, nfo_path, reader):
+        """
+        读取nfo文件中的tmdbid，同一文件只读取一次
+        """
+        return self.__get_cache(self._nfo_tmdbids,
+                                nfo_path,
+                                lambda: reader(nfo_path) if os.path.exists(nfo_path) else None)
+
+    def get_tmdb_info(self, mtype, tmdbid):
+        """
+        查询包含全部附加信息的TMDB详情，同一媒体只查询一次
+        """
+        key = (MediaType.MOVIE if mtype == MediaType.MOVIE else MediaType.TV, str(tmdbid))
+        return self.__get_cache(self._tmdb_infos,
+                                key,
+                                lambda: self.media.get_tmdb_info(mtype=mtype,
+                                                                 tmdbid=tmdbid,
+                                                                 append_to_response='all'))
+
+    def get_season_info(self, tmdbid, season):
+        """
+        查询电视剧季的详情，同一季只查询一次
+        """
+        key = (str(tmdbid), int(season))
+        return self.__get_cache(self._season_infos,
+                                key,
+                                lambda: self.media.get_tmdb_tv_season_detail(tmdbid=tmdbid, season=int(season)))
+
+    def get_dir_lock(self, path):
+        """
+        获取目录的刮削锁，同一目录的文件串行刮削
+        """
+        with self._lock:
+            return self.__put_cache(self._dir_locks, path, self._dir_locks.get(path) or Lock())
+
+    def __get_cache(self, cache, key, loader):
+        """
+        从缓存中取值，没有时加载，超过数量时淘汰最久未使用的
+        """
+        with self._lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+        value = loader()
+        with self._lock:
+            return self.__put_cache(cache, key, value)
+
+    def __put_cache(self, cache, key, value):
+        """
+        写入缓存，超过数量时淘汰最久未使用的，需持有锁
+        """
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self._max_cache_size:
+            cache.popitem(last=False)
+        return value
+
+    def save_image(self, url, image_path, download, write):
+        """
+        在后台下载并保存图片
+        :param url: 图片地址
+        :param image_path: 保存路径
+        :param download: 下载方法，返回图片内容
+        :param write: 保存方法
+        """
+        with self._lock:
+            if image_path in self._image_tasks:
+                return
+            self._image_tasks[image_path] = self._executor.submit(self.__save_image,
+                                                                  url, image_path, download, write)
+
+    def __save_image(self, url, image_path, download, write):
+        with self._lock:
+            # 锁被淘汰时仍在下载的地址可能重复下载，不影响结果
+            url_lock = self.__put_cache(self._url_locks, url, self._url_locks.get(url) or Lock())
+        with url_lock:
+            with self._lock:
+                content = self._image_contents.get(url)
+            if content is None:
+                content = download(url)
+                if not content:
+                    return
+                with self._lock:
+                    self._image_contents[url] = content
+                    while len(self._image_contents) > self._max_image_contents:
+                        self._image_contents.popitem(last=False)
+        write(image_path, content)
+
+    def close(self):
+        """
+        等待所有图片保存完成
+        """
+        self._executor.shutdown(wait=True)
+        for image_path, task in self._image_tasks.items():
+            try:
+                task.result()
+            except Exception as err:
+                log.error(f"【Scraper】图片保存失败：{image_path} {str(err)}")
+        self._image_tasks = {}
+        self._image_contents.clear()
+        self._url_locks.clear()
+        self._dir_locks.clear()
+
+
 class Scraper:
     media = None
     _scraper_flag = False
@@ -48,10 +190,49 @@ class Scraper:
         # 模式
         force_nfo = True if mode in ["force_nfo", "force_all"] else False
         force_pic = True if mode in ["force_all"] else False
-        # 每个媒体库下的所有文件
-        for file in self.__get_library_files(path, exclude_path):
+        # 同一剧集、同一季只查询一次，图片在后台下载
+        session = ScraperSession(self.media)
+        try:
+            # 同一目录下的文件一起识别
+            for files in self.__iter_dir_batches(self.__get_library_files(path, exclude_path)):
+                for file, media_info in self.__get_media_infos(files, force_nfo, session):
+                    if not media_info or not media_info.tmdb_info:
+                        continue
+                    self.gen_scraper_files(media=media_info,
+                                           dir_path=os.path.dirname(file),
+                                           file_name=os.path.splitext(os.path.basename(file))[0],
+                                           file_ext=os.path.splitext(file)[-1],
+                                           force=True,
+                                           force_nfo=force_nfo,
+                                           force_pic=force_pic,
+                                           session=session)
+                    log.info(f"【Scraper】{file} 刮削完成")
+        finally:
+            session.close()
+
+    @staticmethod
+    def __iter_dir_batches(files):
+        """
+        将连续的同一目录下的文件合为一批
+        """
+        batch = []
+        for file in files:
             if not file:
                 continue
+            if batch and os.path.dirname(batch[0]) != os.path.dirname(file):
+                yield batch
+                batch = []
+            batch.append(file)
+        if batch:
+            yield batch
+
+    def __get_media_infos(self, files, force_nfo, session):
+        """
+        识别同一目录下的媒体文件，优先读取本地nfo中的tmdbid，TMDB详情按媒体只查询一次
+        :return: 文件路径、媒体信息
+        """
+        search_files = []
+        for file in files:
             log.info(f"【Scraper】开始刮削媒体库文件：{file} ...")
             # 识别媒体文件
             meta_info = MetaInfo(os.path.basename(file))
@@ -59,42 +240,31 @@ class Scraper:
             tmdbid = None
             if meta_info.type == MediaType.MOVIE:
                 # 电影
-                movie_nfo = os.path.join(os.path.dirname(file), "movie.nfo")
-                if os.path.exists(movie_nfo):
-                    tmdbid = self.__get_tmdbid_from_nfo(movie_nfo)
-                file_nfo = os.path.join(os.path.splitext(file)[0] + ".nfo")
-                if not tmdbid and os.path.exists(file_nfo):
-                    tmdbid = self.__get_tmdbid_from_nfo(file_nfo)
+                tmdbid = session.get_nfo_tmdbid(os.path.join(os.path.dirname(file), "movie.nfo"),
+                                                self.__get_tmdbid_from_nfo)
+                if not tmdbid:
+                    tmdbid = session.get_nfo_tmdbid(os.path.join(os.path.splitext(file)[0] + ".nfo"),
+                                                    self.__get_tmdbid_from_nfo)
             else:
                 # 电视剧
-                tv_nfo = os.path.join(os.path.dirname(os.path.dirname(file)), "tvshow.nfo")
-                if os.path.exists(tv_nfo):
-                    tmdbid = self.__get_tmdbid_from_nfo(tv_nfo)
+                tmdbid = session.get_nfo_tmdbid(os.path.join(os.path.dirname(os.path.dirname(file)), "tvshow.nfo"),
+                                                self.__get_tmdbid_from_nfo)
             if tmdbid and not force_nfo:
                 log.info(f"【Scraper】读取到本地nfo文件的tmdbid：{tmdbid}")
-                meta_info.set_tmdb_info(self.media.get_tmdb_info(mtype=meta_info.type,
-                                                                 tmdbid=tmdbid,
-                                                                 append_to_response='all'))
-                media_info = meta_info
+                meta_info.set_tmdb_info(session.get_tmdb_info(mtype=meta_info.type, tmdbid=tmdbid))
+                yield file, meta_info
             else:
-                medias = self.media.get_media_info_on_files(file_list=[file],
-                                                            append_to_response="all")
-                if not medias:
-                    continue
-                media_info = None
-                for _, media in medias.items():
-                    media_info = media
-                    break
-            if not media_info or not media_info.tmdb_info:
-                continue
-            self.gen_scraper_files(media=media_info,
-                                   dir_path=os.path.dirname(file),
-                                   file_name=os.path.splitext(os.path.basename(file))[0],
-                                   file_ext=os.path.splitext(file)[-1],
-                                   force=True,
-                                   force_nfo=force_nfo,
-                                   force_pic=force_pic)
-            log.info(f"【Scraper】{file} 刮削完成")
+                search_files.append(file)
+        if not search_files:
+            return
+        medias = self.media.get_media_info_on_files(file_list=search_files)
+        for file in search_files:
+            media_info = medias.get(file)
+            if media_info and media_info.tmdb_id:
+                # 使用包含全部附加信息的详情
+                media_info.set_tmdb_info(session.get_tmdb_info(mtype=media_info.type,
+                                                               tmdbid=media_info.tmdb_id))
+            yield file, media_info
 
     @staticmethod
     def __get_library_files(in_path, exclude_path=None):
@@ -105,16 +275,9 @@ class Scraper:
             yield in_path
             return
 
-        for root, dirs, files in os.walk(in_path):
-            if exclude_path and any(os.path.abspath(root).startswith(os.path.abspath(path))
-                                    for path in exclude_path.split(",")):
-                continue
-
-            for file in files:
-                cur_path = os.path.join(root, file)
-                # 检查后缀
-                if os.path.splitext(file)[-1].lower() in RMT_MEDIAEXT:
-                    yield cur_path
+        yield from PathUtils.iter_dir_files(in_path=in_path,
+                                            exts=RMT_MEDIAEXT,
+                                            exclude_paths=exclude_path.split(",") if exclude_path else None)
 
     @staticmethod
     def __get_tmdbid_from_nfo(file_path):
@@ -376,25 +539,25 @@ class Scraper:
         # 保存文件
         self.__save_nfo(doc, os.path.join(out_path, os.path.join(out_path, "%s.nfo" % file_name)))
 
-    def __save_remove_file(self, out_file, content):
+    def __save_remove_file(self, out_file, content, rmt_mode=None):
         """
         保存文件到远端
         """
+        rmt_mode = rmt_mode or self._rmt_mode
         temp_file = os.path.join(self._temp_path, out_file[1:])
         temp_file_dir = os.path.dirname(temp_file)
         if not os.path.exists(temp_file_dir):
             os.makedirs(temp_file_dir)
         with open(temp_file, "wb") as f:
             f.write(content)
-        if self._rmt_mode in [RmtMode.RCLONE, RmtMode.RCLONECOPY]:
+        if rmt_mode in [RmtMode.RCLONE, RmtMode.RCLONECOPY]:
             SystemUtils.rclone_move(temp_file, out_file)
-        elif self._rmt_mode in [RmtMode.MINIO, RmtMode.MINIOCOPY]:
+        elif rmt_mode in [RmtMode.MINIO, RmtMode.MINIOCOPY]:
             SystemUtils.minio_move(temp_file, out_file)
         else:
             SystemUtils.move(temp_file, out_file)
 
-    @retry(RequestException, logger=log)
-    def __save_image(self, url, out_path, itype='', force=False):
+    def __save_image(self, url, out_path, itype='', force=False, session=None):
         """
         下载poster.jpg并保存
         """
@@ -406,24 +569,57 @@ class Scraper:
             image_path = out_path
         if not force and os.path.exists(image_path):
             return
-        try:
-            log.info(f"【Scraper】正在下载{itype}图片：{url} ...")
-            r = RequestUtils().get_res(url=url, raise_exception=True)
-            if r:
-                # 下载到temp目录，远程则先存到temp再远程移动，本地则直接保存
-                if self._rmt_mode in ModuleConf.REMOTE_RMT_MODES:
-                    self.__save_remove_file(image_path, r.content)
-                else:
-                    with open(file=image_path, mode="wb") as img:
-                        img.write(r.content)
-                log.info(f"【Scraper】{itype}图片已保存：{image_path}")
-            else:
+        rmt_mode = self._rmt_mode
+
+        def __write(path, content):
+            self.__write_image(path, content, rmt_mode)
+            log.info(f"【Scraper】{itype}图片已保存：{path}")
+
+        def __download(image_url):
+            log.info(f"【Scraper】正在下载{itype}图片：{image_url} ...")
+            content = self.__download_image(image_url)
+            if not content:
                 log.info(f"【Scraper】{itype}图片下载失败，请检查网络连通性")
+            return content
+
+        if session:
+            session.save_image(url, image_path, __download, __write)
+            return
+        try:
+            content = __download(url)
+            if content:
+                __write(image_path, content)
         except RequestException:
             raise RequestException
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
 
+    @staticmethod
+    @retry(RequestException, logger=log)
+    def __download_image(url):
+        """
+        下载图片内容
+        """
+        r = RequestUtils().get_res(url=url, raise_exception=True)
+        return r.content if r else None
+
+    def __write_image(self, image_path, content, rmt_mode):
+        """
+        保存图片，远程则先存到temp再远程移动，本地则直接保存
+        """
+        if rmt_mode in ModuleConf.REMOTE_RMT_MODES:
+            self.__save_remove_file(image_path, content, rmt_mode)
+        else:
+            with open(file=image_path, mode="wb") as img:
+                img.write(content)
+
+    @staticmethod
+    def __normalize_nfo(content):
+        """
+        去掉NFO中的添加时间，用于比较内容是否变化
+        """
+        return re.sub(rb"<dateadded>[^<]*</dateadded>", b"", content)
+
     def __save_nfo(self, doc, out_file):
         log.info("【Scraper】正在保存NFO文件：%s" % out_file)
         xml_str = doc.toprettyxml(indent="  ", encoding="utf-8")
@@ -431,6 +627,13 @@ class Scraper:
         if self._rmt_mode in ModuleConf.REMOTE_RMT_MODES:
             self.__save_remove_file(out_file, xml_str)
         else:
+            # 内容未变化时不重写
+            if os.path.exists(out_file):
+                with open(out_file, "rb") as xml_file:
+                    old_hash = hashlib.md5(self.__normalize_nfo(xml_file.read())).hexdigest()
+                if old_hash == hashlib.md5(self.__normalize_nfo(xml_str)).hexdigest():
+                    log.info("【Scraper】NFO文件未变化：%s" % out_file)
+                    return
             with open(out_file, "wb") as xml_file:
                 xml_file.write(xml_str)
         log.info("【Scraper】NFO文件已保存：%s" % out_file)
@@ -443,7 +646,8 @@ class Scraper:
                           force=False,
                           force_nfo=False,
                           force_pic=False,
-                          rmt_mode=None):
+                          rmt_mode=None,
+                          session=None):
         """
         刮削元数据入口
         :param media: 已识别的媒体信息
@@ -454,6 +658,7 @@ class Scraper:
         :param force_nfo: 是否强制刮削NFO
         :param force_pic: 是否强制刮削图片
         :param rmt_mode: 转移方式
+        :param session: 刮削会话，批量刮削时共享TMDB信息和图片下载，为空时只用于本次
         """
         if not force and not self._scraper_flag:
             return
@@ -466,205 +671,213 @@ class Scraper:
             self._scraper_pic = {}
 
         self._rmt_mode = rmt_mode
+        own_session = session is None
+        if own_session:
+            session = ScraperSession(self.media)
 
         try:
-            # 电影
-            if media.type == MediaType.MOVIE:
-                scraper_movie_nfo = self._scraper_nfo.get("movie")
-                scraper_movie_pic = self._scraper_pic.get("movie")
-                #  movie nfo
-                if scraper_movie_nfo.get("basic") or scraper_movie_nfo.get("credits"):
-                    # 已存在时不处理
-                    if force_nfo \
-                            or (not os.path.exists(os.path.join(dir_path, "movie.nfo"))
-                                and not os.path.exists(os.path.join(dir_path, "%s.nfo" % file_name))):
-                        # 查询Douban信息
-                        if scraper_movie_nfo.get("credits") and scraper_movie_nfo.get("credits_chinese"):
-                            doubaninfo = self.douban.get_douban_info(media)
-                        else:
-                            doubaninfo = None
-                        #  生成电影描述文件
-                        self.__gen_movie_nfo_file(tmdbinfo=media.tmdb_info,
-                                                  doubaninfo=doubaninfo,
-                                                  scraper_movie_nfo=scraper_movie_nfo,
-                                                  out_path=dir_path,
-                                                  file_name=file_name)
-                # poster
-                if scraper_movie_pic.get("poster"):
-                    poster_image = media.get_poster_image(original=True)
-                    if poster_image:
-                        self.__save_image(poster_image, dir_path, "poster", force_pic)
-                # backdrop
-                if scraper_movie_pic.get("backdrop"):
-                    backdrop_image = media.get_backdrop_image(default=False, original=True)
-                    if backdrop_image:
-                        self.__save_image(backdrop_image, dir_path, "fanart", force_pic)
-                # background
-                if scraper_movie_pic.get("background"):
-                    background_image = media.fanart.get_background(media_type=media.type, queryid=media.tmdb_id)
-                    if background_image:
-                        self.__save_image(background_image, dir_path, "background", force_pic)
-                # logo
-                if scraper_movie_pic.get("logo"):
-                    logo_image = media.fanart.get_logo(media_type=media.type, queryid=media.tmdb_id)
-                    if logo_image:
-                        self.__save_image(logo_image, dir_path, "logo", force_pic)
-                # disc
-                if scraper_movie_pic.get("disc"):
-                    disc_image = media.fanart.get_disc(media_type=media.type, queryid=media.tmdb_id)
-                    if disc_image:
-                        self.__save_image(disc_image, dir_path, "disc", force_pic)
-                # banner
-                if scraper_movie_pic.get("banner"):
-                    banner_image = media.fanart.get_banner(media_type=media.type, queryid=media.tmdb_id)
-                    if banner_image:
-                        self.__save_image(banner_image, dir_path, "banner", force_pic)
-                # thumb
-                if scraper_movie_pic.get("thumb"):
-                    thumb_image = media.fanart.get_thumb(media_type=media.type, queryid=media.tmdb_id)
-                    if thumb_image:
-                        self.__save_image(thumb_image, dir_path, "thumb", force_pic)
-            # 电视剧
-            else:
-                scraper_tv_nfo = self._scraper_nfo.get("tv")
-                scraper_tv_pic = self._scraper_pic.get("tv")
-                # tv nfo
-                if force_nfo \
-                        or not os.path.exists(os.path.join(os.path.dirname(dir_path), "tvshow.nfo")):
-                    if scraper_tv_nfo.get("basic") or scraper_tv_nfo.get("credits"):
-                        # 查询Douban信息
-                        if scraper_tv_nfo.get("credits") and scraper_tv_nfo.get("credits_chinese"):
-                            doubaninfo = self.douban.get_douban_info(media)
-                        else:
-                            doubaninfo = None
-                        # 根目录描述文件
-                        self.__gen_tv_nfo_file(tmdbinfo=media.tmdb_info,
-                                               doubaninfo=doubaninfo,
-                                               scraper_tv_nfo=scraper_tv_nfo,
-                                               out_path=os.path.dirname(dir_path))
-                # poster
-                if scraper_tv_pic.get("poster"):
-                    poster_image = media.get_poster_image(original=True)
-                    if poster_image:
-                        self.__save_image(poster_image, os.path.dirname(dir_path), "poster", force_pic)
-                # backdrop
-                if scraper_tv_pic.get("backdrop"):
-                    backdrop_image = media.get_backdrop_image(default=False, original=True)
-                    if backdrop_image:
-                        self.__save_image(backdrop_image, os.path.dirname(dir_path), "fanart", force_pic)
-                # background
-                if scraper_tv_pic.get("background"):
-                    background_image = media.fanart.get_background(media_type=media.type, queryid=media.tvdb_id)
-                    if background_image:
-                        self.__save_image(background_image, os.path.dirname(dir_path), "background", force_pic)
-                # logo
-                if scraper_tv_pic.get("logo"):
-                    logo_image = media.fanart.get_logo(media_type=media.type, queryid=media.tvdb_id)
-                    if logo_image:
-                        self.__save_image(logo_image, os.path.dirname(dir_path), "logo", force_pic)
-                # clearart
-                if scraper_tv_pic.get("clearart"):
-                    clearart_image = media.fanart.get_disc(media_type=media.type, queryid=media.tvdb_id)
-                    if clearart_image:
-                        self.__save_image(clearart_image, os.path.dirname(dir_path), "clearart", force_pic)
-                # banner
-                if scraper_tv_pic.get("banner"):
-                    banner_image = media.fanart.get_banner(media_type=media.type, queryid=media.tvdb_id)
-                    if banner_image:
-                        self.__save_image(banner_image, os.path.dirname(dir_path), "banner", force_pic)
-                # thumb
-                if scraper_tv_pic.get("thumb"):
-                    thumb_image = media.fanart.get_thumb(media_type=media.type, queryid=media.tvdb_id)
-                    if thumb_image:
-                        self.__save_image(thumb_image, os.path.dirname(dir_path), "thumb", force_pic)
-                # season nfo
-                if scraper_tv_nfo.get("season_basic"):
-                    if force_nfo \
-                            or not os.path.exists(os.path.join(dir_path, "season.nfo")):
-                        # season nfo
-                        seasoninfo = self.media.get_tmdb_tv_season_detail(tmdbid=media.tmdb_id,
-                                                                          season=int(media.get_season_seq()))
-                        if seasoninfo:
-                            self.__gen_tv_season_nfo_file(seasoninfo=seasoninfo,
-                                                          season=int(media.get_season_seq()),
-                                                          out_path=dir_path)
-                # episode nfo
-                if scraper_tv_nfo.get("episode_basic") \
-                        or scraper_tv_nfo.get("episode_credits"):
+            # 同一剧集的文件串行刮削，并发转移时剧集和季的nfo、图片只写入一次
+            with session.get_dir_lock(dir_path if media.type == MediaType.MOVIE else os.path.dirname(dir_path)):
+                # 电影
+                if media.type == MediaType.MOVIE:
+                    scraper_movie_nfo = self._scraper_nfo.get("movie")
+                    scraper_movie_pic = self._scraper_pic.get("movie")
+                    #  movie nfo
+                    if scraper_movie_nfo.get("basic") or scraper_movie_nfo.get("credits"):
+                        # 已存在时不处理
+                        if force_nfo \
+                                or (not os.path.exists(os.path.join(dir_path, "movie.nfo"))
+                                    and not os.path.exists(os.path.join(dir_path, "%s.nfo" % file_name))):
+                            # 查询Douban信息
+                            if scraper_movie_nfo.get("credits") and scraper_movie_nfo.get("credits_chinese"):
+                                doubaninfo = self.douban.get_douban_info(media)
+                            else:
+                                doubaninfo = None
+                            #  生成电影描述文件
+                            self.__gen_movie_nfo_file(tmdbinfo=media.tmdb_info,
+                                                      doubaninfo=doubaninfo,
+                                                      scraper_movie_nfo=scraper_movie_nfo,
+                                                      out_path=dir_path,
+                                                      file_name=file_name)
+                    # poster
+                    if scraper_movie_pic.get("poster"):
+                        poster_image = media.get_poster_image(original=True)
+                        if poster_image:
+                            self.__save_image(poster_image, dir_path, "poster", force_pic, session)
+                    # backdrop
+                    if scraper_movie_pic.get("backdrop"):
+                        backdrop_image = media.get_backdrop_image(default=False, original=True)
+                        if backdrop_image:
+                            self.__save_image(backdrop_image, dir_path, "fanart", force_pic, session)
+                    # background
+                    if scraper_movie_pic.get("background"):
+                        background_image = media.fanart.get_background(media_type=media.type, queryid=media.tmdb_id)
+                        if background_image:
+                            self.__save_image(background_image, dir_path, "background", force_pic, session)
+                    # logo
+                    if scraper_movie_pic.get("logo"):
+                        logo_image = media.fanart.get_logo(media_type=media.type, queryid=media.tmdb_id)
+                        if logo_image:
+                            self.__save_image(logo_image, dir_path, "logo", force_pic, session)
+                    # disc
+                    if scraper_movie_pic.get("disc"):
+                        disc_image = media.fanart.get_disc(media_type=media.type, queryid=media.tmdb_id)
+                        if disc_image:
+                            self.__save_image(disc_image, dir_path, "disc", force_pic, session)
+                    # banner
+                    if scraper_movie_pic.get("banner"):
+                        banner_image = media.fanart.get_banner(media_type=media.type, queryid=media.tmdb_id)
+                        if banner_image:
+                            self.__save_image(banner_image, dir_path, "banner", force_pic, session)
+                    # thumb
+                    if scraper_movie_pic.get("thumb"):
+                        thumb_image = media.fanart.get_thumb(media_type=media.type, queryid=media.tmdb_id)
+                        if thumb_image:
+                            self.__save_image(thumb_image, dir_path, "thumb", force_pic, session)
+                # 电视剧
+                else:
+                    scraper_tv_nfo = self._scraper_nfo.get("tv")
+                    scraper_tv_pic = self._scraper_pic.get("tv")
+                    # tv nfo
                     if force_nfo \
-                            or not os.path.exists(os.path.join(dir_path, "%s.nfo" % file_name)):
-                        seasoninfo = self.media.get_tmdb_tv_season_detail(tmdbid=media.tmdb_id,
-                                                                          season=int(media.get_season_seq()))
-                        if seasoninfo:
-                            self.__gen_tv_episode_nfo_file(seasoninfo=seasoninfo,
-                                                           scraper_tv_nfo=scraper_tv_nfo,
-                                                           season=int(media.get_season_seq()),
-                                                           episode=int(media.get_episode_seq()),
-                                                           out_path=dir_path,
-                                                           file_name=file_name)
-                # season poster
-                if scraper_tv_pic.get("season_poster"):
-                    season_poster = "season%s-poster" % media.get_season_seq().rjust(2, '0')
-                    seasonposter = media.fanart.get_seasonposter(media_type=media.type,
-                                                                 queryid=media.tvdb_id,
-                                                                 season=media.get_season_seq())
-                    if seasonposter:
-                        self.__save_image(seasonposter,
-                                          os.path.dirname(dir_path),
-                                          season_poster,
-                                          force_pic)
-                    else:
-                        seasoninfo = self.media.get_tmdb_tv_season_detail(tmdbid=media.tmdb_id,
-                                                                          season=int(media.get_season_seq()))
-                        if seasoninfo:
-                            self.__save_image(Config().get_tmdbimage_url(seasoninfo.get("poster_path"),
-                                                                         prefix="original"),
+                            or not os.path.exists(os.path.join(os.path.dirname(dir_path), "tvshow.nfo")):
+                        if scraper_tv_nfo.get("basic") or scraper_tv_nfo.get("credits"):
+                            # 查询Douban信息
+                            if scraper_tv_nfo.get("credits") and scraper_tv_nfo.get("credits_chinese"):
+                                doubaninfo = self.douban.get_douban_info(media)
+                            else:
+                                doubaninfo = None
+                            # 根目录描述文件
+                            self.__gen_tv_nfo_file(tmdbinfo=media.tmdb_info,
+                                                   doubaninfo=doubaninfo,
+                                                   scraper_tv_nfo=scraper_tv_nfo,
+                                                   out_path=os.path.dirname(dir_path))
+                    # poster
+                    if scraper_tv_pic.get("poster"):
+                        poster_image = media.get_poster_image(original=True)
+                        if poster_image:
+                            self.__save_image(poster_image, os.path.dirname(dir_path), "poster", force_pic, session)
+                    # backdrop
+                    if scraper_tv_pic.get("backdrop"):
+                        backdrop_image = media.get_backdrop_image(default=False, original=True)
+                        if backdrop_image:
+                            self.__save_image(backdrop_image, os.path.dirname(dir_path), "fanart", force_pic, session)
+                    # background
+                    if scraper_tv_pic.get("background"):
+                        background_image = media.fanart.get_background(media_type=media.type, queryid=media.tvdb_id)
+                        if background_image:
+                            self.__save_image(background_image, os.path.dirname(dir_path), "background", force_pic, session)
+                    # logo
+                    if scraper_tv_pic.get("logo"):
+                        logo_image = media.fanart.get_logo(media_type=media.type, queryid=media.tvdb_id)
+                        if logo_image:
+                            self.__save_image(logo_image, os.path.dirname(dir_path), "logo", force_pic, session)
+                    # clearart
+                    if scraper_tv_pic.get("clearart"):
+                        clearart_image = media.fanart.get_disc(media_type=media.type, queryid=media.tvdb_id)
+                        if clearart_image:
+                            self.__save_image(clearart_image, os.path.dirname(dir_path), "clearart", force_pic, session)
+                    # banner
+                    if scraper_tv_pic.get("banner"):
+                        banner_image = media.fanart.get_banner(media_type=media.type, queryid=media.tvdb_id)
+                        if banner_image:
+                            self.__save_image(banner_image, os.path.dirname(dir_path), "banner", force_pic, session)
+                    # thumb
+                    if scraper_tv_pic.get("thumb"):
+                        thumb_image = media.fanart.get_thumb(media_type=media.type, queryid=media.tvdb_id)
+                        if thumb_image:
+                            self.__save_image(thumb_image, os.path.dirname(dir_path), "thumb", force_pic, session)
+                    # season nfo
+                    if scraper_tv_nfo.get("season_basic"):
+                        if force_nfo \
+                                or not os.path.exists(os.path.join(dir_path, "season.nfo")):
+                            # season nfo
+                            seasoninfo = session.get_season_info(tmdbid=media.tmdb_id,
+                                                                 season=int(media.get_season_seq()))
+                            if seasoninfo:
+                                self.__gen_tv_season_nfo_file(seasoninfo=seasoninfo,
+                                                              season=int(media.get_season_seq()),
+                                                              out_path=dir_path)
+                    # episode nfo
+                    if scraper_tv_nfo.get("episode_basic") \
+                            or scraper_tv_nfo.get("episode_credits"):
+                        if force_nfo \
+                                or not os.path.exists(os.path.join(dir_path, "%s.nfo" % file_name)):
+                            seasoninfo = session.get_season_info(tmdbid=media.tmdb_id,
+                                                                 season=int(media.get_season_seq()))
+                            if seasoninfo:
+                                self.__gen_tv_episode_nfo_file(seasoninfo=seasoninfo,
+                                                               scraper_tv_nfo=scraper_tv_nfo,
+                                                               season=int(media.get_season_seq()),
+                                                               episode=int(media.get_episode_seq()),
+                                                               out_path=dir_path,
+                                                               file_name=file_name)
+                    # season poster
+                    if scraper_tv_pic.get("season_poster"):
+                        season_poster = "season%s-poster" % media.get_season_seq().rjust(2, '0')
+                        seasonposter = media.fanart.get_seasonposter(media_type=media.type,
+                                                                     queryid=media.tvdb_id,
+                                                                     season=media.get_season_seq())
+                        if seasonposter:
+                            self.__save_image(seasonposter,
                                               os.path.dirname(dir_path),
                                               season_poster,
-                                              force_pic)
-                # season banner
-                if scraper_tv_pic.get("season_banner"):
-                    seasonbanner = media.fanart.get_seasonbanner(media_type=media.type,
-                                                                 queryid=media.tvdb_id,
-                                                                 season=media.get_season_seq())
-                    if seasonbanner:
-                        self.__save_image(seasonbanner,
-                                          os.path.dirname(dir_path),
-                                          "season%s-banner" % media.get_season_seq().rjust(2, '0'),
-                                          force_pic)
-                # season thumb
-                if scraper_tv_pic.get("season_thumb"):
-                    seasonthumb = media.fanart.get_seasonthumb(media_type=media.type,
-                                                               queryid=media.tvdb_id,
-                                                               season=media.get_season_seq())
-                    if seasonthumb:
-                        self.__save_image(seasonthumb,
-                                          os.path.dirname(dir_path),
-                                          "season%s-landscape" % media.get_season_seq().rjust(2, '0'),
-                                          force_pic)
-                # episode thumb
-                if scraper_tv_pic.get("episode_thumb"):
-                    episode_thumb = os.path.join(dir_path, file_name + "-thumb.jpg")
-                    if not force_pic \
-                            and not os.path.exists(episode_thumb):
-                        # 优先从TMDB查询
-                        episode_image = self.media.get_episode_images(tv_id=media.tmdb_id,
-                                                                      season_id=media.get_season_seq(),
-                                                                      episode_id=media.get_episode_seq(),
-                                                                      orginal=True)
-                        if episode_image:
-                            self.__save_image(episode_image, episode_thumb, '', force_pic)
+                                              force_pic, session)
                         else:
-                            # 开启ffmpeg，则从视频文件生成缩略图
-                            if scraper_tv_pic.get("episode_thumb_ffmpeg"):
-                                video_path = os.path.join(dir_path, file_name + file_ext)
-                                log.info(f"【Scraper】正在生成缩略图：{video_path} ...")
-                                FfmpegHelper().get_thumb_image_from_video(video_path=video_path,
-                                                                          image_path=episode_thumb)
-                                log.info(f"【Scraper】缩略图生成完成：{episode_thumb}")
+                            seasoninfo = session.get_season_info(tmdbid=media.tmdb_id,
+                                                                 season=int(media.get_season_seq()))
+                            if seasoninfo:
+                                self.__save_image(Config().get_tmdbimage_url(seasoninfo.get("poster_path"),
+                                                                             prefix="original"),
+                                                  os.path.dirname(dir_path),
+                                                  season_poster,
+                                                  force_pic, session)
+                    # season banner
+                    if scraper_tv_pic.get("season_banner"):
+                        seasonbanner = media.fanart.get_seasonbanner(media_type=media.type,
+                                                                     queryid=media.tvdb_id,
+                                                                     season=media.get_season_seq())
+                        if seasonbanner:
+                            self.__save_image(seasonbanner,
+                                              os.path.dirname(dir_path),
+                                              "season%s-banner" % media.get_season_seq().rjust(2, '0'),
+                                              force_pic, session)
+                    # season thumb
+                    if scraper_tv_pic.get("season_thumb"):
+                        seasonthumb = media.fanart.get_seasonthumb(media_type=media.type,
+                                                                   queryid=media.tvdb_id,
+                                                                   season=media.get_season_seq())
+                        if seasonthumb:
+                            self.__save_image(seasonthumb,
+                                              os.path.dirname(dir_path),
+                                              "season%s-landscape" % media.get_season_seq().rjust(2, '0'),
+                                              force_pic, session)
+                    # episode thumb
+                    if scraper_tv_pic.get("episode_thumb"):
+                        episode_thumb = os.path.join(dir_path, file_name + "-thumb.jpg")
+                        if not force_pic \
+                                and not os.path.exists(episode_thumb):
+                            # 优先从TMDB查询
+                            episode_image = self.media.get_episode_images(tv_id=media.tmdb_id,
+                                                                          season_id=media.get_season_seq(),
+                                                                          episode_id=media.get_episode_seq(),
+                                                                          orginal=True)
+                            if episode_image:
+                                self.__save_image(episode_image, episode_thumb, '', force_pic, session)
+                            else:
+                                # 开启ffmpeg，则从视频文件生成缩略图
+                                if scraper_tv_pic.get("episode_thumb_ffmpeg"):
+                                    video_path = os.path.join(dir_path, file_name + file_ext)
+                                    log.info(f"【Scraper】正在生成缩略图：{video_path} ...")
+                                    FfmpegHelper().get_thumb_image_from_video(video_path=video_path,
+                                                                              image_path=episode_thumb)
+                                    log.info(f"【Scraper】缩略图生成完成：{episode_thumb}")
 
         except Exception as e:
             ExceptionUtils.exception_traceback(e)
+        finally:
+            if own_session:
+                session.close()
 
     def __gen_people_chinese_info(self, directors, actors, doubaninfo):
         """
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# (action pattern, ttl in seconds), first match wins
+TTL_RULES = [
+    (re.compile(r"^/trending/"), HOUR),
+    (re.compile(r"/(latest|now_playing|upcoming|popular|top_rated|airing_today|on_the_air)$"), 3 * HOUR),
+    (re.compile(r"^/discover/"), 3 * HOUR),
+    (re.compile(r"/(similar|recommendations|reviews|lists)$"), DAY),
+    (re.compile(r"^/search/"), DAY),
+    # airing shows gain episodes and seasons, keep them close to the periodic subscription refresh
+    (re.compile(r"^/tv/\d+"), 3 * HOUR),
+    (re.compile(r"^/(movie|person|collection)/\d+"), 7 * DAY),
+    (re.compile(r"^/(find|genre)/"), 7 * DAY),
+]
+DEFAULT_TTL = DAY
+# how long an expired response may still be served while it is refreshed,
+# never longer than the ttl of its endpoint
+STALE_TTL = 7 * DAY
+
+
+class ResponseCache(object):
+    """
+    Size-bounded SQLite cache of TMDb JSON responses, shared by all TMDb objects.
+    Responses expire after a per-endpoint TTL; expired responses are served
+    immediately while a background request refreshes them (stale-while-revalidate).
+    """
+    MAX_SIZE = 256 * 1024 * 1024
+    # access times are only written back when older than this
+    TOUCH_INTERVAL = HOUR
+
+    def __init__(self, path=None, max_size=None):
+        self.path = path
+        self.max_size = max_size or self.MAX_SIZE
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path or ":memory:", check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, action TEXT, body TEXT, size INTEGER, "
+            "updated REAL, expires REAL, accessed REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(method, action, params, language, data=None):
+        return hashlib.sha256(
+            json.dumps([method, action, params, language, data], default=str).encode("utf-8")
+        ).hexdigest()
+
+    @staticmethod
+    def get_ttl(action):
+        for pattern, ttl in TTL_RULES:
+            if pattern.search(action):
+                return ttl
+        return DEFAULT_TTL
+
+    def get_or_fetch(self, key, action, fetch):
+        """
+        Return the cached JSON for key, calling fetch() on a miss.
+        fetch returns (json, cacheable).
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, expires, accessed FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row[2] > self.TOUCH_INTERVAL:
+                self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        if row:
+            body, expires, _ = row
+            if now < expires:
+                self.hits += 1
+                return json.loads(body)
+            if now < expires + min(self.get_ttl(action), STALE_TTL):
+                self.stale_hits += 1
+                self._refresh(key, action, fetch)
+                return json.loads(body)
+        self.misses += 1
+        try:
+            result, cacheable = fetch()
+        except Exception:
+            if row:
+                logger.warning("TMDb request failed, serving stale response: %s" % action)
+                return json.loads(row[0])
+            raise
+        if cacheable:
+            self.put(key, action, result)
+        return result
+
+    def _refresh(self, key, action, fetch):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                result, cacheable = fetch()
+                if cacheable:
+                    self.put(key, action, result)
+            except Exception as e:
+                logger.warning("TMDb refresh failed: %s %s" % (action, e))
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name="tmdb-cache-refresh", daemon=True).start()
+
+    def put(self, key, action, result):
+        body = json.dumps(result, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, action, body, size, updated, expires, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, action, body, len(body), now, now + self.get_ttl(action), now)
+            )
+            self._size += len(body) - (old[0] if old else 0)
+            if self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        """
+        Drop least recently used responses until the cache is below 90% of max_size.
+        Must be called with the lock held.
+        """
+        target = self.max_size * 0.9
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall()
+        keys = []
+        for key, size in rows:
+            if self._size <= target:
+                break
+            keys.append((key,))
+            self._size -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", keys)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._size = 0
+
+    def info(self):
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {
+            "entries": count,
+            "size": self._size,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+        }
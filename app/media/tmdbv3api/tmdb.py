@@ -2,13 +2,14 @@
 
 import logging
 import os
+import threading
 import time
-from functools import lru_cache
 
 import requests
 import requests.exceptions
 
 from .as_obj import AsObj
+from .cache import ResponseCache
 from .exceptions import TMDbException
 
 logger = logging.getLogger(__name__)
@@ -22,7 +23,9 @@ class TMDb(object):
     TMDB_CACHE_ENABLED = "TMDB_CACHE_ENABLED"
     TMDB_PROXIES = "TMDB_PROXIES"
     TMDB_DOMAIN = "TMDB_DOMAIN"
-    REQUEST_CACHE_MAXSIZE = 512
+    TMDB_CACHE_PATH = "TMDB_CACHE_PATH"
+    _response_cache = None
+    _response_cache_lock = threading.Lock()
 
     def __init__(self, obj_cached=True, session=None):
         self._session = requests.Session() if session is None else session
@@ -120,6 +123,24 @@ class TMDb(object):
     def cache(self, cache):
         os.environ[self.TMDB_CACHE_ENABLED] = str(cache)
 
+    @property
+    def cache_path(self):
+        return os.environ.get(self.TMDB_CACHE_PATH)
+
+    @cache_path.setter
+    def cache_path(self, cache_path):
+        os.environ[self.TMDB_CACHE_PATH] = str(cache_path or '')
+
+    @property
+    def response_cache(self):
+        """
+        The response cache shared by all TMDb objects, opened at cache_path on first use.
+        """
+        with TMDb._response_cache_lock:
+            if TMDb._response_cache is None or TMDb._response_cache.path != (self.cache_path or None):
+                TMDb._response_cache = ResponseCache(self.cache_path or None)
+            return TMDb._response_cache
+
     @staticmethod
     def _get_obj(result, key="results", all_details=False):
         if "success" in result and result["success"] is False:
@@ -129,32 +150,11 @@ class TMDb(object):
         else:
             return [AsObj(**res) for res in result[key]]
 
-    @staticmethod
-    @lru_cache(maxsize=REQUEST_CACHE_MAXSIZE)
-    def cached_request(method, url, data, proxies):
-        return requests.request(method, url, data=data, proxies=eval(proxies), verify=False, timeout=10)
-
     def cache_clear(self):
-        return self.cached_request.cache_clear()
+        return self.response_cache.clear()
 
-    def _call(
-            self, action, append_to_response, call_cached=True, method="GET", data=None
-    ):
-        if self.api_key is None or self.api_key == "":
-            raise TMDbException("No API key found.")
-
-        url = "%s%s?api_key=%s&include_adult=false&%s&language=%s" % (
-            self.domain,
-            action,
-            self.api_key,
-            append_to_response,
-            self.language,
-        )
-
-        if self.cache and self.obj_cached and call_cached and method != "POST":
-            req = self.cached_request(method, url, data, self.proxies)
-        else:
-            req = self._session.request(method, url, data=data, proxies=eval(self.proxies), timeout=10, verify=False)
+    def _request(self, method, url, data, action, append_to_response, call_cached):
+        req = self._session.request(method, url, data=data, proxies=eval(self.proxies), timeout=10, verify=False)
 
         headers = req.headers
 
@@ -171,13 +171,39 @@ class TMDb(object):
             if self.wait_on_rate_limit:
                 logger.warning("Rate limit reached. Sleeping for: %d" % sleep_time)
                 time.sleep(abs(sleep_time))
-                self._call(action, append_to_response, call_cached, method, data)
+                self._remaining = 1
+                return self._request(method, url, data, action, append_to_response, call_cached)
             else:
                 raise TMDbException(
                     "Rate limit reached. Try again in %d seconds." % sleep_time
                 )
 
         json = req.json()
+        # only successful responses are worth keeping
+        return json, req.status_code == 200 and "errors" not in json
+
+    def _call(
+            self, action, append_to_response, call_cached=True, method="GET", data=None
+    ):
+        if self.api_key is None or self.api_key == "":
+            raise TMDbException("No API key found.")
+
+        url = "%s%s?api_key=%s&include_adult=false&%s&language=%s" % (
+            self.domain,
+            action,
+            self.api_key,
+            append_to_response,
+            self.language,
+        )
+
+        def fetch():
+            return self._request(method, url, data, action, append_to_response, call_cached)
+
+        if self.cache and self.obj_cached and call_cached and method != "POST":
+            key = ResponseCache.make_key(method, action, append_to_response, self.language, data)
+            json = self.response_cache.get_or_fetch(key, action, fetch)
+        else:
+            json, _ = fetch()
 
         if "page" in json:
             os.environ["page"] = str(json["page"])
@@ -190,7 +216,7 @@ class TMDb(object):
 
         if self.debug:
             logger.info(json)
-            logger.info(self.cached_request.cache_info())
+            logger.info(self.response_cache.info())
 
         if "errors" in json:
             raise TMDbException(json["errors"])
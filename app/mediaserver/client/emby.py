@@ -24,6 +24,9 @@ class Emby(_IMediaClient):
     _play_host = None
     _user = None
     _folders = []
+    # 同步媒体库时列表接口需返回的字段，Etag、DateLastMediaAdded和RecursiveItemCount用于判断项目是否有变化，
+    # 删除剧集时只有子项目数量会变化
+    _sync_fields = "ParentId,OriginalTitle,ProductionYear,ProviderIds,Path,Etag,DateLastMediaAdded,RecursiveItemCount"
 
     def __init__(self, config=None):
         if config:
@@ -625,7 +628,8 @@ class Emby(_IMediaClient):
             yield {}
         if not self._host or not self._apikey:
             yield {}
-        req_url = "%semby/Users/%s/Items?ParentId=%s&api_key=%s" % (self._host, self._user, parent, self._apikey)
+        req_url = "%semby/Users/%s/Items?ParentId=%s&Fields=%s&api_key=%s" % (
+            self._host, self._user, parent, self._sync_fields, self._apikey)
         try:
             res = RequestUtils().get_res(req_url)
             if res and res.status_code == 200:
@@ -634,17 +638,20 @@ class Emby(_IMediaClient):
                     if not result:
                         continue
                     if result.get("Type") in ["Movie", "Series"]:
-                        item_info = self.get_iteminfo(result.get("Id"))
+                        # 列表中已包含所需字段，无需再逐个查询详情
                         yield {"id": result.get("Id"),
-                               "library": item_info.get("ParentId"),
-                               "type": item_info.get("Type"),
-                               "title": item_info.get("Name"),
-                               "originalTitle": item_info.get("OriginalTitle"),
-                               "year": item_info.get("ProductionYear"),
-                               "tmdbid": item_info.get("ProviderIds", {}).get("Tmdb"),
-                               "imdbid": item_info.get("ProviderIds", {}).get("Imdb"),
-                               "path": item_info.get("Path"),
-                               "json": str(item_info)}
+                               "library": result.get("ParentId"),
+                               "type": result.get("Type"),
+                               "title": result.get("Name"),
+                               "originalTitle": result.get("OriginalTitle"),
+                               "year": result.get("ProductionYear"),
+                               "tmdbid": result.get("ProviderIds", {}).get("Tmdb"),
+                               "imdbid": result.get("ProviderIds", {}).get("Imdb"),
+                               "path": result.get("Path"),
+                               "etag": "%s|%s|%s" % (result.get("Etag"),
+                                                     result.get("DateLastMediaAdded"),
+                                                     result.get("RecursiveItemCount"))
+                               if result.get("Etag") else None}
                     elif "Folder" in result.get("Type"):
                         for item in self.get_items(parent=result.get('Id')):
                             yield item
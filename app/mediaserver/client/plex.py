@@ -460,7 +460,9 @@ class Plex(_IMediaClient):
                            "tmdbid": ids['tmdb_id'],
                            "imdbid": ids['imdb_id'],
                            "tvdbid": ids['tvdb_id'],
-                           "path": path}
+                           "path": path,
+                           "etag": "%s|%s" % (item.updatedAt, getattr(item, "leafCount", ""))
+                           if item.updatedAt else None}
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
         yield {}
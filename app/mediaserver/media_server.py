@@ -1,5 +1,6 @@
 import json
 import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import log
 from app.conf import SystemConfig
@@ -19,6 +20,10 @@ server_lock = threading.Lock()
 @singleton
 class MediaServer:
     _mediaserver_schemas = []
+    # 同步时并发查询剧集信息的线程数
+    _sync_threads = 8
+    # 同步时每批写入数据库的数量
+    _sync_batch_size = 200
 
     _server_type = None
     _server = None
@@ -216,7 +221,7 @@ class MediaServer:
 
     def sync_mediaserver(self):
         """
-        同步媒体库所有数据到本地数据库
+        增量同步媒体库数据到本地数据库，只更新有变化的项目，同步过程中已有数据始终可查
         """
         if not self.server:
             return
@@ -233,35 +238,58 @@ class MediaServer:
             total_count = 0
             movie_count = 0
             tv_count = 0
-            # 清空登记薄
-            self.mediadb.empty(server_type=self._server_type)
-            for library in self.get_libraries():
-                if str(library.get("id")) not in librarys:
-                    continue
-                # 获取媒体库所有项目
-                self.progress.update(ptype=ProgressKey.MediaSync,
-                                     text="正在获取 %s 数据..." % (library.get("name")))
-                for item in self.get_items(library.get("id")):
-                    if not item:
+            # 已同步项目的变更标识
+            synced_etags = self.mediadb.get_etags(server_type=self._server_type)
+            synced_ids = set()
+            changed_count = 0
+            # 待写入的项目，剧集信息由线程池并发查询
+            pending_items = []
+            executor = ThreadPoolExecutor(max_workers=self._sync_threads)
+            try:
+                for library in self.get_libraries():
+                    if str(library.get("id")) not in librarys:
                         continue
-                    # 更新进度
-                    seasoninfo = []
-                    total_count += 1
-                    if item.get("type") in ['Movie', 'movie']:
-                        movie_count += 1
-                    elif item.get("type") in ['Series', 'show']:
-                        tv_count += 1
-                        # 查询剧集信息
-                        seasoninfo = self.get_tv_episodes(item.get("id"))
+                    # 获取媒体库所有项目
                     self.progress.update(ptype=ProgressKey.MediaSync,
-                                         text="正在同步 %s，已完成：%s / %s ..." % (
-                                             library.get("name"), total_count, total_media_count),
-                                         value=round(100 * total_count / total_media_count, 1))
-                    # 插入数据
-                    self.mediadb.insert(server_type=self._server_type,
-                                        iteminfo=item,
-                                        seasoninfo=seasoninfo)
-
+                                         text="正在获取 %s 数据..." % (library.get("name")))
+                    for item in self.get_items(library.get("id")):
+                        if not item:
+                            continue
+                        item_id = str(item.get("id"))
+                        if item_id in synced_ids:
+                            continue
+                        synced_ids.add(item_id)
+                        # 更新进度
+                        total_count += 1
+                        is_tv = item.get("type") in ['Series', 'show']
+                        if item.get("type") in ['Movie', 'movie']:
+                            movie_count += 1
+                        elif is_tv:
+                            tv_count += 1
+                        self.progress.update(ptype=ProgressKey.MediaSync,
+                                             text="正在同步 %s，已完成：%s / %s ..." % (
+                                                 library.get("name"), total_count, total_media_count),
+                                             value=round(100 * total_count / total_media_count, 1))
+                        # 变更标识相同的项目无需更新
+                        etag = item.get("etag")
+                        if etag and synced_etags.get(item_id) == etag:
+                            continue
+                        changed_count += 1
+                        if is_tv:
+                            # 查询剧集信息
+                            pending_items.append((item, executor.submit(self.get_tv_episodes, item.get("id"))))
+                        else:
+                            pending_items.append((item, None))
+                        if len(pending_items) >= self._sync_batch_size:
+                            self.__save_sync_items(pending_items)
+                            pending_items = []
+                self.__save_sync_items(pending_items)
+            finally:
+                executor.shutdown(wait=False)
+            # 删除媒体服务器中已不存在的项目
+            removed_ids = set(synced_etags.keys()) - synced_ids
+            if removed_ids:
+                self.mediadb.delete(server_type=self._server_type, item_ids=removed_ids)
             # 更新总体同步情况
             self.mediadb.statistics(server_type=self._server_type,
                                     total_count=total_count,
@@ -270,9 +298,34 @@ class MediaServer:
             # 结束进度条
             self.progress.update(ptype=ProgressKey.MediaSync,
                                  value=100,
-                                 text="媒体库数据同步完成，同步数量：%s" % total_count)
+                                 text="媒体库数据同步完成，同步数量：%s，更新：%s，删除：%s"
+                                      % (total_count, changed_count, len(removed_ids)))
             self.progress.end(ProgressKey.MediaSync)
-            log.info("【MediaServer】媒体库数据同步完成，同步数量：%s" % total_count)
+            log.info("【MediaServer】媒体库数据同步完成，同步数量：%s，更新：%s，删除：%s"
+                     % (total_count, changed_count, len(removed_ids)))
+
+    def __save_sync_items(self, pending_items):
+        """
+        等待剧集信息查询完成后批量写入数据库
+        :param pending_items: [(iteminfo, 查询剧集信息的future或None)]
+        """
+        if not pending_items:
+            return
+        items = []
+        for item, future in pending_items:
+            seasoninfo = []
+            if future:
+                try:
+                    seasoninfo = future.result()
+                except Exception as e:
+                    ExceptionUtils.exception_traceback(e)
+                    seasoninfo = None
+                if seasoninfo is None:
+                    # 查询失败时不记录变更标识，下次同步重新查询
+                    item["etag"] = None
+                    seasoninfo = []
+            items.append((item, seasoninfo))
+        self.mediadb.upsert(server_type=self._server_type, items=items)
 
     def check_item_exists(self,
                           mtype,
@@ -4,7 +4,7 @@ import json
 import os
 
 from app.plugins.modules._base import _IPluginModule
-from app.utils import SystemUtils
+from app.utils import SystemUtils, PathUtils
 
 
 class DiskSpaceSaver(_IPluginModule):
@@ -216,23 +216,19 @@ class DiskSpaceSaver(_IPluginModule):
         duplicates = {}
         file_group_by_size = {}
         # 先进行依次过滤
-        for dirpath, dirnames, filenames in os.walk(folder_path):
-            for filename in filenames:
-                file_path = os.path.join(dirpath, filename)
-                file_ext = os.path.splitext(file_path)[1]
-                file_size = os.path.getsize(file_path)
-                if file_ext.lower() not in _ext_list:
-                    continue
-
-                if os.path.getsize(file_path) < _file_size * 1024 * 1024:
-                    continue
-                file_mtime = datetime.datetime.fromtimestamp(os.path.getmtime(file_path))
-                if file_group_by_size.get(file_size) is None:
-                    file_group_by_size[file_size] = []
+        for file_path, file_stat in PathUtils.iter_dir_files(in_path=folder_path,
+                                                             exts=_ext_list,
+                                                             filesize=_file_size * 1024 * 1024,
+                                                             with_stat=True):
+            file_ext = os.path.splitext(file_path)[1]
+            file_size = file_stat.st_size
+            file_mtime = datetime.datetime.fromtimestamp(file_stat.st_mtime)
+            if file_group_by_size.get(file_size) is None:
+                file_group_by_size[file_size] = []
 
-                file_group_by_size[file_size].append(
-                    {'filePath': file_path, 'fileExt': file_ext, 'fileSize': file_size,
-                     'fileModifyTime': str(file_mtime)})
+            file_group_by_size[file_size].append(
+                {'filePath': file_path, 'fileExt': file_ext, 'fileSize': file_size,
+                 'fileModifyTime': str(file_mtime)})
 
         # 循环 file_group_by_size
         for file_size, file_list in file_group_by_size.items():
@@ -1,5 +1,9 @@
 import os.path
+import threading
+import time
 import traceback
+from collections import deque
+from queue import Queue, Empty, Full
 from threading import Thread
 
 import log
@@ -8,10 +12,132 @@ from app.helper import SubmoduleHelper
 from app.plugins.event_manager import EventManager
 from app.utils import SystemUtils, PathUtils, ImageUtils
 from app.utils.commons import singleton
-from app.utils.types import SystemConfigKey
+from app.utils.types import SystemConfigKey, EventType
 from config import Config
 
 
+class PluginEventWorker:
+    """
+    插件事件处理线程，每个插件独立的有界队列，按事件到达顺序依次处理
+    """
+
+    def __init__(self, pid, handle_func, queue_size, slow_seconds):
+        self.pid = pid
+        self._handle_func = handle_func
+        self._slow_seconds = slow_seconds
+        self._queue = Queue(maxsize=queue_size)
+        # 队列满时等待入队的事件：(事件, 方法, 截止时间)，由处理线程补入队列
+        self._pending = deque()
+        self._active = True
+        self._lock = threading.Lock()
+        # 统计信息
+        self._processed = 0
+        self._failed = 0
+        self._dropped = 0
+        self._total_latency = 0
+        self._max_latency = 0
+        self._last_latency = 0
+        self._running_event = None
+        self._running_since = None
+        self._thread = Thread(target=self.__run, name=f"plugin-event-{pid}", daemon=True)
+        self._thread.start()
+
+    def put(self, event, method, timeout=None):
+        """
+        事件入队，不阻塞调用线程；队列满时，有timeout的事件进入等待列表，
+        由处理线程在timeout秒内补入队列，否则丢弃
+        :return: 是否入队成功，失败时事件被丢弃
+        """
+        with self._lock:
+            # 有等待中的事件时，后到的事件不能插队
+            if not self._pending:
+                try:
+                    self._queue.put_nowait((event, method))
+                    return True
+                except Full:
+                    pass
+            if timeout and len(self._pending) < self._queue.maxsize:
+                self._pending.append((event, method, time.time() + timeout))
+                return True
+            self._dropped += 1
+            return False
+
+    def __fill_pending(self):
+        """
+        将等待中的事件补入队列，丢弃等待超时的事件
+        """
+        with self._lock:
+            now = time.time()
+            while self._pending:
+                event, method, deadline = self._pending[0]
+                if now > deadline:
+                    self._pending.popleft()
+                    self._dropped += 1
+                    log.warn(f"【Plugin】插件 {self.pid} 事件队列已满，丢弃事件：{event.event_type}")
+                    continue
+                try:
+                    self._queue.put_nowait((event, method))
+                except Full:
+                    break
+                self._pending.popleft()
+
+    def __run(self):
+        while self._active:
+            try:
+                event, method = self._queue.get(block=True, timeout=1)
+            except Empty:
+                self.__fill_pending()
+                continue
+            self.__fill_pending()
+            start_time = time.time()
+            with self._lock:
+                self._running_event = event.event_type
+                self._running_since = start_time
+            success = True
+            try:
+                self._handle_func(self.pid, method, event)
+            except Exception as e:
+                success = False
+                log.error(f"事件处理出错：{str(e)} - {traceback.format_exc()}")
+            latency = time.time() - start_time
+            with self._lock:
+                self._processed += 1
+                if not success:
+                    self._failed += 1
+                self._total_latency += latency
+                self._last_latency = latency
+                self._max_latency = max(self._max_latency, latency)
+                self._running_event = None
+                self._running_since = None
+            if latency > self._slow_seconds:
+                log.warn(f"【Plugin】插件 {self.pid} 处理事件 {event.event_type} 耗时 {round(latency, 1)} 秒，"
+                         f"队列中还有 {self._queue.qsize()} 个事件")
+
+    def stop(self):
+        """
+        停止处理线程，等待当前事件处理完成
+        """
+        self._active = False
+        self._thread.join()
+
+    def get_metrics(self):
+        """
+        获取队列深度和处理耗时
+        """
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize() + len(self._pending),
+                "processed": self._processed,
+                "failed": self._failed,
+                "dropped": self._dropped,
+                "avg_latency": round(self._total_latency / self._processed, 3) if self._processed else 0,
+                "max_latency": round(self._max_latency, 3),
+                "last_latency": round(self._last_latency, 3),
+                "running_event": self._running_event,
+                "running_seconds": round(time.time() - self._running_since, 1) if self._running_since else 0
+            }
+
+
 @singleton
 class PluginManager:
     """
@@ -31,10 +157,22 @@ class PluginManager:
     _running_plugins = {}
     # 配置Key
     _config_key = "plugin.%s"
-    # 事件处理线程
+    # 事件分发线程
     _thread = None
+    # 插件事件处理线程
+    _workers = {}
     # 开关
     _active = False
+    # 每个插件的事件队列长度
+    _event_queue_size = 100
+    # 队列满时事件等待入队的最长时间（秒），超时后丢弃事件
+    _event_put_timeout = 10
+    # 可直接丢弃的高频事件，队列满时不等待
+    _droppable_events = [EventType.EmbyWebhook.value,
+                         EventType.JellyfinWebhook.value,
+                         EventType.PlexWebhook.value]
+    # 处理耗时超过该值（秒）时输出告警
+    _slow_handler_seconds = 30
 
     def __init__(self):
         # config/plugins 是插件py文件目录，config/plugins/xxx是插件数据目录
@@ -57,18 +195,35 @@ class PluginManager:
 
     def __run(self):
         """
-        事件处理线程
+        事件分发线程，将事件投递到各插件的处理队列，同一插件的事件按到达顺序处理
         """
         while self._active:
             event, handlers = self.eventmanager.get_event()
             if event:
                 log.info(f"处理事件：{event.event_type} - {handlers}")
                 for handler in handlers:
-                    try:
-                        names = handler.__qualname__.split(".")
-                        self.run_plugin(names[0], names[1], event)
-                    except Exception as e:
-                        log.error(f"事件处理出错：{str(e)} - {traceback.format_exc()}")
+                    names = handler.__qualname__.split(".")
+                    if not self._running_plugins.get(names[0]):
+                        continue
+                    self.__dispatch(names[0], names[1], event)
+
+    def __dispatch(self, pid, method, event):
+        """
+        投递事件到插件处理队列，不阻塞分发线程：队列满时高频事件直接丢弃，其它事件等待队列空闲
+        """
+        worker = self._workers.get(pid)
+        if not worker:
+            worker = PluginEventWorker(pid=pid,
+                                       handle_func=self.run_plugin_method,
+                                       queue_size=self._event_queue_size,
+                                       slow_seconds=self._slow_handler_seconds)
+            self._workers[pid] = worker
+        if event.event_type in self._droppable_events:
+            timeout = None
+        else:
+            timeout = self._event_put_timeout
+        if not worker.put(event, method, timeout=timeout):
+            log.warn(f"【Plugin】插件 {pid} 事件队列已满，丢弃事件：{event.event_type}")
 
     def start_service(self):
         """
@@ -88,9 +243,13 @@ class PluginManager:
         """
         # 将事件管理器设为停止
         self._active = False
-        # 等待事件处理线程退出
+        # 等待事件分发线程退出
         if self._thread:
             self._thread.join()
+        # 等待插件事件处理线程退出
+        for worker in self._workers.values():
+            worker.stop()
+        self._workers = {}
         # 停止所有插件
         self.__stop_plugins()
 
@@ -196,6 +355,12 @@ class PluginManager:
             return None
         return self._running_plugins[pid].get_state()
 
+    def get_event_metrics(self):
+        """
+        获取各插件事件队列深度和处理耗时
+        """
+        return {pid: worker.get_metrics() for pid, worker in self._workers.items()}
+
     def save_plugin_config(self, pid, conf):
         """
         保存插件配置
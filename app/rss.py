@@ -1,4 +1,8 @@
+import json
+import math
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from threading import Lock
 
 import log
@@ -7,10 +11,10 @@ from app.downloader import Downloader
 from app.filter import Filter
 from app.helper import DbHelper, RssHelper
 from app.media import Media
-from app.media.meta import MetaInfo
+from app.media.meta import MetaInfo, get_metainfo_cache_stats
 from app.sites import Sites, SiteConf
 from app.subscribe import Subscribe
-from app.utils import ExceptionUtils, Torrent
+from app.utils import ExceptionUtils, Torrent, StringUtils
 from app.utils.commons import singleton
 from app.utils.types import MediaType, SearchType
 from app.message import Message
@@ -18,6 +22,133 @@ from app.message import Message
 lock = Lock()
 
 
+class RssMatchIndex(object):
+    """
+    订阅匹配索引，每次RSS处理前由订阅清单生成：
+    按tmdbid和名称查找候选订阅，模糊匹配的正则只编译一次，
+    并可在查询TMDB前根据种子名称排除不可能命中任何订阅的种子
+    """
+    # 子串匹配的最小名称长度，过短的名称只做完全匹配
+    _min_substring_len = 3
+    _min_substring_len_cn = 2
+
+    def __init__(self, rss_movies, rss_tvs, get_names=None):
+        """
+        :param rss_movies: 电影订阅清单
+        :param rss_tvs: 电视剧订阅清单
+        :param get_names: 根据类型和tmdbid查询所有译名的方法
+        """
+        # 订阅在清单中的顺序，候选订阅按该顺序返回
+        self._orders = {}
+        # 类型 -> tmdbid -> 订阅
+        self._tmdbids = {MediaType.MOVIE: {}, MediaType.TV: {}}
+        # 类型 -> 名称 -> 订阅，没有tmdbid的订阅按名称匹配
+        self._names = {MediaType.MOVIE: {}, MediaType.TV: {}}
+        # 类型 -> [(正则, 订阅)]
+        self._fuzzys = {MediaType.MOVIE: [], MediaType.TV: []}
+        # 标准化后的名称及译名 -> 订阅
+        self._aliases = {}
+        # 可做子串匹配的名称
+        self._substrings = []
+        for mtype, rss_infos in [(MediaType.MOVIE, rss_movies), (MediaType.TV, rss_tvs)]:
+            for rid, rss_info in (rss_infos or {}).items():
+                self.__add(mtype, rss_info, get_names)
+        for alias, rss_infos in self._aliases.items():
+            if len(alias) >= (self._min_substring_len_cn if StringUtils.is_chinese(alias)
+                              else self._min_substring_len):
+                self._substrings.append((alias, rss_infos))
+
+    def __add(self, mtype, rss_info, get_names):
+        """
+        将一条订阅加入索引
+        """
+        self._orders[id(rss_info)] = len(self._orders)
+        name = rss_info.get("name")
+        tmdbid = rss_info.get("tmdbid")
+        if rss_info.get("fuzzy_match"):
+            try:
+                regex = re.compile(name, re.I) if name else None
+            except re.error:
+                regex = None
+            self._fuzzys[mtype].append((regex, rss_info))
+            return
+        names = [name, rss_info.get("keyword")]
+        if tmdbid and not str(tmdbid).startswith("DB:"):
+            self._tmdbids[mtype].setdefault(str(tmdbid), []).append(rss_info)
+            if get_names:
+                names += get_names(mtype, tmdbid) or []
+        else:
+            self._names[mtype].setdefault(name, []).append(rss_info)
+        for alias in set(self.__normalize(n) for n in names if n):
+            if alias:
+                self._aliases.setdefault(alias, []).append(rss_info)
+
+    @staticmethod
+    def __normalize(name):
+        """
+        标准化名称，忽略大小写、空格和特殊字符
+        """
+        if not name:
+            return ""
+        return StringUtils.handler_special_chars(name).upper()
+
+    @staticmethod
+    def __site_match(rss_infos, site):
+        """
+        订阅中是否有包含该站点的
+        """
+        for rss_info in rss_infos:
+            rss_sites = rss_info.get("rss_sites")
+            if not rss_sites or site in rss_sites:
+                return True
+        return False
+
+    def is_plausible(self, meta_info, site=None):
+        """
+        仅根据种子名称识别结果判断是否可能命中订阅，不查询TMDB
+        :param meta_info: MetaInfo识别结果
+        :param site: 种子所在站点
+        :return: 不可能命中任何订阅时返回False
+        """
+        names = [self.__normalize(meta_info.cn_name), self.__normalize(meta_info.en_name)]
+        for name in names:
+            if name and name in self._aliases and self.__site_match(self._aliases[name], site):
+                return True
+        org_string = self.__normalize(meta_info.org_string)
+        if org_string:
+            for alias, rss_infos in self._substrings:
+                if alias in org_string and self.__site_match(rss_infos, site):
+                    return True
+        fuzzys = self._fuzzys[MediaType.MOVIE] + self._fuzzys[MediaType.TV]
+        if fuzzys:
+            search_title = " ".join(str(item) for item in [meta_info.org_string,
+                                                            meta_info.rev_string,
+                                                            meta_info.cn_name,
+                                                            meta_info.en_name,
+                                                            meta_info.year] if item)
+            for regex, rss_info in fuzzys:
+                if not self.__site_match([rss_info], site):
+                    continue
+                name = rss_info.get("name")
+                if (regex and regex.search(search_title)) or (name and name in search_title):
+                    return True
+        return False
+
+    def get_candidates(self, mtype, tmdbid, title):
+        """
+        查询可能命中的订阅，按订阅清单中的顺序返回
+        :param mtype: 电影或电视剧
+        :param tmdbid: 识别出的tmdbid
+        :param title: 识别出的标题
+        :return: [(订阅, 模糊匹配正则)]
+        """
+        mtype = MediaType.MOVIE if mtype == MediaType.MOVIE else MediaType.TV
+        candidates = [(rss_info, None) for rss_info in self._tmdbids[mtype].get(str(tmdbid), [])]
+        candidates += [(rss_info, None) for rss_info in self._names[mtype].get(title, [])]
+        candidates += [(rss_info, regex) for regex, rss_info in self._fuzzys[mtype]]
+        return sorted(candidates, key=lambda item: self._orders[id(item[0])])
+
+
 @singleton
 class Rss:
     filter = None
@@ -30,6 +161,12 @@ class Rss:
     rsshelper = None
     subscribe = None
     message = None
+    # 订阅媒体的TMDB译名，按类型和tmdbid缓存
+    _tmdb_names = {}
+    # 同时拉取RSS的站点数
+    _fetch_threads = 10
+    # 单个站点拉取并解析RSS的最长时间（秒），超时的站点下次重新处理
+    _fetch_timeout = 60
 
     def __init__(self):
         self.init_config()
@@ -45,6 +182,9 @@ class Rss:
         self.dbhelper = DbHelper()
         self.rsshelper = RssHelper()
         self.subscribe = Subscribe()
+        self._tmdb_names = {}
+        # 加载最近处理过的RSS记录
+        self.rsshelper.warm_rssd_cache()
 
     def rssdownload(self):
         """
@@ -63,6 +203,7 @@ class Rss:
 
         with lock:
             log.info("【Rss】开始RSS订阅...")
+            cycle_begin = time.time()
 
             # 读取电影订阅
             rss_movies = self.subscribe.get_subscribe_movies(state='R')
@@ -82,6 +223,9 @@ class Rss:
             if not rss_movies and not rss_tvs:
                 return
 
+            # 生成订阅匹配索引
+            match_index = self.__build_match_index(rss_movies, rss_tvs)
+
             # 获取有订阅的站点范围
             check_sites = []
             check_all = False
@@ -105,10 +249,13 @@ class Rss:
             else:
                 check_sites = list(set(check_sites))
 
+            # 订阅清单不变时，各站点RSS只需要处理新出现的种子
+            rss_context = StringUtils.md5_hash(json.dumps([rss_movies, rss_tvs], sort_keys=True, default=str))
             total_num = 0
             rss_download_torrents = []
             rss_no_exists = {}
-            # 遍历站点资源
+            # 有效的RSS站点
+            fetch_sites = []
             for site_info in rss_sites_info:
                 if not site_info:
                     continue
@@ -118,10 +265,20 @@ class Rss:
                 if check_sites and site_name not in check_sites:
                     continue
                 # 站点rss链接
-                rss_url = site_info.get("rssurl")
-                if not rss_url:
+                if not site_info.get("rssurl"):
                     log.info(f"【Rss】{site_name} 未配置rssurl，跳过...")
                     continue
+                fetch_sites.append(site_info)
+            # 并发拉取各站点RSS，按站点顺序处理结果
+            fetch_tasks = self.__start_fetch_rss(fetch_sites, rss_context)
+            # 各站点耗时
+            site_timings = []
+            # 遍历站点资源
+            for site_info, fetch_task in zip(fetch_sites, fetch_tasks):
+                # 站点名称
+                site_name = site_info.get("name")
+                # 站点rss链接
+                rss_url = site_info.get("rssurl")
                 # 站点信息
                 site_id = site_info.get("id")
                 site_cookie = site_info.get("cookie")
@@ -132,13 +289,17 @@ class Rss:
                 site_proxy = site_info.get("proxy")
                 # 使用的规则
                 site_fliter_rule = site_info.get("rule")
-                # 开始下载RSS
+                # 等待RSS拉取完成
                 log.info(f"【Rss】正在处理：{site_name}")
                 if site_info.get("pri"):
                     site_order = 100 - int(site_info.get("pri"))
                 else:
                     site_order = 0
-                rss_acticles = self.rsshelper.parse_rssxml(url=rss_url)
+                fetch_flag, rss_acticles = self.__wait_fetch_rss(fetch_task)
+                if not fetch_flag:
+                    log.warn(f"【Rss】{site_name} RSS拉取超过 {self._fetch_timeout} 秒，放弃本次处理")
+                    site_timings.append((site_name, fetch_task.get("fetch_time"), 0, 0, 0))
+                    continue
                 if rss_acticles is None:
                     # RSS链接过期
                     log.error(f"【Rss】站点 {site_name} RSS链接已过期，请重新获取！")
@@ -147,14 +308,15 @@ class Rss:
                                                    text=f"站点：{site_name}\n"
                                                         f"链接：{rss_url}")
                     continue
-                if not rss_acticles:
-                    log.warn(f"【Rss】{site_name} 未下载到数据")
-                    continue
-                else:
-                    log.info(f"【Rss】{site_name} 获取数据：{len(rss_acticles)}")
+                match_begin = time.time()
                 # 处理RSS结果
                 res_num = 0
-                for article in rss_acticles:
+                article_num = 0
+                # 是否有种子因临时原因未处理，需要下次重新处理
+                reprocess_flag = False
+                # 按批查询是否处理过
+                for article, rssd_flag in self.rsshelper.iter_rssd_articles(rss_acticles):
+                    article_num += 1
                     try:
                         # 种子名
                         title = article.get('title')
@@ -167,7 +329,7 @@ class Rss:
                         # 开始处理
                         log.info(f"【Rss】开始处理：{title}")
                         # 检查这个种子是不是下过了
-                        if self.rsshelper.is_rssd_by_enclosure(enclosure):
+                        if rssd_flag:
                             log.info(f"【Rss】{title} 已成功订阅过")
                             continue
                         # 识别种子名称，开始搜索TMDB
@@ -179,6 +341,10 @@ class Rss:
                             media_info.type = cache_info.get("type")
                             media_info.title = cache_info.get("title")
                             media_info.year = cache_info.get("year")
+                        elif not match_index.is_plausible(media_info, site_name):
+                            # 名称不可能命中订阅，不查询TMDB
+                            log.info(f"【Rss】{title} 识别为 {media_info.get_name()} 不在订阅范围")
+                            continue
                         else:
                             # 重新查询TMDB
                             media_info = self.media.get_media_info(title=title)
@@ -187,6 +353,9 @@ class Rss:
                                 continue
                             elif not media_info.tmdb_info:
                                 log.info(f"【Rss】{title} 识别为 {media_info.get_name()} 未匹配到TMDB媒体信息")
+                                if not self.media.get_cache_info(media_info):
+                                    # 查询TMDB出错时没有写入识别缓存，下次重新处理
+                                    reprocess_flag = True
                         # 大小及种子页面
                         media_info.set_torrent_info(size=size,
                                                     page_url=page_url,
@@ -198,6 +367,7 @@ class Rss:
                             media_info=media_info,
                             rss_movies=rss_movies,
                             rss_tvs=rss_tvs,
+                            match_index=match_index,
                             site_id=site_id,
                             site_filter_rule=site_fliter_rule,
                             site_cookie=site_cookie,
@@ -209,6 +379,9 @@ class Rss:
 
                         # 未匹配
                         if not match_flag:
+                            if match_flag is None:
+                                # 触发站点流控，下次重新处理
+                                reprocess_flag = True
                             continue
 
                         # 非模糊匹配命中，检查本地情况，检查删除订阅
@@ -218,6 +391,7 @@ class Rss:
                                 media_info.set_tmdb_info(self.media.get_tmdb_info(mtype=media_info.type,
                                                                                   tmdbid=media_info.tmdb_id))
                             if not media_info.tmdb_info:
+                                reprocess_flag = True
                                 continue
                             over_edition = match_info.get("over_edition")
                             exist_flag, no_exists = self.subscribe.get_no_exists(media_info, match_info, over_edition)
@@ -230,6 +404,7 @@ class Rss:
 
                         # 站点流控
                         if self.sites.check_ratelimit(site_id):
+                            reprocess_flag = True
                             continue
 
                         # 设置种子信息
@@ -251,12 +426,126 @@ class Rss:
                     except Exception as e:
                         ExceptionUtils.exception_traceback(e)
                         log.error("【Rss】处理RSS发生错误：%s" % str(e))
+                        reprocess_flag = True
                         continue
+                if reprocess_flag:
+                    self.rsshelper.reset_feed_state(rss_url, fetch_task.get("context"))
+                site_timings.append((site_name,
+                                     fetch_task.get("fetch_time"),
+                                     time.time() - match_begin,
+                                     article_num,
+                                     res_num))
+                if not article_num:
+                    log.info(f"【Rss】{site_name} 没有新数据")
+                    continue
+                log.info(f"【Rss】{site_name} 获取数据：{article_num}")
                 log.info("【Rss】%s 处理结束，匹配到 %s 个有效资源" % (site_name, res_num))
-            log.info("【Rss】所有RSS处理结束，共 %s 个有效资源" % len(rss_download_torrents))
+            log.info("【Rss】所有RSS处理结束，共 %s 个有效资源，用时 %.1f 秒"
+                     % (total_num, time.time() - cycle_begin))
+            for site_name, fetch_time, match_time, article_num, res_num in site_timings:
+                log.info("【Rss】%s 拉取 %s，处理 %.1f 秒，新数据 %s 条，有效资源 %s 个"
+                         % (site_name,
+                            "%.1f 秒" % fetch_time if fetch_time is not None else "超时",
+                            match_time,
+                            article_num,
+                            res_num))
+            cache_stats = get_metainfo_cache_stats()
+            log.info("【Rss】名称识别缓存：命中 %s 次，未命中 %s 次，缓存 %s 条"
+                     % (cache_stats.get("hits"), cache_stats.get("misses"), cache_stats.get("size")))
             for rid, item in rss_items.items():
                 self.subscribe.subscribe_media(item['match_info'], item['media_list'], item['no_exists'])
 
+    def __start_fetch_rss(self, site_infos, rss_context):
+        """
+        在线程池中并发拉取并解析各站点的RSS
+        :param site_infos: 站点清单
+        :param rss_context: 订阅清单的指纹
+        :return: 与站点清单顺序一致的拉取任务
+        """
+        if not site_infos:
+            return []
+        threads = min(len(site_infos), self._fetch_threads)
+        executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="rss-fetch")
+        # 排队的任务最多等待前面各批任务超时
+        deadline = time.time() + self._fetch_timeout * math.ceil(len(site_infos) / threads)
+        tasks = []
+        for site_info in site_infos:
+            task = {
+                "url": site_info.get("rssurl"),
+                "context": StringUtils.md5_hash(
+                    f"{rss_context}-{site_info.get('rule')}-{site_info.get('parse')}"),
+                "deadline": deadline,
+                "lock": Lock()
+            }
+            task["future"] = executor.submit(self.__fetch_rss, task)
+            tasks.append(task)
+        # 不等待超时的线程结束
+        executor.shutdown(wait=False)
+        return tasks
+
+    def __fetch_rss(self, task):
+        """
+        拉取并解析一个站点的RSS，在拉取线程中执行
+        """
+        with task.get("lock"):
+            if task.get("cancelled"):
+                return
+            begin = time.time()
+            task["begin"] = begin
+        try:
+            articles = self.rsshelper.parse_rssxml(url=task.get("url"), context=task.get("context"))
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            articles = []
+        with task.get("lock"):
+            if task.get("cancelled"):
+                # 已放弃处理，清除拉取状态，下次重新处理这些种子
+                self.rsshelper.reset_feed_state(task.get("url"), task.get("context"))
+                return
+            task["fetch_time"] = time.time() - begin
+            task["articles"] = articles
+            task["done"] = True
+
+    def __wait_fetch_rss(self, task):
+        """
+        等待站点RSS拉取完成，从开始拉取起超过超时时间则放弃
+        :return: 是否拉取完成、种子信息列表（为None代表Rss过期）
+        """
+        future = task.get("future")
+        while not future.done():
+            begin = task.get("begin")
+            deadline = begin + self._fetch_timeout if begin else task.get("deadline")
+            if time.time() >= deadline:
+                break
+            wait([future], timeout=min(deadline - time.time(), 1))
+        with task.get("lock"):
+            if not task.get("done"):
+                task["cancelled"] = True
+                return False, []
+        return True, task.get("articles")
+
+    def __build_match_index(self, rss_movies, rss_tvs):
+        """
+        根据订阅清单生成匹配索引，订阅媒体的译名只在首次出现时查询TMDB
+        """
+        tmdb_names = {}
+
+        def __get_names(mtype, tmdbid):
+            key = (mtype, str(tmdbid))
+            if key not in self._tmdb_names:
+                try:
+                    self._tmdb_names[key] = self.media.get_tmdb_names(mtype, tmdbid)
+                except Exception as e:
+                    ExceptionUtils.exception_traceback(e)
+                    return []
+            tmdb_names[key] = self._tmdb_names[key]
+            return tmdb_names[key]
+
+        match_index = RssMatchIndex(rss_movies, rss_tvs, get_names=__get_names)
+        # 只保留当前订阅的译名
+        self._tmdb_names = tmdb_names
+        return match_index
+
     def check_torrent_rss(self,
                           media_info,
                           rss_movies,
@@ -266,19 +555,22 @@ class Rss:
                           site_cookie,
                           site_parse,
                           site_ua,
-                          site_proxy):
+                          site_proxy,
+                          match_index=None):
         """
         判断种子是否命中订阅
         :param media_info: 已识别的种子媒体信息
         :param rss_movies: 电影订阅清单
         :param rss_tvs: 电视剧订阅清单
+        :param match_index: 订阅匹配索引，为空时按订阅清单生成
         :param site_id: 站点ID
         :param site_filter_rule: 站点过滤规则
         :param site_cookie: 站点的Cookie
         :param site_parse: 是否解析种子详情
         :param site_ua: 站点请求UA
         :param site_proxy: 是否使用代理
-        :return: 匹配到的订阅ID、是否洗版、总集数、匹配规则的资源顺序、上传因子、下载因子，匹配的季（电视剧）
+        :return: 匹配到的订阅ID、是否洗版、总集数、匹配规则的资源顺序、上传因子、下载因子，匹配的季（电视剧），
+                 触发站点流控未能判断时匹配状态为None
         """
         # 默认值
         # 匹配状态 0不在订阅范围内 -1不符合过滤条件 1匹配
@@ -291,10 +583,16 @@ class Rss:
         # 下载因素
         download_volume_factor = None
         hit_and_run = False
+        if not match_index:
+            match_index = RssMatchIndex(rss_movies, rss_tvs)
+        # 按tmdbid和名称取候选订阅
+        candidates = match_index.get_candidates(mtype=media_info.type,
+                                                tmdbid=media_info.tmdb_id,
+                                                title=media_info.title)
 
         # 匹配电影
         if media_info.type == MediaType.MOVIE and rss_movies:
-            for rid, rss_info in rss_movies.items():
+            for rss_info, fuzzy_re in candidates:
                 rss_sites = rss_info.get('rss_sites')
                 # 过滤订阅站点
                 if rss_sites and media_info.site not in rss_sites:
@@ -325,7 +623,7 @@ class Rss:
                         continue
                     # 匹配关键字或正则表达式
                     search_title = f"{media_info.rev_string} {media_info.title} {media_info.year}"
-                    if not re.search(name, search_title, re.I) and name not in search_title:
+                    if not (fuzzy_re and fuzzy_re.search(search_title)) and name not in search_title:
                         continue
                 # 媒体匹配成功
                 match_flag = True
@@ -334,7 +632,7 @@ class Rss:
         # 匹配电视剧
         elif rss_tvs:
             # 匹配种子标题
-            for rid, rss_info in rss_tvs.items():
+            for rss_info, fuzzy_re in candidates:
                 rss_sites = rss_info.get('rss_sites')
                 # 过滤订阅站点
                 if rss_sites and media_info.site not in rss_sites:
@@ -370,7 +668,7 @@ class Rss:
                         continue
                     # 匹配关键字或正则表达式
                     search_title = f"{media_info.rev_string} {media_info.title} {media_info.year}"
-                    if not re.search(name, search_title, re.I) and name not in search_title:
+                    if not (fuzzy_re and fuzzy_re.search(search_title)) and name not in search_title:
                         continue
                 # 媒体匹配成功
                 match_flag = True
@@ -384,7 +682,7 @@ class Rss:
                 # 站点流控
                 if self.sites.check_ratelimit(site_id):
                     match_msg.append("触发站点流控")
-                    return False, match_msg, match_rss_info
+                    return None, match_msg, match_rss_info
                 # 检测Free
                 torrent_attr = self.siteconf.check_torrent_attr(torrent_url=media_info.page_url,
                                                                 cookie=site_cookie,
@@ -1,3 +1,4 @@
+import hashlib
 import json
 import time
 import traceback
@@ -193,14 +194,21 @@ class RssChecker(object):
         taskinfo = self.get_rsstask_info(taskid)
         if not taskinfo:
             return
-        rss_result = self.__parse_userrss_result(taskinfo)
+        # 任务配置未变化时，RSS未更新则不解析，只处理新出现的条目
+        feed_states = []
+        rss_result = self.__parse_userrss_result(taskinfo, feed_states=feed_states)
         if len(rss_result) == 0:
-            log.warn("【RssChecker】%s 未下载到数据" % taskinfo.get("name"))
+            log.info("【RssChecker】%s 没有新数据" % taskinfo.get("name"))
+            self.__save_feed_states(feed_states)
             return
         else:
             log.info("【RssChecker】%s 获取数据：%s" % (taskinfo.get("name"), len(rss_result)))
         # 处理RSS结果
         res_num = 0
+        # 是否有条目未能处理完成，需要下次重新处理
+        reprocess_flag = False
+        # 批量查询已处理过的条目
+        processed_articles = self.get_processed_articles(taskinfo.get("uses"), rss_result)
         for res in rss_result:
             try:
                 # 种子名
@@ -227,7 +235,8 @@ class RssChecker(object):
                 task_type = taskinfo.get("uses")
                 meta_name = "%s %s" % (title, year) if year else title
                 # 检查是否已处理过
-                if self.is_article_processed(task_type, title, year, enclosure):
+                article_key = self.__get_article_key(task_type, title, year, enclosure)
+                if article_key in processed_articles:
                     log.info("【RssChecker】%s 已处理过" % title)
                     continue
 
@@ -339,6 +348,7 @@ class RssChecker(object):
                     media_info.set_torrent_info(enclosure=meta_name)
                     # 添加处理历史
                     self.rsshelper.insert_rss_torrents(media_info)
+                    processed_articles.add(article_key)
                     if media_info not in rss_subscribe_torrents:
                         rss_subscribe_torrents.append(media_info)
                         res_num = res_num + 1
@@ -346,6 +356,7 @@ class RssChecker(object):
                     continue
             except Exception as e:
                 log.error("【Rss】处理RSS发生错误：" + "".join(traceback.format_exception(e)))
+                reprocess_flag = True
                 continue
         log.info("【RssChecker】%s 处理结束，匹配到 %s 个有效资源" % (taskinfo.get("name"), res_num))
         # 添加下载
@@ -364,6 +375,7 @@ class RssChecker(object):
                     downloader_name = self.downloader.get_downloader_conf(downloader_id).get("name")
                     self.dbhelper.insert_userrss_task_history(taskid, media.org_string, downloader_name)
                 else:
+                    reprocess_flag = True
                     log.error("【RssChecker】添加下载任务 %s 失败：%s" % (
                         media.get_title_string(), ret_msg or "请检查下载任务是否已存在"))
         # 添加订阅
@@ -389,6 +401,9 @@ class RssChecker(object):
                 if not rss_media or code != 0:
                     log.warn("【RssChecker】%s 添加订阅失败：%s" % (media.get_name(), msg))
 
+        # 记录RSS拉取状态
+        if not reprocess_flag:
+            self.__save_feed_states(feed_states)
         # 更新状态
         counter = len(rss_download_torrents) + len(rss_subscribe_torrents) + len(rss_search_torrents)
         if counter:
@@ -397,9 +412,19 @@ class RssChecker(object):
                 if str(taskinfo.get("counter")).isdigit() else counter
             taskinfo["update_time"] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
 
-    def __parse_userrss_result(self, taskinfo):
+    def __save_feed_states(self, feed_states):
+        """
+        保存自定义RSS各地址的拉取状态
+        """
+        for feed_state in feed_states:
+            self.rsshelper.update_feed_state(**feed_state)
+
+    def __parse_userrss_result(self, taskinfo, feed_states=None):
         """
         获取RSS链接数据，根据PARSER进行解析获取返回结果
+        :param taskinfo: 任务信息
+        :param feed_states: 传入列表时启用增量拉取：任务配置未变化且RSS未更新时不解析，只返回新出现的条目，
+                            本次的拉取状态追加到该列表中，由调用方处理完成后保存
         """
         task_name = taskinfo.get("name")
         rss_urls = taskinfo.get("address")
@@ -438,16 +463,30 @@ class RssChecker(object):
                     log.error(f"【RssChecker】任务 {task_name} 配置解析器 {parser_name} 附加参数不合法")
                     continue
                 rss_url = "%s?%s" % (rss_url, param_url) if rss_url.find("?") == -1 else "%s&%s" % (rss_url, param_url)
+            # 增量拉取，任务的处理条件
+            feed_context = None
+            feed_state = None
+            if feed_states is not None:
+                feed_context = StringUtils.md5_hash(
+                    json.dumps([{k: v for k, v in taskinfo.items() if k not in ["counter", "update_time"]},
+                                rss_parser], sort_keys=True, default=str))
+                feed_state = self.rsshelper.get_feed_state(url=rss_url, context=feed_context)
             # 请求数据
             try:
                 ret = RequestUtils(proxies=Config().get_proxies() if taskinfo.get("proxy") else None
-                                   ).get_res(rss_url)
+                                   ).get_res(rss_url, headers=self.rsshelper.get_conditional_headers(feed_state))
                 if not ret:
                     continue
+                if feed_state and ret.status_code == 304:
+                    continue
+                content_hash = hashlib.md5(ret.content).hexdigest()
+                if feed_state and feed_state.CONTENT_HASH == content_hash:
+                    continue
                 ret.encoding = ret.apparent_encoding
             except Exception as e2:
                 ExceptionUtils.exception_traceback(e2)
                 continue
+            url_result_pos = len(rss_result)
             # 解析数据 XPATH
             if rss_parser.get("type") == "XML":
                 try:
@@ -498,6 +537,20 @@ class RssChecker(object):
                             rss_item.update({key: value[0]})
                     rss_item.update({"address_index": i+1})
                     rss_result.append(rss_item)
+            # 过滤掉上次已经出现过的条目
+            if feed_states is not None:
+                url_items = rss_result[url_result_pos:]
+                seen_items = set(json.loads(feed_state.ITEMS or "[]")) if feed_state else set()
+                rss_result[url_result_pos:] = [item for item in url_items
+                                               if (item.get("enclosure") or item.get("title")) not in seen_items]
+                feed_states.append({
+                    "url": rss_url,
+                    "context": feed_context,
+                    "etag": ret.headers.get("ETag"),
+                    "last_modified": ret.headers.get("Last-Modified"),
+                    "content_hash": content_hash,
+                    "items": [item.get("enclosure") or item.get("title") for item in url_items]
+                })
         return rss_result
 
     def get_userrss_parser(self, pid=None):
@@ -525,6 +578,7 @@ class RssChecker(object):
         rss_result = self.__parse_userrss_result(taskinfo)
         if len(rss_result) == 0:
             return []
+        processed_articles = self.get_processed_articles(taskinfo.get("uses"), rss_result)
         for res in rss_result:
             try:
                 # 种子名
@@ -546,7 +600,7 @@ class RssChecker(object):
                 if year and len(year) > 4:
                     year = year[:4]
                 # 检查是不是处理过
-                finish_flag = self.is_article_processed(taskinfo.get("uses"), title, year, enclosure)
+                finish_flag = self.__get_article_key(taskinfo.get("uses"), title, year, enclosure) in processed_articles
                 # 信息聚合
                 params = {
                     "title": title,
@@ -720,6 +774,42 @@ class RssChecker(object):
         except Exception as e:
             print(str(e))
 
+    @staticmethod
+    def __get_article_key(task_type, title, year, enclosure):
+        """
+        生成判断报文是否已处理的查询条件，与is_article_processed一致
+        :return: (查询字段, 值)，字段E为下载链接，N为名称，不需要检查时返回None
+        """
+        meta_name = f"{title} {year}" if year else title
+        match task_type:
+            case "D":
+                return ("E", enclosure) if enclosure else ("N", meta_name)
+            case "R":
+                return "E", meta_name
+            case _:
+                return None
+
+    def get_processed_articles(self, task_type, articles):
+        """
+        批量检查报文是否已处理
+        :param task_type: 订阅任务类型
+        :param articles: 报文列表
+        :return: 已处理报文的查询条件集合，见__get_article_key
+        """
+        article_keys = set()
+        for article in articles:
+            year = article.get('year')
+            if year and len(year) > 4:
+                year = year[:4]
+            article_keys.add(self.__get_article_key(task_type, article.get('title'), year, article.get('enclosure')))
+        article_keys.discard(None)
+        processed_enclosures = self.rsshelper.get_rssd_enclosures([v for k, v in article_keys if k == "E"])
+        processed_names = self.rsshelper.get_rssd_names([v for k, v in article_keys if k == "N"])
+        processed_keys = {("E", v) for v in processed_enclosures} | {("N", v) for v in processed_names}
+        # 名称和链接都为空的视为已处理
+        processed_keys |= {(k, v) for k, v in article_keys if not v}
+        return processed_keys
+
     def is_article_processed(self, task_type, title, year, enclosure):
         """
         检查报文是否已处理
@@ -63,6 +63,43 @@ class Searcher:
                                               match_media=match_media,
                                               in_from=in_from)
 
+    def iter_search_medias(self,
+                           key_word: [str, list],
+                           filter_args: dict,
+                           match_media=None,
+                           in_from: SearchType = None,
+                           cancel_event=None,
+                           late_callback=None):
+        """
+        根据关键字调用索引器检查媒体，按站点返回顺序逐批输出结果
+        :param key_word: 搜索的关键字，不能为空
+        :param filter_args: 过滤条件
+        :param match_media: 区配的媒体信息
+        :param in_from: 搜索渠道
+        :param cancel_event: 取消标志
+        :param late_callback: 超时站点在后台完成后返回结果的回调，参数为资源媒体信息列表
+        :return: 命中的资源媒体信息列表生成器，每个站点一批
+        """
+        if not key_word:
+            return
+        if not self.indexer:
+            return
+        # 触发事件
+        self.eventmanager.send_event(EventType.SearchStart, {
+            "key_word": key_word,
+            "media_info": match_media.to_dict() if match_media else None,
+            "filter_args": filter_args,
+            "search_type": in_from.value if in_from else None
+        })
+        for _, result in self.indexer.iter_search_by_keyword(key_word=key_word,
+                                                             filter_args=filter_args,
+                                                             match_media=match_media,
+                                                             in_from=in_from,
+                                                             cancel_event=cancel_event,
+                                                             late_callback=(lambda _, _result: late_callback(_result))
+                                                             if late_callback else None):
+            yield result
+
     def search_one_media(self, media_info: MetaVideo,
                          in_from: SearchType,
                          sites: list = None,
@@ -1,10 +1,11 @@
+import threading
 import time
 
 
 class SiteRateLimiter:
     def __init__(self, limit_interval: int, limit_count: int, limit_seconds: int):
         """
-        限制访问频率
+        限制访问频率，单位时间内的访问次数按令牌桶控制：桶容量为访问次数，令牌按 次数/单位时间 的速率补充
         :param limit_interval: 单位时间（秒）
         :param limit_count: 单位时间内访问次数
         :param limit_seconds: 访问间隔（秒）
@@ -13,42 +14,89 @@ class SiteRateLimiter:
         self.limit_interval = limit_interval
         self.limit_seconds = limit_seconds
         self.last_visit_time = 0
-        self.count = 0
+        self._lock = threading.Lock()
+        # 令牌桶
+        if self.limit_interval and self.limit_count:
+            self._tokens = float(self.limit_count)
+            self._rate = self.limit_count / self.limit_interval
+        else:
+            self._tokens = None
+            self._rate = None
+        self._refill_time = time.time()
 
-    def check_rate_limit(self) -> (bool, str):
+    def __wait_seconds(self, current_time):
         """
-        检查是否超出访问频率控制
-        :return: 超出返回True，否则返回False，超出时返回错误信息
+        计算距离下次允许访问还需等待的时间
+        :return: 等待秒数, 触发的流控规则
         """
-        current_time = time.time()
+        wait_seconds, msg = 0, ""
         # 防问间隔时间
         if self.limit_seconds:
-            if current_time - self.last_visit_time < self.limit_seconds:
-                return True, f"触发流控规则，访问间隔不得小于 {self.limit_seconds} 秒，" \
-                             f"上次访问时间：{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.last_visit_time))}"
+            wait_seconds = self.last_visit_time + self.limit_seconds - current_time
+            if wait_seconds > 0:
+                msg = f"触发流控规则，访问间隔不得小于 {self.limit_seconds} 秒，" \
+                      f"上次访问时间：{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.last_visit_time))}"
         # 单位时间内访问次数
-        if self.limit_interval and self.limit_count:
-            if current_time - self.last_visit_time > self.limit_interval:
-                # 计数清零
-                self.count = 0
-            if self.count >= self.limit_count:
-                return True, f"触发流控规则，{self.limit_interval} 秒内访问次数不得超过 {self.limit_count} 次，" \
-                             f"上次访问时间：{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.last_visit_time))}"
-            # 访问计数
-            self.count += 1
-        # 更新最后访问时间
+        if self._rate:
+            self._tokens = min(float(self.limit_count),
+                               self._tokens + (current_time - self._refill_time) * self._rate)
+            self._refill_time = current_time
+            if self._tokens < 1:
+                token_wait = (1 - self._tokens) / self._rate
+                if token_wait > wait_seconds:
+                    wait_seconds = token_wait
+                    msg = f"触发流控规则，{self.limit_interval} 秒内访问次数不得超过 {self.limit_count} 次，" \
+                          f"上次访问时间：{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.last_visit_time))}"
+        return max(wait_seconds, 0), msg
+
+    def __visit(self, current_time):
+        """
+        记录一次访问
+        """
+        if self._rate:
+            self._tokens -= 1
         self.last_visit_time = current_time
+
+    def check_rate_limit(self) -> (bool, str):
+        """
+        检查是否超出访问频率控制
+        :return: 超出返回True，否则返回False，超出时返回错误信息
+        """
+        with self._lock:
+            current_time = time.time()
+            wait_seconds, msg = self.__wait_seconds(current_time)
+            if wait_seconds > 0:
+                return True, msg
+            self.__visit(current_time)
         # 未触发流控
         return False, ""
 
+    def acquire(self, timeout: float = None) -> bool:
+        """
+        阻塞等待直到允许访问
+        :param timeout: 最长等待时间（秒），为空时一直等待
+        :return: 获得访问许可返回True，超时返回False
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        while True:
+            with self._lock:
+                current_time = time.time()
+                wait_seconds, _ = self.__wait_seconds(current_time)
+                if wait_seconds <= 0:
+                    self.__visit(current_time)
+                    return True
+            if deadline is not None and current_time + wait_seconds > deadline:
+                return False
+            time.sleep(wait_seconds)
+
 
 if __name__ == "__main__":
-    # 限制 1 分钟内最多访问 10 次，单次访问间隔不得小于 10 秒
-    site_rate_limit = SiteRateLimiter(10, 60, 10)
+    # 限制 1 分钟内最多访问 10 次，单次访问间隔不得小于 3 秒
+    site_rate_limit = SiteRateLimiter(60, 10, 3)
 
     # 模拟访问
     for i in range(12):
-        if site_rate_limit.check_rate_limit():
+        if site_rate_limit.check_rate_limit()[0]:
             print("访问频率超限")
         else:
             print("访问成功")
@@ -1,16 +1,21 @@
 import os
 import pickle
-import random
+import threading
 import time
-from functools import lru_cache
 
 from lxml import etree
 
 from app.helper import ChromeHelper
+from app.sites.site_limiter import SiteRateLimiter
 from app.utils import ExceptionUtils, StringUtils, RequestUtils
+from app.utils.cache_manager import TorrentAttrCache
 from app.utils.commons import singleton
 from config import Config
 
+lock = threading.Lock()
+# 浏览器渲染不支持并发
+render_lock = threading.Lock()
+
 
 @singleton
 class SiteConf:
@@ -76,6 +81,11 @@ class SiteConf:
     # 促销/HR的匹配XPATH
     _RSS_SITE_GRAP_CONF = {}
 
+    # 详情页访问频率控制，按站点域名区分，默认10秒内最多访问3次
+    _probe_limiters = {}
+    _PROBE_LIMIT_INTERVAL = 10
+    _PROBE_LIMIT_COUNT = 3
+
     def __init__(self):
         self.init_config()
 
@@ -125,6 +135,11 @@ class SiteConf:
         xpath_strs = self.get_grap_conf(torrent_url)
         if not xpath_strs:
             return ret_attr
+        cache_attr = TorrentAttrCache.get(torrent_url)
+        if cache_attr:
+            return dict(cache_attr)
+        # 按站点控制访问频率
+        self.__get_probe_limiter(torrent_url).acquire()
         html_text = self.__get_site_page_html(url=torrent_url,
                                               cookie=cookie,
                                               ua=ua,
@@ -159,22 +174,33 @@ class SiteConf:
                         if m == " ":
                             break
                     ret_attr["peer_count"] = int(peer_count_digit_str) if len(peer_count_digit_str) > 0 else 0
+            TorrentAttrCache.set(torrent_url, dict(ret_attr))
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
-        # 随机休眼后再返回
-        time.sleep(round(random.uniform(1, 5), 1))
         return ret_attr
 
+    def __get_probe_limiter(self, url):
+        """
+        获取站点详情页的访问频率控制器
+        """
+        domain = StringUtils.get_url_domain(url)
+        with lock:
+            if domain not in self._probe_limiters:
+                self._probe_limiters[domain] = SiteRateLimiter(limit_interval=self._PROBE_LIMIT_INTERVAL,
+                                                               limit_count=self._PROBE_LIMIT_COUNT,
+                                                               limit_seconds=None)
+            return self._probe_limiters[domain]
+
     @staticmethod
-    @lru_cache(maxsize=128)
     def __get_site_page_html(url, cookie, ua, render=False, proxy=False):
         chrome = ChromeHelper(headless=True)
         if render and chrome.get_status():
             # 开渲染
-            if chrome.visit(url=url, cookie=cookie, ua=ua, proxy=proxy):
-                # 等待页面加载完成
-                time.sleep(10)
-                return chrome.get_html()
+            with render_lock:
+                if chrome.visit(url=url, cookie=cookie, ua=ua, proxy=proxy):
+                    # 等待页面加载完成
+                    time.sleep(10)
+                    return chrome.get_html()
         else:
             res = RequestUtils(
                 cookies=cookie,
@@ -166,6 +166,20 @@ class Sites:
             log.warn(f"【Sites】站点 {self._siteByIds[site_id].get('name')} {msg}")
         return state
 
+    def wait_ratelimit(self, site_id, timeout=None):
+        """
+        等待站点流控放行
+        :param site_id: 站点ID
+        :param timeout: 最长等待时间（秒）
+        :return: True为等待超时仍触发流控，False为可以访问
+        """
+        if not self._limiters.get(site_id):
+            return False
+        if self._limiters[site_id].acquire(timeout=timeout):
+            return False
+        log.warn(f"【Sites】站点 {self._siteByIds[site_id].get('name')} 等待流控超时")
+        return True
+
     def get_sites_by_suffix(self, suffix):
         """
         根据url的后缀获取站点配置
@@ -411,7 +411,7 @@ class Sync(object):
             sync_mode = ModuleConf.RMT_MODES.get(sync_path_conf.get("syncmod"))
             # 不做识别重命名
             if not rename:
-                for link_file in PathUtils.get_dir_files(mon_path):
+                for link_file in PathUtils.iter_dir_files(mon_path):
                     self.__link(link_file, mon_path, target_path, sync_mode)
             else:
                 for path in PathUtils.get_dir_level1_medias(mon_path, RMT_MEDIAEXT):
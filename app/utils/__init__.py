@@ -1,6 +1,6 @@
 from .dom_utils import DomUtils
 from .episode_format import EpisodeFormat
-from .http_utils import RequestUtils
+from .http_utils import RequestUtils, RequestSessions
 from .json_utils import JsonUtils
 from .number_utils import NumberUtils
 from .path_utils import PathUtils
@@ -15,3 +15,4 @@ from .nfo_reader import NfoReader
 from .ip_utils import IpUtils
 from .image_utils import ImageUtils
 from .scheduler_utils import SchedulerUtils
+from .ac_automaton import AcAutomaton
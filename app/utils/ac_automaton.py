@@ -0,0 +1,71 @@
+from collections import deque
+
+
+class AcAutomaton:
+    """
+    Aho-Corasick多模式匹配，一次扫描文本即可找出所有出现的关键字
+    """
+    _goto = []
+    _fail = []
+    _output = []
+
+    def __init__(self, words=None):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [set()]
+        for word in words or []:
+            self.add_word(word)
+        self.build()
+
+    def add_word(self, word):
+        """
+        添加关键字，添加完成后需调用build
+        """
+        if not word:
+            return
+        state = 0
+        for char in word:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+            state = next_state
+        self._output[state].add(word)
+
+    def build(self):
+        """
+        构建失败指针
+        """
+        queue = deque()
+        for next_state in self._goto[0].values():
+            self._fail[next_state] = 0
+            queue.append(next_state)
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail_state = self._fail[state]
+                while fail_state and char not in self._goto[fail_state]:
+                    fail_state = self._fail[fail_state]
+                self._fail[next_state] = self._goto[fail_state].get(char, 0)
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+    def search(self, text):
+        """
+        查找文本中出现的所有关键字
+        :return: 出现的关键字集合
+        """
+        found = set()
+        if not text:
+            return found
+        state = 0
+        for char in text:
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            if self._output[state]:
+                found |= self._output[state]
+        return found
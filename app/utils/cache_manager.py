@@ -4,7 +4,8 @@ import time
 from cacheout import CacheManager, LRUCache, Cache
 
 CACHES = {
-    "tmdb_supply": {'maxsize': 200}
+    "tmdb_supply": {'maxsize': 200},
+    "rss_processed": {'maxsize': 20000}
 }
 
 cacheman = CacheManager(CACHES, cache_class=LRUCache)
@@ -16,3 +17,7 @@ ConfigLoadCache = Cache(maxsize=1, ttl=10, timer=time.time, default=None)
 CategoryLoadCache = Cache(maxsize=2, ttl=3, timer=time.time, default=None)
 
 OpenAISessionCache = Cache(maxsize=100, ttl=3600, timer=time.time, default=None)
+
+TorrentAttrCache = Cache(maxsize=1024, ttl=5*60, timer=time.time, default=None)
+
+TorrentMediaCache = Cache(maxsize=2000, ttl=24*3600, timer=time.time, default=None)
@@ -1,4 +1,11 @@
+import codecs
+import re
+from xml.etree import ElementTree
+
+
 class DomUtils:
+    # XML声明中的编码
+    _xml_encoding_re = re.compile(rb'^\s*<\?xml[^>]*?encoding\s*=\s*["\']([A-Za-z0-9._-]+)["\']')
 
     @staticmethod
     def tag_value(tag_item, tag_name, attname="", default=None):
@@ -28,3 +35,119 @@ class DomUtils:
             text = doc.createTextNode(str(value))
             node.appendChild(text)
         return node
+
+    @staticmethod
+    def local_name(tag):
+        """
+        去掉标签的命名空间或前缀，如{http://torznab.com/schemas/2015/feed}attr、torznab:attr均返回attr
+        """
+        if not tag:
+            return tag
+        return tag.rsplit("}", 1)[-1].rsplit(":", 1)[-1]
+
+    @staticmethod
+    def match_tag(tag, tag_name):
+        """
+        判断标签是否匹配，与minidom按名称查找的规则一致：
+        带前缀的名称（如torznab:attr）匹配该名称的任意命名空间标签，不带前缀的名称只匹配无命名空间的标签
+        """
+        if not tag or not isinstance(tag, str):
+            return False
+        if ":" in tag_name:
+            return tag.startswith("{") and DomUtils.local_name(tag) == DomUtils.local_name(tag_name)
+        return tag == tag_name
+
+    @staticmethod
+    def find_elems(elem, tag_name):
+        """
+        按标签名查找所有下级元素（不含自身）
+        """
+        return [child for child in elem.iter()
+                if child is not elem and DomUtils.match_tag(child.tag, tag_name)]
+
+    @staticmethod
+    def elem_value(elem, tag_name, attname="", default=None):
+        """
+        解析ElementTree元素的下级标签值，与tag_value的取值规则相同
+        """
+        for child in elem.iter():
+            if child is elem or not DomUtils.match_tag(child.tag, tag_name):
+                continue
+            if attname:
+                return child.get(attname) or default
+            return child.text if child.text else default
+        return default
+
+    @staticmethod
+    def iter_elements(chunks, tag_name="item", encoding=None):
+        """
+        流式解析XML，边读取边逐个返回指定标签的元素，元素返回后即释放，不保留整个文档
+        :param chunks: XML内容分块，bytes或str
+        :param tag_name: 需要返回的标签名
+        :param encoding: XML中未声明编码时使用的编码，默认utf-8
+        """
+        parser = ElementTree.XMLPullParser(events=("start-ns", "start", "end"))
+        # 默认命名空间，其中的标签与minidom一样按无前缀的名称匹配
+        default_ns = set()
+        decoder = None
+        # 确定编码前读取的开头内容
+        head = b""
+        # 当前元素的上级元素
+        parents = []
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if isinstance(chunk, bytes):
+                if not decoder:
+                    # 读取到XML声明结束后再确定编码
+                    head += chunk
+                    if b">" not in head and len(head) < 1024:
+                        continue
+                    chunk, head = head, b""
+                    match = DomUtils._xml_encoding_re.match(chunk)
+                    chunk_encoding = match.group(1).decode() if match else (encoding or "utf-8")
+                    try:
+                        codecs.lookup(chunk_encoding)
+                    except LookupError:
+                        chunk_encoding = "utf-8"
+                    if codecs.lookup(chunk_encoding).name == "utf-8":
+                        chunk_encoding = "utf-8-sig"
+                    decoder = codecs.getincrementaldecoder(chunk_encoding)(errors="replace")
+                chunk = decoder.decode(chunk)
+            parser.feed(chunk)
+            for elem in DomUtils.__read_elements(parser, parents, tag_name, default_ns):
+                yield elem
+        if head:
+            parser.feed(head.decode(encoding or "utf-8-sig", errors="replace"))
+        elif decoder:
+            parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+        for elem in DomUtils.__read_elements(parser, parents, tag_name, default_ns):
+            yield elem
+
+    @staticmethod
+    def __read_elements(parser, parents, tag_name, default_ns):
+        """
+        读取解析器中已完成的目标元素，返回后释放
+        """
+        for event, elem in parser.read_events():
+            if event == "start-ns":
+                prefix, uri = elem
+                if not prefix:
+                    default_ns.add(uri)
+                continue
+            if event == "start":
+                if elem.tag.startswith("{") and elem.tag[1:].split("}", 1)[0] in default_ns:
+                    elem.tag = DomUtils.local_name(elem.tag)
+                parents.append(elem)
+                continue
+            parents.pop()
+            if not DomUtils.match_tag(elem.tag, tag_name):
+                continue
+            # 嵌套的同名元素随外层元素一起返回
+            if any(DomUtils.match_tag(parent.tag, tag_name) for parent in parents):
+                continue
+            yield elem
+            elem.clear()
+            if parents:
+                parents[-1].remove(elem)
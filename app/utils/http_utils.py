@@ -1,10 +1,149 @@
+import threading
+from collections import OrderedDict
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlparse
+
 import requests
 import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 from urllib3.exceptions import InsecureRequestWarning
+from urllib3.util.retry import Retry
 from config import Config
 
 urllib3.disable_warnings(InsecureRequestWarning)
 
+lock = threading.Lock()
+
+
+class _SessionStats:
+    """
+    共享会话的请求数和新建连接数
+    """
+    _lock = threading.Lock()
+    requests = 0
+    connections = 0
+
+    @classmethod
+    def incr(cls, key):
+        with cls._lock:
+            setattr(cls, key, getattr(cls, key) + 1)
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+
+    def _new_conn(self):
+        _SessionStats.incr("connections")
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+
+    def _new_conn(self):
+        _SessionStats.incr("connections")
+        return super()._new_conn()
+
+
+class _PooledAdapter(HTTPAdapter):
+    """
+    统计新建连接数的连接池适配器
+    """
+    _pool_classes = {
+        "http": _CountingHTTPConnectionPool,
+        "https": _CountingHTTPSConnectionPool
+    }
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self._pool_classes
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        if not proxy.lower().startswith("socks"):
+            manager.pool_classes_by_scheme = self._pool_classes
+        return manager
+
+    def send(self, request, **kwargs):
+        _SessionStats.incr("requests")
+        return super().send(request, **kwargs)
+
+
+class RequestSessions:
+    """
+    进程内共享的HTTP会话，按协议、主机和代理复用连接，避免每次请求重新握手
+    """
+    # 每个会话缓存的主机连接池数，重定向到其它主机时使用
+    _pool_connections = 4
+    # 每个主机保持的最大空闲连接数
+    _pool_maxsize = 10
+    # 最多保留的会话数，超出时关闭最久未使用的会话
+    _max_sessions = 200
+    # 重试策略：连接失败和读取失败各重试一次，网关错误最多重试两次，按0.5秒起指数退避
+    _retries = Retry(total=2,
+                     connect=1,
+                     read=1,
+                     status=2,
+                     backoff_factor=0.5,
+                     status_forcelist=[502, 503, 504],
+                     raise_on_status=False)
+    _sessions = OrderedDict()
+
+    @classmethod
+    def get_session(cls, url, proxies=None):
+        """
+        获取URL对应的共享会话
+        :param url: 请求地址
+        :param proxies: 代理设置
+        """
+        parsed = urlparse(url)
+        key = (parsed.scheme, parsed.netloc, str(sorted(proxies.items())) if proxies else None)
+        with lock:
+            session = cls._sessions.get(key)
+            if session:
+                cls._sessions.move_to_end(key)
+                return session
+            session = cls._sessions[key] = cls.__new_session()
+            while len(cls._sessions) > cls._max_sessions:
+                _, expired = cls._sessions.popitem(last=False)
+                expired.close()
+        return session
+
+    @classmethod
+    def __new_session(cls):
+        session = requests.Session()
+        # 与单次请求一致，不在请求之间保留响应的Cookie
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = _PooledAdapter(pool_connections=cls._pool_connections,
+                                 pool_maxsize=cls._pool_maxsize,
+                                 max_retries=cls._retries)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    @classmethod
+    def get_stats(cls):
+        """
+        共享会话的连接复用统计
+        """
+        requests_num = _SessionStats.requests
+        connections_num = _SessionStats.connections
+        return {
+            "sessions": len(cls._sessions),
+            "requests": requests_num,
+            "connections": connections_num,
+            "reused": max(requests_num - connections_num, 0)
+        }
+
+    @classmethod
+    def clear(cls):
+        """
+        关闭所有共享会话
+        """
+        with lock:
+            for session in cls._sessions.values():
+                session.close()
+            cls._sessions.clear()
+
 
 class RequestUtils:
     _headers = None
@@ -55,69 +194,52 @@ class RequestUtils:
         if timeout:
             self._timeout = timeout
 
+    def __get_session(self, url):
+        """
+        未指定会话时使用按主机共享的会话
+        """
+        if self._session:
+            return self._session
+        return RequestSessions.get_session(url, self._proxies)
+
     def post(self, url, data=None, json=None):
         if json is None:
             json = {}
         try:
-            if self._session:
-                return self._session.post(url,
-                                          data=data,
-                                          verify=False,
-                                          headers=self._headers,
-                                          proxies=self._proxies,
-                                          timeout=self._timeout,
-                                          json=json)
-            else:
-                return requests.post(url,
-                                     data=data,
-                                     verify=False,
-                                     headers=self._headers,
-                                     proxies=self._proxies,
-                                     timeout=self._timeout,
-                                     json=json)
+            return self.__get_session(url).post(url,
+                                                data=data,
+                                                verify=False,
+                                                headers=self._headers,
+                                                proxies=self._proxies,
+                                                timeout=self._timeout,
+                                                json=json)
         except requests.exceptions.RequestException:
             return None
 
     def get(self, url, params=None):
         try:
-            if self._session:
-                r = self._session.get(url,
-                                      verify=False,
-                                      headers=self._headers,
-                                      proxies=self._proxies,
-                                      timeout=self._timeout,
-                                      params=params)
-            else:
-                r = requests.get(url,
-                                 verify=False,
-                                 headers=self._headers,
-                                 proxies=self._proxies,
-                                 timeout=self._timeout,
-                                 params=params)
+            r = self.__get_session(url).get(url,
+                                            verify=False,
+                                            headers=self._headers,
+                                            proxies=self._proxies,
+                                            timeout=self._timeout,
+                                            params=params)
             return str(r.content, 'utf-8')
         except requests.exceptions.RequestException:
             return None
 
-    def get_res(self, url, params=None, allow_redirects=True, raise_exception=False):
+    def get_res(self, url, params=None, allow_redirects=True, raise_exception=False, stream=False, headers=None):
+        req_headers = {**self._headers, **headers} if headers else self._headers
         try:
-            if self._session:
-                return self._session.get(url,
-                                         params=params,
-                                         verify=False,
-                                         headers=self._headers,
-                                         proxies=self._proxies,
-                                         cookies=self._cookies,
-                                         timeout=self._timeout,
-                                         allow_redirects=allow_redirects)
-            else:
-                return requests.get(url,
-                                    params=params,
-                                    verify=False,
-                                    headers=self._headers,
-                                    proxies=self._proxies,
-                                    cookies=self._cookies,
-                                    timeout=self._timeout,
-                                    allow_redirects=allow_redirects)
+            return self.__get_session(url).get(url,
+                                               params=params,
+                                               verify=False,
+                                               headers=req_headers,
+                                               proxies=self._proxies,
+                                               cookies=self._cookies,
+                                               timeout=self._timeout,
+                                               allow_redirects=allow_redirects,
+                                               stream=stream)
         except requests.exceptions.RequestException:
             if raise_exception:
                 raise requests.exceptions.RequestException
@@ -125,30 +247,17 @@ class RequestUtils:
 
     def post_res(self, url, data=None, params=None, allow_redirects=True, files=None, json=None):
         try:
-            if self._session:
-                return self._session.post(url,
-                                          data=data,
-                                          params=params,
-                                          verify=False,
-                                          headers=self._headers,
-                                          proxies=self._proxies,
-                                          cookies=self._cookies,
-                                          timeout=self._timeout,
-                                          allow_redirects=allow_redirects,
-                                          files=files,
-                                          json=json)
-            else:
-                return requests.post(url,
-                                     data=data,
-                                     params=params,
-                                     verify=False,
-                                     headers=self._headers,
-                                     proxies=self._proxies,
-                                     cookies=self._cookies,
-                                     timeout=self._timeout,
-                                     allow_redirects=allow_redirects,
-                                     files=files,
-                                     json=json)
+            return self.__get_session(url).post(url,
+                                                data=data,
+                                                params=params,
+                                                verify=False,
+                                                headers=self._headers,
+                                                proxies=self._proxies,
+                                                cookies=self._cookies,
+                                                timeout=self._timeout,
+                                                allow_redirects=allow_redirects,
+                                                files=files,
+                                                json=json)
         except requests.exceptions.RequestException:
             return None
 
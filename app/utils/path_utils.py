@@ -3,50 +3,119 @@ import os
 
 class PathUtils:
 
+    # 不处理的目录名
+    _invalid_dir_names = ["@Recycle", "#recycle"]
+
     @staticmethod
     def get_dir_files(in_path, exts="", filesize=0, episode_format=None):
         """
         获得目录下的媒体文件列表List ，按后缀、大小、格式过滤
         """
-        if not in_path:
-            return []
-        if not os.path.exists(in_path):
-            return []
-        ret_list = []
-        if os.path.isdir(in_path):
-            for root, dirs, files in os.walk(in_path):
-                for file in files:
-                    cur_path = os.path.join(root, file)
-                    # 检查路径是否合法
-                    if PathUtils.is_invalid_path(cur_path):
-                        continue
-                    # 检查格式匹配
-                    if episode_format and not episode_format.match(file):
-                        continue
-                    # 检查后缀
-                    if exts and os.path.splitext(file)[-1].lower() not in exts:
-                        continue
-                    # 检查文件大小
-                    if filesize and os.path.getsize(cur_path) < filesize:
-                        continue
-                    # 命中
-                    if cur_path not in ret_list:
-                        ret_list.append(cur_path)
-        else:
+        return list(PathUtils.iter_dir_files(in_path=in_path,
+                                             exts=exts,
+                                             filesize=filesize,
+                                             episode_format=episode_format))
+
+    @staticmethod
+    def has_dir_files(in_path, exts="", filesize=0, episode_format=None):
+        """
+        目录下是否存在符合条件的文件，找到第一个即返回
+        """
+        return next(PathUtils.iter_dir_files(in_path=in_path,
+                                             exts=exts,
+                                             filesize=filesize,
+                                             episode_format=episode_format), None) is not None
+
+    @staticmethod
+    def iter_dir_files(in_path, exts="", filesize=0, episode_format=None, exclude_paths=None, with_stat=False):
+        """
+        逐个返回目录下按后缀、大小、格式过滤后的文件，使用scandir遍历，不合法的目录整个跳过
+        :param in_path: 目录或文件路径
+        :param exts: 后缀列表
+        :param filesize: 文件大小下限
+        :param episode_format: 集数格式
+        :param exclude_paths: 排除的目录列表
+        :param with_stat: 为True时返回(路径, stat结果)
+        """
+        if not in_path or not os.path.exists(in_path):
+            return
+        if not os.path.isdir(in_path):
             # 检查路径是否合法
             if PathUtils.is_invalid_path(in_path):
-                return []
-            # 检查后缀
-            if exts and os.path.splitext(in_path)[-1].lower() not in exts:
-                return []
-            # 检查格式
-            if episode_format and not episode_format.match(os.path.basename(in_path)):
-                return []
+                return
+            file_name = os.path.basename(in_path)
+            if not PathUtils.__match_file_name(file_name, exts, episode_format):
+                return
+            stat = os.stat(in_path) if filesize or with_stat else None
             # 检查文件大小
-            if filesize and os.path.getsize(in_path) < filesize:
-                return []
-            ret_list.append(in_path)
-        return ret_list
+            if filesize and stat.st_size < filesize:
+                return
+            yield (in_path, stat) if with_stat else in_path
+            return
+        # 目录本身不合法时，其下所有文件均不合法
+        if PathUtils.is_invalid_path(os.path.join(in_path, "")):
+            return
+        exclude_paths = [os.path.abspath(path) for path in exclude_paths or [] if path]
+        # 与os.walk相同的顺序：先返回当前目录的文件，再按顺序进入子目录
+        stack = [in_path]
+        while stack:
+            cur_dir = stack.pop()
+            if exclude_paths and any(os.path.abspath(cur_dir).startswith(path) for path in exclude_paths):
+                continue
+            sub_dirs = []
+            try:
+                with os.scandir(cur_dir) as entries:
+                    for entry in entries:
+                        try:
+                            is_dir = entry.is_dir()
+                        except OSError:
+                            continue
+                        if is_dir:
+                            # 不进入软链接目录及不合法的目录
+                            if not entry.is_symlink() and not PathUtils.__is_invalid_name(entry.name, True):
+                                sub_dirs.append(entry.path)
+                            continue
+                        # 检查路径是否合法
+                        if PathUtils.__is_invalid_name(entry.name, False):
+                            continue
+                        if not PathUtils.__match_file_name(entry.name, exts, episode_format):
+                            continue
+                        if filesize or with_stat:
+                            try:
+                                stat = entry.stat()
+                            except OSError:
+                                continue
+                            # 检查文件大小
+                            if filesize and stat.st_size < filesize:
+                                continue
+                            yield (entry.path, stat) if with_stat else entry.path
+                        else:
+                            yield entry.path
+            except OSError:
+                continue
+            stack.extend(reversed(sub_dirs))
+
+    @staticmethod
+    def __match_file_name(file_name, exts, episode_format):
+        """
+        检查文件名的格式和后缀
+        """
+        # 检查格式匹配
+        if episode_format and not episode_format.match(file_name):
+            return False
+        # 检查后缀
+        if exts and os.path.splitext(file_name)[-1].lower() not in exts:
+            return False
+        return True
+
+    @staticmethod
+    def __is_invalid_name(name, is_dir):
+        """
+        按文件或目录名判断是否不能处理，与is_invalid_path的规则一致
+        """
+        if name.startswith(".") or name.startswith("@eaDir"):
+            return True
+        return is_dir and name in PathUtils._invalid_dir_names
 
     @staticmethod
     def get_dir_level1_files(in_path, exts=""):
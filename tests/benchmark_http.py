@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP请求性能基准，在本地HTTP服务上对比每次新建连接与共享会话复用连接的耗时
+用法：python -m tests.benchmark_http [请求数] [并发数]
+"""
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from app.utils import RequestUtils, RequestSessions
+
+# 响应内容大小
+BODY_SIZE = 16 * 1024
+# 模拟握手耗时，每个新连接的首个请求延迟返回（秒）
+HANDSHAKE_DELAY = 0.005
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    支持长连接的本地HTTP服务
+    """
+    protocol_version = "HTTP/1.1"
+    # 响应头和内容分两次写出，不关闭Nagle时长连接上会等待对方的延迟确认
+    disable_nagle_algorithm = True
+    body = b"x" * BODY_SIZE
+
+    def setup(self):
+        super().setup()
+        time.sleep(HANDSHAKE_DELAY)
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def fetch_plain(url):
+    """
+    原实现：每次请求新建会话和连接
+    """
+    return requests.get(url, verify=False, timeout=20).content
+
+
+def fetch_shared(url):
+    """
+    RequestUtils：使用按主机共享的会话
+    """
+    return RequestUtils().get_res(url).content
+
+
+def run_case(name, func, url, count, workers):
+    begin = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        sizes = list(executor.map(lambda _: len(func(url)), range(count)))
+    elapsed = time.perf_counter() - begin
+    assert all(size == BODY_SIZE for size in sizes)
+    print("%-12s workers=%-3s %6s requests %8.3fs %8.1f req/s" % (name, workers, count, elapsed, count / elapsed))
+
+
+def run_benchmark(count, workers):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:%s/rss" % server.server_address[1]
+    try:
+        for n in sorted({1, workers}):
+            run_case("requests.get", fetch_plain, url, count, n)
+            RequestSessions.clear()
+            run_case("RequestUtils", fetch_shared, url, count, n)
+        print("session stats: %s" % RequestSessions.get_stats())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+                  int(sys.argv[2]) if len(sys.argv) > 2 else 8)
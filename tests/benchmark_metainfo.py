@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+名称识别性能基准，使用tests/cases/meta_cases.py中的用例，输出每秒识别的标题数
+用法：python -m tests.benchmark_metainfo [轮数]
+"""
+import sys
+import time
+
+from app.media import meta
+from app.media.meta import MetaInfo
+from app.media.meta.metavideo import MetaVideo
+from tests.cases.meta_cases import meta_cases
+
+
+def run_benchmark(rounds=50, clear_cache=False):
+    """
+    重复识别所有用例，返回每秒识别的标题数
+    :param rounds: 重复轮数
+    :param clear_cache: 每轮开始前是否清空token识别缓存和识别结果缓存
+    """
+    cases = [(info.get("title"), info.get("subtitle")) for info in meta_cases if info.get("title")]
+    elapsed = 0
+    for _ in range(rounds):
+        if clear_cache and hasattr(MetaVideo, "classify_token"):
+            MetaVideo.classify_token.cache_clear()
+        if clear_cache and hasattr(meta, "clear_metainfo_cache"):
+            meta.clear_metainfo_cache()
+        begin = time.perf_counter()
+        for title, subtitle in cases:
+            MetaInfo(title=title, subtitle=subtitle)
+        elapsed += time.perf_counter() - begin
+    return len(cases) * rounds / elapsed
+
+
+if __name__ == '__main__':
+    bench_rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    print("cold: %.1f titles/sec" % run_benchmark(rounds=bench_rounds, clear_cache=True))
+    print("warm: %.1f titles/sec" % run_benchmark(rounds=bench_rounds))
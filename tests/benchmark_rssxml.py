@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+torznab/RSS XML解析性能基准，对比minidom整体解析与流式解析的峰值内存和每秒解析的种子数
+用法：python -m tests.benchmark_rssxml [种子数]
+"""
+import resource
+import subprocess
+import sys
+import time
+import xml.dom.minidom
+
+from app.utils import DomUtils
+
+TORZNAB_HEAD = '<?xml version="1.0" encoding="UTF-8"?>\n' \
+               '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" ' \
+               'xmlns:torznab="http://torznab.com/schemas/2015/feed">\n' \
+               '<channel><title>Prowlarr</title><description>Prowlarr Feed</description>\n'
+TORZNAB_ITEM = '<item><title>The.Show.S01E%(ep)02d.2023.1080p.WEB-DL.H264.AAC-GROUP%(i)s</title>' \
+               '<guid>https://example.org/details/%(i)s</guid>' \
+               '<prowlarrindexer id="%(indexer)s">Site %(indexer)s</prowlarrindexer>' \
+               '<comments>https://example.org/details/%(i)s</comments>' \
+               '<pubDate>Mon, 16 Oct 2023 10:00:00 +0800</pubDate>' \
+               '<size>%(size)s</size>' \
+               '<description>第%(ep)s集 官方中字 %(i)s</description>' \
+               '<link>https://example.org/download/%(i)s</link>' \
+               '<category>5000</category>' \
+               '<enclosure url="https://example.org/download/%(i)s" length="%(size)s" ' \
+               'type="application/x-bittorrent" />' \
+               '<torznab:attr name="category" value="5000" />' \
+               '<torznab:attr name="seeders" value="%(seeders)s" />' \
+               '<torznab:attr name="peers" value="%(peers)s" />' \
+               '<torznab:attr name="downloadvolumefactor" value="%(dl)s" />' \
+               '<torznab:attr name="uploadvolumefactor" value="1" />' \
+               '<torznab:attr name="imdbid" value="tt%(imdb)07d" /></item>\n'
+TORZNAB_TAIL = '</channel></rss>\n'
+
+
+def build_feed(count):
+    """
+    构造包含count个种子的torznab响应
+    """
+    items = [TORZNAB_ITEM % {"i": i,
+                             "ep": i % 24 + 1,
+                             "indexer": i % 7,
+                             "size": 1024 * 1024 * (1000 + i),
+                             "seeders": i % 50,
+                             "peers": i % 13,
+                             "dl": 0 if i % 5 == 0 else 1,
+                             "imdb": i} for i in range(count)]
+    return (TORZNAB_HEAD + "".join(items) + TORZNAB_TAIL).encode("utf-8")
+
+
+def iter_chunks(content, size=64 * 1024):
+    """
+    模拟网络响应分块
+    """
+    for pos in range(0, len(content), size):
+        yield content[pos:pos + size]
+
+
+def parse_minidom(chunks):
+    """
+    原实现：读取全部内容后整体解析
+    """
+    dom_tree = xml.dom.minidom.parseString(b"".join(chunks).decode("utf-8"))
+    count = 0
+    for item in dom_tree.documentElement.getElementsByTagName("item"):
+        DomUtils.tag_value(item, "title", default="")
+        DomUtils.tag_value(item, "enclosure", "url", default="")
+        DomUtils.tag_value(item, "size", default=0)
+        for attr in item.getElementsByTagName("torznab:attr"):
+            attr.getAttribute("name"), attr.getAttribute("value")
+        count += 1
+    return count
+
+
+def parse_stream(chunks):
+    """
+    流式解析
+    """
+    count = 0
+    for item in DomUtils.iter_elements(chunks=chunks, tag_name="item"):
+        DomUtils.elem_value(item, "title", default="")
+        DomUtils.elem_value(item, "enclosure", "url", default="")
+        DomUtils.elem_value(item, "size", default=0)
+        for attr in DomUtils.find_elems(item, "torznab:attr"):
+            attr.get("name"), attr.get("value")
+        count += 1
+    return count
+
+
+def run_child(mode, count):
+    """
+    在子进程中解析，输出每秒解析数和进程峰值内存增量
+    """
+    content = build_feed(count)
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    parser = parse_minidom if mode == "minidom" else parse_stream
+    begin = time.perf_counter()
+    parsed = parser(iter_chunks(content))
+    elapsed = time.perf_counter() - begin
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base_rss
+    print("%s: %s items, %.1f items/sec, peak RSS +%.1f MB, feed %.1f MB"
+          % (mode, parsed, parsed / elapsed, peak_rss / 1024, len(content) / 1024 / 1024))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] in ["minidom", "stream"]:
+        run_child(sys.argv[1], int(sys.argv[2]))
+    else:
+        bench_count = sys.argv[1] if len(sys.argv) > 1 else "5000"
+        for bench_mode in ["minidom", "stream"]:
+            subprocess.run([sys.executable, "-m", "tests.benchmark_rssxml", bench_mode, bench_count])
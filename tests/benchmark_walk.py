@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+目录遍历性能基准，在合成的媒体库目录上对比os.walk与scandir遍历的耗时
+用法：python -m tests.benchmark_walk [文件数]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from app.utils import PathUtils
+from config import RMT_MEDIAEXT
+
+# 每季的媒体文件数和其它文件数
+EPISODES_PER_SEASON = 20
+EXTRAS_PER_SEASON = 5
+SEASONS_PER_SHOW = 4
+# 参与比较的最小文件大小
+MIN_FILESIZE = 100 * 1024 * 1024
+# 原实现按列表去重，文件数超过该值时耗时过长不再运行
+LEGACY_MAX_FILES = 50000
+
+
+def build_tree(root, count):
+    """
+    构造媒体库目录：剧集/季/文件，每部剧带一个群晖缩略图目录，媒体文件为稀疏文件
+    """
+    files_per_show = SEASONS_PER_SHOW * (EPISODES_PER_SEASON + EXTRAS_PER_SEASON)
+    created = 0
+    show = 0
+    while created < count:
+        show_path = os.path.join(root, "Show %05d (2023)" % show)
+        for season in range(1, SEASONS_PER_SHOW + 1):
+            season_path = os.path.join(show_path, "Season %s" % season)
+            os.makedirs(season_path)
+            for episode in range(1, EPISODES_PER_SEASON + 1):
+                file_path = os.path.join(season_path, "Show %05d - S%02dE%02d - 第 %s 集.mkv"
+                                         % (show, season, episode, episode))
+                with open(file_path, "wb") as f:
+                    f.truncate(MIN_FILESIZE * 2 if episode % 4 else 1024)
+            for extra in range(EXTRAS_PER_SEASON):
+                open(os.path.join(season_path, "extra-%s.nfo" % extra), "wb").close()
+        ea_path = os.path.join(show_path, "@eaDir")
+        os.makedirs(ea_path)
+        for thumb in range(10):
+            open(os.path.join(ea_path, "thumb-%s.jpg" % thumb), "wb").close()
+        created += files_per_show
+        show += 1
+    return created
+
+
+def walk_legacy(in_path, exts, filesize):
+    """
+    原实现：os.walk遍历，逐个getsize，按列表去重
+    """
+    ret_list = []
+    for root, dirs, files in os.walk(in_path):
+        for file in files:
+            cur_path = os.path.join(root, file)
+            if PathUtils.is_invalid_path(cur_path):
+                continue
+            if exts and os.path.splitext(file)[-1].lower() not in exts:
+                continue
+            if filesize and os.path.getsize(cur_path) < filesize:
+                continue
+            if cur_path not in ret_list:
+                ret_list.append(cur_path)
+    return ret_list
+
+
+def walk_legacy_set(in_path, exts, filesize):
+    """
+    os.walk遍历，按集合去重
+    """
+    ret_list = []
+    ret_set = set()
+    for root, dirs, files in os.walk(in_path):
+        for file in files:
+            cur_path = os.path.join(root, file)
+            if PathUtils.is_invalid_path(cur_path):
+                continue
+            if exts and os.path.splitext(file)[-1].lower() not in exts:
+                continue
+            if filesize and os.path.getsize(cur_path) < filesize:
+                continue
+            if cur_path not in ret_set:
+                ret_set.add(cur_path)
+                ret_list.append(cur_path)
+    return ret_list
+
+
+def walk_scandir(in_path, exts, filesize):
+    """
+    scandir遍历
+    """
+    return PathUtils.get_dir_files(in_path=in_path, exts=exts, filesize=filesize)
+
+
+def first_scandir(in_path, exts, filesize):
+    """
+    scandir流式遍历，取到第一个文件的耗时
+    """
+    return [next(PathUtils.iter_dir_files(in_path=in_path, exts=exts, filesize=filesize))]
+
+
+def run_benchmark(count):
+    root = tempfile.mkdtemp(prefix="benchmark_walk_")
+    try:
+        begin = time.perf_counter()
+        created = build_tree(root, count)
+        print("tree: %s files, built in %.1fs" % (created, time.perf_counter() - begin))
+        cases = [("os.walk + list", walk_legacy),
+                 ("os.walk + set", walk_legacy_set),
+                 ("scandir", walk_scandir),
+                 ("scandir first", first_scandir)]
+        for exts, filesize in [(RMT_MEDIAEXT, 0), (RMT_MEDIAEXT, MIN_FILESIZE)]:
+            for name, func in cases:
+                if func is walk_legacy and created > LEGACY_MAX_FILES:
+                    print("%-16s filesize=%-9s skipped (O(n^2), > %s files)" % (name, filesize, LEGACY_MAX_FILES))
+                    continue
+                begin = time.perf_counter()
+                files = func(root, exts, filesize)
+                elapsed = time.perf_counter() - begin
+                print("%-16s filesize=%-9s %7s files %8.3fs" % (name, filesize, len(files), elapsed))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+自定义识别词性能基准，500个识别词处理10000个标题，输出每秒处理的标题数
+用法：python -m tests.benchmark_words [识别词数] [标题数]
+"""
+import random
+import string
+import sys
+import time
+from types import SimpleNamespace
+
+from app.helper import WordsHelper
+from tests.cases.meta_cases import meta_cases
+
+
+def build_words(count):
+    """
+    构造识别词：普通屏蔽/替换词为主，少量正则替换词和集偏移词
+    """
+    rand = random.Random(0)
+    words = []
+    for wid in range(count):
+        word = "".join(rand.choice(string.ascii_letters) for _ in range(rand.randint(4, 8)))
+        wtype = rand.choice([1, 2, 2, 2, 3, 4])
+        regex = 1 if wtype in [3, 4] or rand.random() < 0.2 else 0
+        replaced = r"%s\d*" % word if regex and rand.random() < 0.5 else word
+        words.append(SimpleNamespace(ID=wid,
+                                     TYPE=wtype,
+                                     REPLACED=replaced,
+                                     REPLACE=word.upper(),
+                                     FRONT="%s第" % word if wtype in [3, 4] else "",
+                                     BACK="集" if wtype in [3, 4] else "",
+                                     OFFSET="EP+1",
+                                     REGEX=regex,
+                                     NOTE=word))
+    return words
+
+
+def build_titles(count, words):
+    """
+    以测试用例为基础构造标题，部分标题中插入识别词
+    """
+    rand = random.Random(1)
+    cases = [info.get("title") for info in meta_cases if info.get("title")]
+    titles = []
+    for i in range(count):
+        title = cases[i % len(cases)]
+        if rand.random() < 0.1:
+            word = rand.choice(words)
+            title = "%s %s第12集" % (title, word.NOTE)
+        titles.append(title)
+    return titles
+
+
+def run_benchmark(word_count=500, title_count=10000):
+    words = build_words(word_count)
+    titles = build_titles(title_count, words)
+    helper = WordsHelper()
+    if hasattr(helper, "update_words"):
+        helper.update_words(words)
+    else:
+        helper.words_info = words
+    begin = time.perf_counter()
+    for title in titles:
+        helper.process(title)
+    return title_count / (time.perf_counter() - begin)
+
+
+if __name__ == '__main__':
+    bench_words = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    bench_titles = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    print("%s words x %s titles: %.1f titles/sec"
+          % (bench_words, bench_titles, run_benchmark(bench_words, bench_titles)))
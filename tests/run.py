@@ -1,11 +1,22 @@
 import unittest
 
+from tests.test_db_index import DbIndexTest
+from tests.test_dom_utils import DomUtilsTest
+from tests.test_meta_helper import MetaHelperTest
 from tests.test_metainfo import MetaInfoTest
 
 if __name__ == '__main__':
     suite = unittest.TestSuite()
     # 测试名称识别
     suite.addTest(MetaInfoTest('test_metainfo'))
+    # 测试数据库查询索引
+    suite.addTest(DbIndexTest('test_dbhelper_index'))
+    suite.addTest(DbIndexTest('test_rsshelper_index'))
+    # 测试XML流式解析
+    suite.addTest(DomUtilsTest('test_mixed_namespace'))
+    suite.addTest(DomUtilsTest('test_default_namespace'))
+    # 测试识别缓存续期
+    suite.addTest(MetaHelperTest('test_touch_expire'))
 
     # 运行测试
     runner = unittest.TextTestRunner()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import re
+from unittest import TestCase, mock
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.models import Base
+from app.helper import DbHelper, RssHelper
+
+# 高频查询方法及参数
+HOT_QUERIES = [
+    ("is_transfer_history_exists", dict(source_path="/src", source_filename="a.mkv",
+                                        dest_path="/dst", dest_filename="a.mkv")),
+    ("is_transfer_history_exists_by_source_full_path", dict(source_full_path="/src/a.mkv")),
+    ("get_transfer_history_exists_by_source_full_path", dict(path="/src", filename="a.mkv")),
+    ("get_transfer_info_by", dict(tmdbid=1)),
+    ("get_transfer_info_by", dict(tmdbid=1, season_episode="S01E01")),
+    ("get_transfer_history", dict(search=None, page=1, rownum=30)),
+    ("get_transfer_statistics", dict(days=30)),
+    ("is_transfer_unknown_exists", dict(path="/src/a.mkv")),
+    ("is_transfer_in_blacklist", dict(path="/src/a.mkv")),
+    ("is_sync_in_history", dict(path="/src/a.mkv", dest="/dst")),
+    ("is_exists_download_history", dict(enclosure="https://site/dl/1", downloader=None, download_id=None)),
+    ("is_exists_download_history", dict(enclosure=None, downloader="1", download_id="hash")),
+    ("get_download_history_by_path", dict(path="/downloads/a")),
+    ("get_download_history_by_downloader", dict(downloader="1", download_id="hash")),
+    ("get_download_history_by_downloader_ids", dict(downloader="1", download_ids=["hash1", "hash2"])),
+    ("get_brushtask_torrents", dict(brush_id=1)),
+    ("get_brushtask_torrent_by_enclosure", dict(enclosure="https://site/dl/1")),
+    ("get_brushtask_torrent_enclosures", dict(enclosures=["https://site/dl/1", "https://site/dl/2"])),
+    ("is_brushtask_torrent_exists", dict(brush_id=1, title="a", enclosure="https://site/dl/1")),
+    ("delete_brushtask_torrent", dict(brush_id=1, download_id="hash")),
+    ("is_exists_rss_history", dict(tmdbid="1")),
+    ("check_rss_history", dict(type_str="MOV", name="a", year="2023", season=None)),
+    ("get_rss_movie_id", dict(title="a", tmdbid="1")),
+    ("get_rss_tv_id", dict(title="a", season="S01", tmdbid="1")),
+]
+
+# RSS已处理记录查询
+HOT_RSS_QUERIES = [
+    ("get_rssd_enclosures", dict(enclosures=["https://site/dl/index-test"])),
+    ("get_rssd_names", dict(torrent_names=["index-test"])),
+    ("get_feed_state", dict(url="https://site/rss", context="ctx")),
+    ("update_feed_state", dict(url="https://site/rss", context="ctx", etag=None, last_modified=None,
+                               content_hash="hash", items=["https://site/dl/1"])),
+    ("reset_feed_state", dict(url="https://site/rss", context="ctx")),
+    ("reset_feed_state", dict(url="https://site/rss")),
+]
+
+
+class DbIndexTest(TestCase):
+    """
+    检查高频查询的执行计划，确保不会全表扫描
+    """
+
+    def setUp(self) -> None:
+        self.engine = create_engine("sqlite://",
+                                    connect_args={"check_same_thread": False},
+                                    poolclass=StaticPool)
+        Base.metadata.create_all(self.engine)
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self.__capture)
+        session = scoped_session(sessionmaker(bind=self.engine, autoflush=True, autocommit=False))
+        self.patcher = mock.patch("app.db.main_db._Session", session)
+        self.patcher.start()
+        RssHelper._rssd_cache_warmed = True
+
+    def tearDown(self) -> None:
+        self.patcher.stop()
+        RssHelper._rssd_cache_warmed = False
+        event.remove(self.engine, "before_cursor_execute", self.__capture)
+        self.engine.dispose()
+
+    def __capture(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            self.statements.append((statement, parameters))
+
+    def __full_scans(self, statement, parameters):
+        """
+        返回执行计划中未使用索引的表扫描
+        """
+        tables = "|".join(Base.metadata.tables.keys())
+        scans = []
+        with self.engine.connect() as conn:
+            for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters):
+                detail = row[-1]
+                if re.match(rf"^SCAN (TABLE )?({tables})\b", detail) and "USING" not in detail:
+                    scans.append(detail)
+        return scans
+
+    def __check(self, helper, queries):
+        for method, kwargs in queries:
+            self.statements = []
+            getattr(helper, method)(**kwargs)
+            self.assertTrue(self.statements, f"{method} 未执行查询")
+            for statement, parameters in self.statements:
+                scans = self.__full_scans(statement, parameters)
+                self.assertFalse(scans, f"{method} 未使用索引：{scans}\n{statement}")
+
+    def test_dbhelper_index(self):
+        self.__check(DbHelper(), HOT_QUERIES)
+
+    def test_rsshelper_index(self):
+        self.__check(RssHelper(), HOT_RSS_QUERIES)
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+from xml.dom import minidom
+
+from app.utils import DomUtils
+
+# 同一条目中包含同名的命名空间标签
+MIXED_NS_RSS = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:media="http://search.yahoo.com/mrss/" xmlns:atom="http://www.w3.org/2005/Atom"
+     xmlns:torznab="http://torznab.com/schemas/2015/feed">
+  <channel>
+    <item>
+      <media:title>MT</media:title>
+      <title>中文标题</title>
+      <atom:link href="http://atom"/>
+      <link>http://l</link>
+      <enclosure url="http://e" length="100"/>
+      <torznab:attr name="seeders" value="5"/>
+    </item>
+  </channel>
+</rss>"""
+
+# 默认命名空间（RSS 1.0）
+DEFAULT_NS_RSS = """<?xml version="1.0" encoding="UTF-8"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns="http://purl.org/rss/1.0/">
+  <item>
+    <title>Default NS</title>
+    <link>http://d</link>
+  </item>
+</rdf:RDF>"""
+
+
+class DomUtilsTest(TestCase):
+    """
+    流式解析与minidom的取值结果一致
+    """
+
+    @staticmethod
+    def __parse(xml):
+        items = []
+        for item in DomUtils.iter_elements(chunks=[xml.encode("utf-8")], tag_name="item"):
+            items.append({
+                "title": DomUtils.elem_value(item, "title"),
+                "link": DomUtils.elem_value(item, "link"),
+                "enclosure": DomUtils.elem_value(item, "enclosure", "url"),
+                "attrs": [attr.get("name") for attr in DomUtils.find_elems(item, "torznab:attr")]
+            })
+        return items
+
+    @staticmethod
+    def __parse_minidom(xml):
+        items = []
+        for item in minidom.parseString(xml.encode("utf-8")).getElementsByTagName("item"):
+            items.append({
+                "title": DomUtils.tag_value(item, "title"),
+                "link": DomUtils.tag_value(item, "link"),
+                "enclosure": DomUtils.tag_value(item, "enclosure", "url"),
+                "attrs": [attr.getAttribute("name") for attr in item.getElementsByTagName("torznab:attr")]
+            })
+        return items
+
+    def test_mixed_namespace(self):
+        items = self.__parse(MIXED_NS_RSS)
+        self.assertEqual(items, [{"title": "中文标题",
+                                  "link": "http://l",
+                                  "enclosure": "http://e",
+                                  "attrs": ["seeders"]}])
+        self.assertEqual(items, self.__parse_minidom(MIXED_NS_RSS))
+
+    def test_default_namespace(self):
+        items = self.__parse(DEFAULT_NS_RSS)
+        self.assertEqual(items[0]["title"], "Default NS")
+        self.assertEqual(items, self.__parse_minidom(DEFAULT_NS_RSS))
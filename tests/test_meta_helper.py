@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import time
+from unittest import TestCase, mock
+
+from app.helper import MetaHelper
+from app.helper.meta_helper import EXPIRE_TIMESTAMP, CACHE_EXPIRE_TIMESTAMP_STR
+
+
+class MetaHelperTest(TestCase):
+    """
+    TMDB识别缓存续期
+    """
+
+    def setUp(self) -> None:
+        self.helper = MetaHelper()
+        self.helper.save_meta_data(force=True)
+        self.origin = (self.helper._db, self.helper._tmdb_cache_expire)
+        self.helper._db = self.helper._MetaHelper__open_db(":memory:")
+        self.helper._tmdb_cache_expire = True
+
+    def tearDown(self) -> None:
+        self.helper._db.close()
+        self.helper._db, self.helper._tmdb_cache_expire = self.origin
+
+    def test_touch_expire(self):
+        key = "[电影]测试-2020"
+        now = int(time.time())
+        with mock.patch("time.time", return_value=now):
+            self.helper.update_meta_data({key: {"id": 1, "title": "测试", "year": "2020"}})
+            self.helper.save_meta_data(force=True)
+        # 每天使用一次，超过首次写入的有效期后仍然有效
+        for day in range(1, EXPIRE_TIMESTAMP // (24 * 3600) + 3):
+            with mock.patch("time.time", return_value=now + day * 24 * 3600):
+                info = self.helper.get_meta_data_by_key(key)
+                self.assertEqual(info.get("id"), 1, f"第 {day} 天缓存已失效")
+                self.helper.save_meta_data(force=True)
+        with mock.patch("time.time", return_value=now + day * 24 * 3600 + 1):
+            info = self.helper.get_meta_data_by_key(key)
+        self.assertGreater(info.get(CACHE_EXPIRE_TIMESTAMP_STR), now + EXPIRE_TIMESTAMP)
@@ -40,7 +40,7 @@ from app.sites import Sites, SiteUserInfo, SiteCookie, SiteConf
 from app.subscribe import Subscribe
 from app.sync import Sync
 from app.torrentremover import TorrentRemover
-from app.utils import StringUtils, EpisodeFormat, RequestUtils, PathUtils, \
+from app.utils import StringUtils, EpisodeFormat, RequestUtils, RequestSessions, PathUtils, \
     SystemUtils, ExceptionUtils, Torrent
 from app.utils.types import RmtMode, OsType, SearchType, SyncType, MediaType, MovieTypes, TvTypes, \
     EventType, SystemConfigKey, RssType
@@ -480,6 +480,8 @@ class WebAction:
             "get_plugin_page": self.get_plugin_page,
             "get_plugin_state": self.get_plugin_state,
             "get_plugins_conf": self.get_plugins_conf,
+            "get_plugin_event_metrics": self.get_plugin_event_metrics,
+            "get_http_session_stats": self.get_http_session_stats,
             "update_category_config": self.update_category_config,
             "get_category_config": self.get_category_config,
             "get_system_processes": self.get_system_processes,
@@ -1268,7 +1270,7 @@ class WebAction:
                                                 e)
                                 rm_parent_dir = True
                             if rm_parent_dir \
-                                    and not PathUtils.get_dir_files(os.path.dirname(dest_path), exts=RMT_MEDIAEXT):
+                                    and not PathUtils.has_dir_files(os.path.dirname(dest_path), exts=RMT_MEDIAEXT):
                                 # 没有媒体文件时，删除整个目录
                                 try:
                                     shutil.rmtree(os.path.dirname(dest_path))
@@ -2754,7 +2756,6 @@ class WebAction:
         """
         try:
             MetaHelper().clear_meta_data()
-            os.remove(MetaHelper().get_meta_data_path())
         except Exception as e:
             ExceptionUtils.exception_traceback(e)
             return {"code": 0, "msg": str(e)}
@@ -2782,7 +2783,7 @@ class WebAction:
         """
         detail = ProgressHelper().get_process(data.get("type"))
         if detail:
-            return {"code": 0, "value": detail.get("value"), "text": detail.get("text")}
+            return {"code": 0, "value": detail.get("value"), "text": detail.get("text"), "data": detail.get("data")}
         else:
             return {"code": 1, "value": 0, "text": "正在处理..."}
 
@@ -3931,7 +3932,6 @@ class WebAction:
             torrents = Downloader().get_downloading_progress()
         elif type == 'completed':
             torrents = Downloader().get_completed_progress()
-        MediaHander = Media()
         group = {}
         history = DbHelper().get_download_history(hash=list(map(lambda x: x.get("id"), torrents)))
         history = {x.DOWNLOAD_ID: x for x in history}
@@ -3946,18 +3946,13 @@ class WebAction:
                     name = h.TITLE
                 poster_path = h.POSTER
             else:
-                media_info = MediaHander.get_media_info(title=name)
-                if not media_info:
+                # 没有下载记录的在后台识别，识别完成前按种子名称显示
+                media_info = WebUtils.get_torrent_media_info(torrent_id=torrent.get("id"), name=name)
+                if media_info == {}:
                     continue
-                if not media_info.tmdb_info:
-                    year = media_info.year
-                    if year:
-                        name = "%s (%s)" % (media_info.get_name(), year)
-                    else:
-                        name = "%s" % (media_info.get_name())
-                else:
-                    name = "%s" % (media_info.get_title_string())
-                poster_path = media_info.get_poster_image()
+                if media_info:
+                    name = media_info.get("group_name")
+                    poster_path = media_info.get("poster")
             item = group.get(name, {})
             item['image'] = poster_path
             added_on = item.get('added_on')
@@ -3974,33 +3969,35 @@ class WebAction:
         """
         查询正在下载的任务
         """
-        MediaHander = Media()
         DownloaderHandler = Downloader()
         torrents = DownloaderHandler.get_downloading_progress()
+        # 批量查询下载记录
+        download_infos = DownloaderHandler.get_download_history_by_downloader_ids(
+            downloader=DownloaderHandler.default_downloader_id,
+            download_ids=[torrent.get("id") for torrent in torrents]
+        )
         for torrent in torrents:
             # 先查询下载记录，没有再识别
             name = torrent.get("name")
-            download_info = DownloaderHandler.get_download_history_by_downloader(
-                downloader=DownloaderHandler.default_downloader_id,
-                download_id=torrent.get("id")
-            )
+            download_info = download_infos.get(torrent.get("id"))
             if download_info:
                 name = download_info.TITLE
                 year = download_info.YEAR
                 poster_path = download_info.POSTER
                 se = download_info.SE
             else:
-                media_info = MediaHander.get_media_info(title=name)
+                # 在后台识别，识别完成前按种子名称显示
+                media_info = WebUtils.get_torrent_media_info(torrent_id=torrent.get("id"), name=name)
                 if not media_info:
                     torrent.update({
                         "title": name,
                         "image": ""
                     })
                     continue
-                year = media_info.year
-                name = media_info.title or media_info.get_name()
-                se = media_info.get_season_episode_string()
-                poster_path = media_info.get_poster_image()
+                year = media_info.get("year")
+                name = media_info.get("title")
+                se = media_info.get("se")
+                poster_path = media_info.get("poster")
             # 拼装标题
             if year:
                 title = "%s (%s) %s" % (name,
@@ -5304,6 +5301,20 @@ class WebAction:
         Plugins = PluginManager().get_plugins_conf()
         return {"code": 0, "result": Plugins}
 
+    @staticmethod
+    def get_plugin_event_metrics():
+        """
+        获取插件事件队列深度和处理耗时
+        """
+        return {"code": 0, "result": PluginManager().get_event_metrics()}
+
+    @staticmethod
+    def get_http_session_stats():
+        """
+        获取共享HTTP会话的连接复用统计
+        """
+        return {"code": 0, "result": RequestSessions.get_stats()}
+
     @staticmethod
     def update_category_config(data):
         """
@@ -1,5 +1,6 @@
 import os.path
 import re
+import threading
 
 import log
 from app.downloader import Downloader
@@ -18,6 +19,8 @@ from web.backend.web_utils import WebUtils
 
 SEARCH_MEDIA_CACHE = {}
 SEARCH_MEDIA_TYPE = {}
+# 当前WEB搜索的取消标志，发起新搜索时取消上一次未完成的搜索
+SEARCH_CANCEL_EVENT = threading.Event()
 
 
 def search_medias_for_web(content, ident_flag=True, filters=None, tmdbid=None, media_type=None):
@@ -130,45 +133,109 @@ def search_medias_for_web(content, ident_flag=True, filters=None, tmdbid=None, m
     # 整合高级查询条件
     if filters:
         filter_args.update(filters)
+    # 取消上一次未完成的搜索
+    global SEARCH_CANCEL_EVENT
+    SEARCH_CANCEL_EVENT.set()
+    cancel_event = SEARCH_CANCEL_EVENT = threading.Event()
+    # 清空缓存结果，搜索结果按站点返回顺序陆续插入数据库
+    _searcher.delete_all_search_torrents()
+    # 超时站点在后台返回的结果与最终排序入库互斥
+    result_lock = threading.Lock()
     # 开始搜索
     log.info("【Web】开始搜索 %s ..." % content)
-    media_list = _searcher.search_medias(key_word=first_search_name,
-                                         filter_args=filter_args,
-                                         match_media=media_info,
-                                         in_from=SearchType.WEB)
+    media_list = __search_medias_stream(searcher=_searcher,
+                                        process=_process,
+                                        key_word=first_search_name,
+                                        filter_args=filter_args,
+                                        match_media=media_info,
+                                        ident_flag=ident_flag,
+                                        title=content,
+                                        cancel_event=cancel_event,
+                                        result_lock=result_lock)
     # 使用第二名称重新搜索
     if ident_flag \
             and len(media_list) == 0 \
             and second_search_name \
-            and second_search_name != first_search_name:
+            and second_search_name != first_search_name \
+            and not cancel_event.is_set():
         _process.start(ProgressKey.Search)
         _process.update(ptype=ProgressKey.Search,
                         text="%s 未搜索到资源,尝试通过 %s 重新搜索 ..." % (
                             first_search_name, second_search_name))
         log.info("【Searcher】%s 未搜索到资源,尝试通过 %s 重新搜索 ..." % (first_search_name, second_search_name))
-        media_list = _searcher.search_medias(key_word=second_search_name,
-                                             filter_args=filter_args,
-                                             match_media=media_info,
-                                             in_from=SearchType.WEB)
-    # 清空缓存结果
-    _searcher.delete_all_search_torrents()
+        media_list = __search_medias_stream(searcher=_searcher,
+                                            process=_process,
+                                            key_word=second_search_name,
+                                            filter_args=filter_args,
+                                            match_media=media_info,
+                                            ident_flag=ident_flag,
+                                            title=content,
+                                            cancel_event=cancel_event,
+                                            result_lock=result_lock)
     # 结束进度
     _process.end(ProgressKey.Search)
+    if cancel_event.is_set():
+        log.info("【Web】%s 搜索已被新的搜索取消" % content)
+        return 1, "%s 搜索已取消" % content
     if len(media_list) == 0:
         log.info("【Web】%s 未搜索到任何资源" % content)
         return 1, "%s 未搜索到任何资源" % content
     else:
         log.info("【Web】共搜索到 %s 个有效资源" % len(media_list))
-        # 插入数据库
-        media_list = sorted(media_list, key=lambda x: "%s%s%s" % (str(x.res_order).rjust(3, '0'),
-                                                                  str(x.site_order).rjust(3, '0'),
-                                                                  str(x.seeders).rjust(10, '0')), reverse=True)
-        _searcher.insert_search_results(media_items=media_list,
-                                        ident_flag=ident_flag,
-                                        title=content)
+        # 全部返回后按优先级重新排序入库
+        with result_lock:
+            _searcher.delete_all_search_torrents()
+            _searcher.insert_search_results(media_items=__sort_media_list(media_list),
+                                            ident_flag=ident_flag,
+                                            title=content)
         return 0, ""
 
 
+def __sort_media_list(media_list):
+    """
+    按资源优先级、站点优先级、做种数排序
+    """
+    return sorted(media_list, key=lambda x: "%s%s%s" % (str(x.res_order).rjust(3, '0'),
+                                                        str(x.site_order).rjust(3, '0'),
+                                                        str(x.seeders).rjust(10, '0')), reverse=True)
+
+
+def __search_medias_stream(searcher, process, key_word, filter_args, match_media, ident_flag, title, cancel_event,
+                           result_lock):
+    """
+    流式搜索，每个站点的结果返回后立即入库并通过进度推送数量，不等待慢站点，慢站点超时后返回的结果在后台补充入库
+    :return: 全部命中的资源媒体信息列表
+    """
+    media_list = []
+
+    def __insert_late_result(result):
+        with result_lock:
+            if cancel_event.is_set():
+                return
+            media_list.extend(result)
+            searcher.insert_search_results(media_items=__sort_media_list(result),
+                                           ident_flag=ident_flag,
+                                           title=title)
+
+    for result in searcher.iter_search_medias(key_word=key_word,
+                                              filter_args=filter_args,
+                                              match_media=match_media,
+                                              in_from=SearchType.WEB,
+                                              cancel_event=cancel_event,
+                                              late_callback=__insert_late_result):
+        if cancel_event.is_set():
+            break
+        with result_lock:
+            media_list.extend(result)
+            searcher.insert_search_results(media_items=__sort_media_list(result),
+                                           ident_flag=ident_flag,
+                                           title=title)
+        process.update(ptype=ProgressKey.Search,
+                       text="已搜索到 %s 个资源，最新：%s" % (len(media_list), result[0].site),
+                       data={"count": len(media_list)})
+    return media_list
+
+
 def search_media_by_message(input_str, in_from: SearchType, user_id, user_name=None):
     """
     输入字符串，解析要求并进行资源搜索
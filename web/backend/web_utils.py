@@ -1,4 +1,5 @@
-from functools import lru_cache
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import quote
 
 import cn2an
@@ -6,10 +7,16 @@ import cn2an
 from app.media import Media, Bangumi, DouBan
 from app.media.meta import MetaInfo
 from app.utils import StringUtils, ExceptionUtils, SystemUtils, RequestUtils, IpUtils
+from app.utils.cache_manager import TorrentMediaCache
 from app.utils.types import MediaType
 from config import Config
 from version import APP_VERSION
 
+# 下载中种子的后台识别队列
+_recognize_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="torrent-recognize")
+_recognize_pending = set()
+_recognize_lock = threading.Lock()
+
 
 class WebUtils:
 
@@ -191,15 +198,48 @@ class WebUtils:
         return range(StartPage, EndPage + 1)
 
     @staticmethod
-    @lru_cache(maxsize=128)
-    def request_cache(url):
+    def get_torrent_media_info(torrent_id, name):
         """
-        带缓存的请求
+        获取种子的识别结果，未识别过的种子加入后台识别队列，不阻塞调用方
+        :param torrent_id: 种子hash
+        :param name: 种子名称
+        :return: 识别结果，识别中返回None，无法识别返回空字典
         """
-        if url.find('douban'):
-            ret = RequestUtils(referer="https://movie.douban.com").get_res(url)
-        else:
-            ret = RequestUtils().get_res(url)
-        if ret:
-            return ret.content
+        media_info = TorrentMediaCache.get(torrent_id)
+        if media_info is not None:
+            return media_info
+        with _recognize_lock:
+            if torrent_id not in _recognize_pending:
+                _recognize_pending.add(torrent_id)
+                _recognize_executor.submit(WebUtils.__recognize_torrent, torrent_id, name)
         return None
+
+    @staticmethod
+    def __recognize_torrent(torrent_id, name):
+        """
+        识别种子名称并缓存结果
+        """
+        try:
+            media_info = Media().get_media_info(title=name)
+            if not media_info:
+                # 识别失败的稍后重试
+                TorrentMediaCache.set(torrent_id, {}, ttl=10 * 60)
+                return
+            if media_info.tmdb_info:
+                group_name = media_info.get_title_string()
+            elif media_info.year:
+                group_name = "%s (%s)" % (media_info.get_name(), media_info.year)
+            else:
+                group_name = media_info.get_name()
+            TorrentMediaCache.set(torrent_id, {
+                "title": media_info.title or media_info.get_name(),
+                "year": media_info.year,
+                "se": media_info.get_season_episode_string(),
+                "poster": media_info.get_poster_image(),
+                "group_name": group_name
+            })
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+        finally:
+            with _recognize_lock:
+                _recognize_pending.discard(torrent_id)
@@ -28,7 +28,7 @@ from app.brushtask import BrushTask
 from app.conf import ModuleConf, SystemConfig
 from app.downloader import Downloader
 from app.filter import Filter
-from app.helper import SecurityHelper, MetaHelper, ChromeHelper, ThreadHelper
+from app.helper import SecurityHelper, MetaHelper, ChromeHelper, ThreadHelper, ImageCacheHelper
 from app.indexer import Indexer
 from app.media.meta import MetaInfo
 from app.mediaserver import MediaServer
@@ -1773,19 +1773,23 @@ def Img():
     url = request.args.get('url')
     if not url:
         return make_response("参数错误", 400)
+    # 缩略图宽度
+    width = request.args.get('width')
+    width = int(width) if str(width).isdigit() else None
     # 计算Etag
-    etag = hashlib.sha256(url.encode('utf-8')).hexdigest()
+    etag = hashlib.sha256(f"{url}{width or ''}".encode('utf-8')).hexdigest()
     # 检查协商缓存
     if_none_match = request.headers.get('If-None-Match')
     if if_none_match and if_none_match == etag:
         return make_response('', 304)
-    # 获取图片数据
-    response = Response(
-        WebUtils.request_cache(url),
-        mimetype='image/jpeg'
-    )
-    response.headers.set('Cache-Control', 'max-age=604800')
-    response.headers.set('Etag', etag)
+    # 从磁盘缓存获取图片
+    image_path = ImageCacheHelper().get_image(url=url, width=width)
+    if not image_path:
+        return make_response("图片获取失败", 404)
+    response = send_file(image_path,
+                         mimetype=ImageCacheHelper.get_mimetype(image_path),
+                         etag=etag,
+                         max_age=604800)
     return response
 
 